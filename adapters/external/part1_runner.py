@@ -1,25 +1,95 @@
-from typing import Optional
-from PIL import Image
-from pathlib import Path
-import tempfile
-import shutil
+import asyncio
 import logging
+from pathlib import Path
+
+from core import config
+from core.tracing import annotate, traced
+from core.workflows import get_workflow, workflow_name
+from utils.images import prepare_image
 
 # Import your existing function
-from vendors.part1.main import run_ielts_part1_agent
+from vendors.part1.main import (
+    run_ielts_part1_agent,
+    run_ielts_part1_agent_async,
+    stream_ielts_part1_agent,
+    stream_ielts_part1_agent_async,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def run_part1(image_path: str | Path, essay_text: str) -> str:
+def _image_url(image_path: Path) -> str:
+    """Downscales/recompresses the upload once (memoized) and returns it as a data URL."""
+    prepared = prepare_image(
+        image_path, max_side=config.IMAGE_MAX_SIDE, fmt=config.IMAGE_FORMAT, quality=config.IMAGE_QUALITY
+    )
+    logger.info(
+        "Image %s: %s %d bytes -> %s %d bytes (%dx%d)",
+        image_path.name, prepared.source_format, prepared.source_bytes,
+        prepared.mime, len(prepared.data), *prepared.size,
+    )
+    annotate(image_bytes=len(prepared.data), image_source_bytes=prepared.source_bytes)
+    return prepared.data_url
+
+
+@traced("runner.part1")
+def run_part1(image_path: str | Path, essay_text: str, mode: str = "fanout") -> str:
     """Calls your existing Part 1 agent and returns a markdown string."""
     # Ensure it's a real file path on disk (Gradio can pass us a path already)
     image_path = Path(image_path)
     if not image_path.exists():
         raise FileNotFoundError(f"Image not found: {image_path}")
 
-    logger.info("Running Part1 agent")
-    # If your agent requires a path, we pass it; if it accepts PIL image, adjust accordingly
-    result = run_ielts_part1_agent(str(image_path), essay_text)
+    logger.info("Running Part1 agent (%s)", mode)
+    annotate(mode=mode)
+    result = run_ielts_part1_agent(
+        str(image_path), essay_text, workflow=get_workflow(workflow_name("part1", mode)), image_url=_image_url(image_path)
+    )
     # Expecting a string from your code; if it's not, convert appropriately
-    return str(result)
\ No newline at end of file
+    return str(result)
+
+
+@traced("runner.part1")
+async def run_part1_async(image_path: str | Path, essay_text: str, mode: str = "fanout") -> str:
+    """Async version of `run_part1` (uses the ainvoke-based graph)."""
+    image_path = Path(image_path)
+    if not image_path.exists():
+        raise FileNotFoundError(f"Image not found: {image_path}")
+
+    logger.info("Running Part1 agent (%s, async)", mode)
+    annotate(mode=mode)
+    image_url = await asyncio.to_thread(_image_url, image_path)
+    result = await run_ielts_part1_agent_async(
+        str(image_path), essay_text, workflow=get_workflow(workflow_name("part1", mode, use_async=True)), image_url=image_url
+    )
+    return str(result)
+
+
+@traced("runner.part1")
+def stream_part1(image_path: str | Path, essay_text: str, mode: str = "fanout"):
+    """Yields the growing Part 1 report (markdown) as each node of the graph finishes."""
+    image_path = Path(image_path)
+    if not image_path.exists():
+        raise FileNotFoundError(f"Image not found: {image_path}")
+
+    logger.info("Streaming Part1 agent (%s)", mode)
+    annotate(mode=mode)
+    yield from stream_ielts_part1_agent(
+        str(image_path), essay_text, workflow=get_workflow(workflow_name("part1", mode)), image_url=_image_url(image_path)
+    )
+
+
+@traced("runner.part1")
+async def stream_part1_async(image_path: str | Path, essay_text: str, mode: str = "fanout"):
+    """Async version of `stream_part1`."""
+    image_path = Path(image_path)
+    if not image_path.exists():
+        raise FileNotFoundError(f"Image not found: {image_path}")
+
+    logger.info("Streaming Part1 agent (%s, async)", mode)
+    annotate(mode=mode)
+    image_url = await asyncio.to_thread(_image_url, image_path)
+    async for report in stream_ielts_part1_agent_async(
+        str(image_path), essay_text, workflow=get_workflow(workflow_name("part1", mode, use_async=True)), image_url=image_url
+    ):
+        yield report
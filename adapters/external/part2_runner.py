@@ -1,11 +1,49 @@
 import logging
-from vendors.part2.main import run_ielts_part2_agent
+
+from core.tracing import annotate, traced
+from core.workflows import get_workflow, workflow_name
+from vendors.part2.main import (
+    run_ielts_part2_agent,
+    run_ielts_part2_agent_async,
+    stream_ielts_part2_agent,
+    stream_ielts_part2_agent_async,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def run_part2(question: str, essay_text: str) -> str:
+@traced("runner.part2")
+def run_part2(question: str, essay_text: str, mode: str = "fanout") -> str:
     """Calls your existing Part 2 agent and returns a markdown string."""
-    logger.info("Running Part2 agent")
-    result = run_ielts_part2_agent(question, essay_text)
-    return str(result)
\ No newline at end of file
+    logger.info("Running Part2 agent (%s)", mode)
+    annotate(mode=mode)
+    result = run_ielts_part2_agent(question, essay_text, workflow=get_workflow(workflow_name("part2", mode)))
+    return str(result)
+
+
+@traced("runner.part2")
+async def run_part2_async(question: str, essay_text: str, mode: str = "fanout") -> str:
+    """Async version of `run_part2` (uses the ainvoke-based graph)."""
+    logger.info("Running Part2 agent (%s, async)", mode)
+    annotate(mode=mode)
+    result = await run_ielts_part2_agent_async(question, essay_text, workflow=get_workflow(workflow_name("part2", mode, use_async=True)))
+    return str(result)
+
+
+@traced("runner.part2")
+def stream_part2(question: str, essay_text: str, mode: str = "fanout"):
+    """Yields the growing Part 2 report (markdown) as each node of the graph finishes."""
+    logger.info("Streaming Part2 agent (%s)", mode)
+    annotate(mode=mode)
+    yield from stream_ielts_part2_agent(question, essay_text, workflow=get_workflow(workflow_name("part2", mode)))
+
+
+@traced("runner.part2")
+async def stream_part2_async(question: str, essay_text: str, mode: str = "fanout"):
+    """Async version of `stream_part2`."""
+    logger.info("Streaming Part2 agent (%s, async)", mode)
+    annotate(mode=mode)
+    async for report in stream_ielts_part2_agent_async(
+        question, essay_text, workflow=get_workflow(workflow_name("part2", mode, use_async=True))
+    ):
+        yield report
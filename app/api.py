@@ -0,0 +1,466 @@
+"""
+The JSON HTTP API: grading without Gradio, plus the job queue and grading history.
+
+`python -m app.api` serves it on its own (for the Next.js front end under
+ui/ and other services); app.ui.create_app mounts the same routes next to the
+Gradio UI. Grading runs in the server process, through core.pipeline:
+
+    POST /grade         {"task": "part2", "question": "...", "essay": "..."}
+                        -> {"task", "mode", "report", "overall_band", "bands"}
+    POST /grade/stream  same body; Server-Sent Events: `report` with the growing
+                        Markdown after every graded criterion, then `result` (as
+                        above) or `error`
+
+Part 1 sends the chart as `image_base64` (plus `image_name` for its extension).
+Bodies are validated (422 with the reasons). Send `Idempotency-Key: <unique
+string>` to make retries safe: a repeat of a finished request gets the stored
+result, without grading again (see core/idempotency.py). Each process grades
+up to API_MAX_CONCURRENCY requests at a time and holds API_MAX_WAITING more;
+past that it answers 429 with Retry-After.
+
+    GET /healthz        200 while the process is up
+    GET /readyz         200, or 503 once it is draining for shutdown (app/serve.py);
+                        new gradings are then refused with 503 and Retry-After
+
+The job queue (core/jobs.py), when JOB_QUEUE_ENABLED=1:
+
+    POST   /jobs        same body plus "priority"  -> 202 {"id", "status"}
+    GET    /jobs/{id}   status, queue position and the (partial) report
+    DELETE /jobs/{id}   cancel
+
+The API does not authenticate anyone itself. Behind an auth proxy, set
+API_USER_HEADER to the header the proxy puts the verified user in: gradings
+are then recorded for that user (`current_user` is the dependency to override
+for other schemes), and the grading history (core/results.py) is served, when
+RESULT_STORE_ENABLED=1, to signed-in users for their own gradings only:
+
+    GET /results/{user}/history   ?task=part2&limit=20&before=<created of the last row>
+    GET /results/{user}/progress  ?task=part2&bucket=week&days=90   average bands per period
+    GET /results/usage            ?task=part2&bucket=day&days=30    gradings, latency, tokens
+
+Without API_USER_HEADER gradings are anonymous and /results is not mounted.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+
+from app.serve import draining
+from core import config, metrics, tracing
+from core.results import capture_grading
+
+logger = logging.getLogger(__name__)
+
+grading_router = APIRouter(prefix="/grade", tags=["grading"])
+jobs_router = APIRouter(prefix="/jobs", tags=["jobs"])
+Bucket = Literal["day", "week", "month"]
+
+
+def current_user(request: Request) -> str | None:
+    """The signed-in user, as verified by the auth proxy (API_USER_HEADER); None when there is none."""
+    if not config.API_USER_HEADER:
+        return None
+    return request.headers.get(config.API_USER_HEADER) or None
+
+
+def signed_in_user(user: str | None = Depends(current_user)) -> str:
+    if user is None:
+        raise HTTPException(401, "Sign in to see the grading history.")
+    return user
+
+
+results_router = APIRouter(prefix="/results", tags=["results"], dependencies=[Depends(signed_in_user)])
+
+
+class Submission(BaseModel):
+    task: Literal["part1", "part2"]
+    essay: str = Field(min_length=30, max_length=20_000)
+    question: str | None = None
+    image_base64: str | None = None
+    image_name: str | None = None
+    mode: Literal["fanout", "fused"] | None = None
+
+    @model_validator(mode="after")
+    def _inputs_for_task(self):
+        if self.task == "part1" and not self.image_base64:
+            raise ValueError("part1 needs the chart as image_base64")
+        if self.task == "part2" and not (self.question or "").strip():
+            raise ValueError("part2 needs the question")
+        return self
+
+    def image(self) -> bytes | None:
+        if not self.image_base64:
+            return None
+        try:
+            return base64.b64decode(self.image_base64, validate=True)
+        except binascii.Error:
+            raise HTTPException(422, "image_base64 is not valid base64")
+
+
+class JobRequest(Submission):
+    priority: int = 0
+
+
+class GradeResult(BaseModel):
+    task: str
+    mode: str
+    report: str
+    overall_band: float | None = None
+    bands: dict[str, float | None] | None = None
+
+
+# --- grading ---
+
+class ConcurrencyLimit:
+    """At most `limit` gradings at once in this process and `max_waiting` more waiting; 429 for the rest."""
+
+    def __init__(self, limit: int, max_waiting: int):
+        self.limit = max(1, limit)
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = 0
+        self._slots: asyncio.Semaphore | None = None
+
+    def reserve(self) -> Reservation:
+        """
+        Admits a request, or refuses it with 429 (503 while draining). Call it
+        before the handler's first await: the request counts as waiting from
+        here on, so a burst cannot get past the limit.
+        """
+        if draining():
+            raise HTTPException(503, "Server is shutting down; retry shortly.", headers={"Retry-After": "1"})
+        if self.active + self.waiting >= self.limit + self.max_waiting:
+            raise HTTPException(429, "Too many gradings in progress; retry shortly.", headers={"Retry-After": "5"})
+        self.waiting += 1
+        return Reservation(self)
+
+
+class Reservation:
+    """A request's place under a ConcurrencyLimit, from admission until its grading ends."""
+
+    def __init__(self, limit: ConcurrencyLimit):
+        self._limit = limit
+        self._waiting = True
+
+    def release(self) -> None:
+        """Gives the place back if it was never used (replay, 409/422, client gone). Safe to call twice."""
+        if self._waiting:
+            self._waiting = False
+            self._limit.waiting -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Waits for a grading slot and holds it; the reservation is used up."""
+        limit = self._limit
+        if limit._slots is None:
+            limit._slots = asyncio.Semaphore(limit.limit)
+        try:
+            await limit._slots.acquire()
+        finally:
+            self.release()
+        limit.active += 1
+        try:
+            yield
+        finally:
+            limit.active -= 1
+            limit._slots.release()
+
+
+_limit: ConcurrencyLimit | None = None
+
+
+def concurrency_limit() -> ConcurrencyLimit:
+    global _limit
+    if _limit is None:
+        _limit = ConcurrencyLimit(config.API_MAX_CONCURRENCY, config.API_MAX_WAITING)
+    return _limit
+
+
+metrics.Gauge("ielts_api_gradings_active", "API gradings holding a slot.", callback=lambda: concurrency_limit().active)
+metrics.Gauge("ielts_api_gradings_waiting", "API gradings waiting for a slot.",
+              callback=lambda: concurrency_limit().waiting)
+
+
+def _job(request: Submission) -> dict:
+    # What core.worker.grade_job takes, so the API grades exactly like a queue worker.
+    return {"id": uuid.uuid4().hex, "task": request.task, "essay": request.essay, "question": request.question,
+            "image": request.image(), "image_name": request.image_name or "image.png", "mode": request.mode}
+
+
+async def _reports(job: dict, user: str | None, reservation: Reservation):
+    """Yields the growing Markdown report, once a grading slot is free."""
+    from core.worker import grade_job
+
+    with tracing.span(f"api.{job['task']}", user=user), tempfile.TemporaryDirectory(prefix="ielts-api-") as folder:
+        async with reservation.slot():
+            async for markdown in grade_job(job, Path(folder)):
+                yield markdown
+
+
+def _result(job: dict, report: str, grading: dict) -> dict:
+    return GradeResult(task=job["task"], mode=job["mode"] or config.GRADING_MODE, report=report,
+                       **grading).model_dump()
+
+
+async def _claim(key: str, request: Submission, user: str | None) -> dict | None:
+    """None to go ahead with the grading, or the stored result to replay."""
+    from core.idempotency import MISMATCH, RUNNING, get_idempotency_store
+
+    # The user is part of the fingerprint: nobody gets another user's result replayed.
+    fingerprint = hashlib.sha256(f"{user}\0{request.model_dump_json()}".encode()).hexdigest()
+    state, response = await asyncio.to_thread(get_idempotency_store().begin, key, fingerprint)
+    if state == RUNNING:
+        raise HTTPException(409, "A request with this Idempotency-Key is still being graded.")
+    if state == MISMATCH:
+        raise HTTPException(422, "This Idempotency-Key was already used for a different request.")
+    return response
+
+
+async def _settle(key: str | None, result: dict | None) -> None:
+    """Stores the result for retries with the same key, or frees the key when the grading failed."""
+    from core.idempotency import get_idempotency_store
+
+    if key is None:
+        return
+    store = get_idempotency_store()
+    if result is None:
+        await asyncio.to_thread(store.abandon, key)
+    else:
+        await asyncio.to_thread(store.finish, key, result)
+
+
+@grading_router.post("", response_model=GradeResult)
+async def grade(request: Submission, idempotency_key: str | None = Header(None, max_length=200),
+                user: str | None = Depends(current_user)):
+    job = _job(request)
+    reservation = concurrency_limit().reserve()
+    try:
+        if idempotency_key and (replay := await _claim(idempotency_key, request, user)) is not None:
+            return JSONResponse(replay, headers={"Idempotent-Replayed": "true"})
+        result = None
+        try:
+            with capture_grading() as grading:
+                report = None
+                async for report in _reports(job, user, reservation):
+                    pass
+            result = _result(job, report, grading)
+        except Exception as e:
+            logger.exception("API: %s grading failed", job["task"])
+            raise HTTPException(502, f"Grading failed: {type(e).__name__}: {e}")
+        finally:
+            await _settle(idempotency_key, result)
+        return result
+    finally:
+        reservation.release()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class _EventStream(StreamingResponse):
+    """
+    The SSE response of one grading. Whichever way it ends, the grading's
+    reservation is released and its idempotency key settled, also when the
+    client goes away before the first event (Starlette then never starts the
+    body, so a `finally` in the generator would not run).
+    """
+
+    def __init__(self, job: dict, user: str | None, key: str | None, replay: dict | None,
+                 reservation: Reservation):
+        self.job, self.user, self.key, self.replay, self.reservation = job, user, key, replay, reservation
+        self.started = False
+        super().__init__(self._events(), media_type="text/event-stream",
+                         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    async def _events(self):
+        self.started = True
+        if self.replay is not None:
+            yield _sse("result", self.replay)
+            return
+        result = None
+        try:
+            with capture_grading() as grading:
+                report = None
+                async for report in _reports(self.job, self.user, self.reservation):
+                    yield _sse("report", {"report": report})
+            result = _result(self.job, report, grading)
+        except Exception as e:
+            logger.exception("API: %s grading failed", self.job["task"])
+            yield _sse("error", {"detail": f"Grading failed: {type(e).__name__}: {e}"})
+            return
+        finally:
+            # Also runs when the client goes away mid-stream (the key is freed for its retry).
+            await _settle(self.key, result)
+        yield _sse("result", result)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+            self.reservation.release()
+            if not self.started and self.replay is None:
+                await _settle(self.key, None)
+
+
+@grading_router.post("/stream", response_class=StreamingResponse)
+async def grade_stream(request: Submission, idempotency_key: str | None = Header(None, max_length=200),
+                       user: str | None = Depends(current_user)):
+    job = _job(request)
+    reservation = concurrency_limit().reserve()
+    try:
+        replay = await _claim(idempotency_key, request, user) if idempotency_key else None
+    except BaseException:
+        reservation.release()
+        raise
+    return _EventStream(job, user, idempotency_key, replay, reservation)
+
+
+# --- job queue ---
+
+@jobs_router.post("", status_code=202)
+def submit_job(request: JobRequest):
+    from core.jobs import get_job_queue
+
+    try:
+        job_id = get_job_queue().submit(
+            request.task, request.essay, question=request.question, image=request.image(),
+            image_name=request.image_name or "image.png", priority=request.priority, mode=request.mode,
+        )
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    return {"id": job_id, "status": "queued"}
+
+
+@jobs_router.get("/{job_id}")
+def get_job(job_id: str):
+    from core.jobs import get_job_queue
+
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(404, "unknown job")
+    return job
+
+
+@jobs_router.delete("/{job_id}")
+def cancel_job(job_id: str):
+    from core.jobs import get_job_queue
+
+    status = get_job_queue().cancel(job_id)
+    if status is None:
+        raise HTTPException(404, "unknown job")
+    return {"id": job_id, "status": status}
+
+
+# --- grading history ---
+
+def _own(user: str, me: str) -> None:
+    if user != me:
+        raise HTTPException(403, "You can only see your own gradings.")
+
+
+@results_router.get("/usage")
+def usage(task: str | None = None, bucket: Bucket = "day", days: float = Query(30, gt=0)):
+    from core.results import DAY, get_result_store
+
+    return get_result_store().usage(task, bucket=bucket, since=time.time() - days * DAY)
+
+
+@results_router.get("/{user}/history")
+def history(user: str, task: str | None = None, limit: int = Query(20, ge=1, le=200), before: float | None = None,
+            me: str = Depends(signed_in_user)):
+    from core.results import get_result_store
+
+    _own(user, me)
+    return get_result_store().history(user, task, limit=limit, before=before)
+
+
+@results_router.get("/{user}/progress")
+def progress(user: str, task: str | None = None, bucket: Bucket = "week", days: float = Query(90, gt=0),
+             me: str = Depends(signed_in_user)):
+    from core.results import DAY, get_result_store
+
+    _own(user, me)
+    return get_result_store().progress(user, task, bucket=bucket, since=time.time() - days * DAY)
+
+
+health_router = APIRouter(tags=["health"])
+
+
+@health_router.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@health_router.get("/readyz")
+def readyz():
+    if draining():
+        return JSONResponse({"status": "draining"}, status_code=503)
+    return {"status": "ready"}
+
+
+def add_routes(app) -> None:
+    """
+    Mounts the grading API and health checks, the job queue when it is enabled, and the
+    grading history when it is enabled and users are signed in through API_USER_HEADER.
+    """
+    if config.API_CORS_ORIGINS:
+        from fastapi.middleware.cors import CORSMiddleware
+
+        app.add_middleware(CORSMiddleware, allow_origins=config.API_CORS_ORIGINS, allow_methods=["*"],
+                           allow_headers=["*"])
+    app.include_router(health_router)
+    app.include_router(grading_router)
+    if config.JOB_QUEUE_ENABLED:
+        app.include_router(jobs_router)
+    if config.RESULT_STORE_ENABLED and config.API_USER_HEADER:
+        app.include_router(results_router)
+
+
+def create_api():
+    """The API on its own FastAPI app, without Gradio (Prometheus metrics at /metrics); app.serve runs it."""
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+
+    from app.serve import drain_on_signals
+    from core.observability import init_observability
+
+    init_observability()
+    app = FastAPI(title="IELTS Writing Assistant API", lifespan=drain_on_signals)
+    add_routes(app)
+    if config.METRICS_ENABLED:
+        @app.get("/metrics", include_in_schema=False)
+        def prometheus_metrics():
+            return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    from core.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(prog="python -m app.api")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    configure_logging()
+    uvicorn.run(create_api(), host=args.host, port=args.port)
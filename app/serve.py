@@ -0,0 +1,229 @@
+"""
+Production serving: N worker processes behind one port, drained gracefully on SIGTERM.
+
+    python -m app.serve [--workers 4] [--port 8000]            # the JSON API (app/api.py)
+    python -m app.serve --app ui [--workers 4] [--port 7860]   # the Gradio app
+
+Each worker is a uvicorn process accepting on the shared listening socket,
+so image decoding, report rendering and JSON encoding run on N GILs; the
+supervising process restarts a worker that dies. Workers share everything
+kept on disk: the result and node caches, the grading history and the
+idempotency keys (SQLite in WAL mode, see core/db.py). The in-memory tier of
+the result cache is per worker. The LLM quota in core.config (LLM_RPM,
+LLM_TPM, LLM_MAX_CONCURRENCY) is for the whole server and is split evenly
+between the workers.
+
+/metrics covers every worker, whichever one takes the scrape: each worker
+writes a snapshot of its metrics to a shared directory (METRICS_MULTIPROC_DIR,
+a fresh temporary one unless set) every METRICS_SNAPSHOT_SECONDS, and the
+scraped worker sums them (see core/metrics.py). The other workers' values
+are up to that many seconds old.
+
+What stays per worker:
+  * Gemini context caches (core/context_cache.py, CONTEXT_CACHE_ENABLED=1):
+    each worker uploads its own copy of every examiner brief on first use and
+    deletes it at exit, so N workers pay N times the cache storage; the
+    cached-input discount per request is unchanged.
+
+SIGTERM (`docker stop`, a rolling deploy) drains every worker: /readyz turns
+503 and new gradings are refused with 503 at once, the listening socket
+closes, and running gradings, SSE streams included, get SHUTDOWN_GRACE_SECONDS
+to finish before they are cancelled. Give the container a longer stop grace
+period than that.
+
+Gradio keeps its event queue in process memory, so the UI is always served
+by one process. `--app ui --workers N` (default 1, SERVE_WORKERS is for the
+API) moves the grading off it instead: the job queue is turned on, so the
+front end only submits jobs and polls them (core/jobs.py), and the
+supervisor runs N `python -m core.worker` processes, restarted when they die,
+which share the LLM quota and the metrics directory like API workers. They
+read the API key from the environment, not from the Settings tab. On SIGTERM
+the front end drains first; the workers then finish their running jobs
+within SHUTDOWN_GRACE_SECONDS and hand back what is left to the queue.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+APPS = {"api": ("app.api:create_api", 8000), "ui": ("app.ui:create_app", 7860)}
+
+_draining = threading.Event()
+
+
+def draining() -> bool:
+    """True once this process has been asked to shut down."""
+    return _draining.is_set()
+
+
+@asynccontextmanager
+async def drain_on_signals(app):
+    """
+    FastAPI lifespan: flags the process as draining as soon as SIGTERM or
+    SIGINT arrives, ahead of uvicorn's own handler, which then stops accepting
+    and waits for the running requests. Also sets up logging in worker
+    processes, which do not run this module's __main__.
+    """
+    if not logging.getLogger().handlers:
+        from core.logging_config import configure_logging
+
+        configure_logging()
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            previous = signal.getsignal(sig)
+            if callable(previous):
+                def handler(signum, frame, previous=previous):
+                    if not _draining.is_set():
+                        logger.info("Draining: no new gradings, waiting up to %.0f s for the running ones",
+                                    config.SHUTDOWN_GRACE_SECONDS)
+                    _draining.set()
+                    previous(signum, frame)
+
+                signal.signal(sig, handler)
+    yield
+
+
+def split_quota(workers: int) -> None:
+    """Gives each worker an equal share of the server-wide LLM quota (workers read it from the environment)."""
+    os.environ["LLM_QUOTA_SHARES"] = str(max(1, config.LLM_QUOTA_SHARES) * workers)
+
+
+def share_metrics() -> Path | None:
+    """
+    Points the workers at one directory of metrics snapshots, emptied of a previous
+    run's. Returns the directory if it is a temporary one, for the caller to remove.
+    """
+    if config.METRICS_MULTIPROC_DIR:
+        directory, temporary = Path(config.METRICS_MULTIPROC_DIR), None
+        directory.mkdir(parents=True, exist_ok=True)
+        for old in directory.glob("*.json"):
+            old.unlink()
+    else:
+        directory = temporary = Path(tempfile.mkdtemp(prefix="ielts-metrics-"))
+    os.environ["METRICS_MULTIPROC_DIR"] = str(directory)
+    return temporary
+
+
+class GradingWorkers:
+    """The `python -m core.worker` processes that grade for a UI front end, restarted when they die."""
+
+    def __init__(self, count: int, command: list[str] | None = None, check_every: float = 1.0):
+        self.count = count
+        self.command = command or [sys.executable, "-m", "core.worker"]
+        self.check_every = check_every
+        self.procs: list[subprocess.Popen] = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def _spawn(self) -> subprocess.Popen:
+        # In their own session: Ctrl+C reaches the supervisor only, which stops them in order.
+        return subprocess.Popen(self.command, start_new_session=True)
+
+    def start(self) -> None:
+        with self._lock:
+            self.procs = [self._spawn() for _ in range(self.count)]
+        threading.Thread(target=self._watch, name="grading-workers", daemon=True).start()
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self.check_every):
+            with self._lock:
+                if self._stopping.is_set():
+                    return
+                for i, proc in enumerate(self.procs):
+                    if proc.poll() is not None:
+                        logger.warning("Grading worker %d exited with %s; restarting it", proc.pid, proc.returncode)
+                        self.procs[i] = self._spawn()
+
+    def _signal(self) -> None:
+        for proc in self.procs:
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGTERM)
+
+    def stop(self, grace: float) -> None:
+        """SIGTERM: running jobs get `grace` seconds; a second SIGTERM hands the rest back to the queue."""
+        with self._lock:
+            self._stopping.set()
+        self._signal()
+        deadline = time.monotonic() + grace
+        try:
+            for proc in self.procs:
+                proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+            return
+        except subprocess.TimeoutExpired:
+            self._signal()
+        for proc in self.procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", choices=tuple(APPS), default="api")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("-w", "--workers", type=int,
+                        help="worker processes (API default: SERVE_WORKERS, 0 = one per CPU; UI default: 1, "
+                             "more moves the grading to that many job queue workers)")
+    args = parser.parse_args(argv)
+
+    factory, port = APPS[args.app]
+    if args.app == "ui":
+        workers = args.workers or 1
+    else:
+        workers = (args.workers if args.workers is not None else config.SERVE_WORKERS) or os.cpu_count() or 1
+    snapshots = graders = None
+    if workers > 1:
+        split_quota(workers)
+        if config.METRICS_ENABLED:
+            snapshots = share_metrics()
+    if args.app == "ui" and workers > 1:
+        # Before app.ui is imported: it reads JOB_QUEUE_ENABLED from core.config.
+        os.environ["JOB_QUEUE_ENABLED"] = "1"
+        config.JOB_QUEUE_ENABLED = True
+        graders = GradingWorkers(workers)
+        graders.start()
+        logger.info("Serving ui on %s:%d, grading on %d job queue worker(s)", args.host, args.port or port, workers)
+        workers = 1
+    else:
+        logger.info("Serving %s on %s:%d with %d worker(s)", args.app, args.host, args.port or port, workers)
+    # A single uvicorn server re-raises the signal that stopped it once it has drained,
+    # which would kill this process before the cleanup below; note it and exit after.
+    stopped_by: list[int] = []
+    if graders is not None or snapshots is not None:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: stopped_by.append(signum))
+    try:
+        uvicorn.run(factory, factory=True, host=args.host, port=args.port or port, workers=workers,
+                    timeout_graceful_shutdown=config.SHUTDOWN_GRACE_SECONDS)
+    finally:
+        if graders is not None:
+            graders.stop(config.SHUTDOWN_GRACE_SECONDS)
+        if snapshots is not None:
+            shutil.rmtree(snapshots, ignore_errors=True)
+    if stopped_by:
+        sys.exit(128 + stopped_by[0])
+
+
+if __name__ == "__main__":
+    from core.logging_config import configure_logging
+
+    configure_logging()
+    main()
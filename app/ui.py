@@ -1,9 +1,22 @@
 from __future__ import annotations
+
+import logging
+
 import gradio as gr
-from core.config import get_api_key, set_api_key, ENV_VAR_NAME
-from core.pipeline import analyze_part1, analyze_part2
+
+from core import metrics
+from core.config import (
+    ENV_VAR_NAME,
+    JOB_POLL_SECONDS,
+    JOB_QUEUE_ENABLED,
+    JOB_UI_PRIORITY,
+    METRICS_ENABLED,
+    UI_CONCURRENCY_LIMIT,
+    get_api_key,
+    set_api_key,
+)
 from core.logging_config import configure_logging
-import logging
+from core.tracing import annotate, traced
 
 configure_logging()
 logger = logging.getLogger(__name__)
@@ -21,24 +34,100 @@ def on_save_key(key: str):
     return gr.update(value="**Saved!** Your API key is now configured.")
 
 
-def on_analyze_part1(image_path, essay):
-    _check_api_key_or_raise()
+def _user(request: gr.Request | None) -> str | None:
+    # The login name when the app runs with Gradio auth; anonymous otherwise.
+    return getattr(request, "username", None)
+
+
+async def _queued_grading(task, essay, question=None, image_path=None):
+    """Grades through the job queue: submit, then show the job's position and report as the worker writes it."""
+    from pathlib import Path
+
+    from core.jobs import CANCELLED, FAILED, QUEUED, RUNNING, follow, get_job_queue
+
+    queue = get_job_queue()
+    image = Path(image_path) if image_path else None
+    job_id = queue.submit(
+        task, essay, question=question, priority=JOB_UI_PRIORITY,
+        image=image.read_bytes() if image else None, image_name=image.name if image else None,
+    )
+    annotate(job=job_id)
+    logger.info("UI: queued %s job %s", task, job_id)
+    # Closing the page does not cancel the job; it can be looked up on the Jobs tab.
+    async for job in follow(queue, job_id, JOB_POLL_SECONDS):
+        if job["status"] == QUEUED:
+            yield f"⏳ Queued ({job['position']} ahead) — job `{job_id}`"
+        elif job["status"] == RUNNING:
+            yield job["report"] or f"⏳ Grading… — job `{job_id}`"
+        elif job["status"] == FAILED:
+            raise RuntimeError(f"Grading failed: {job['error']}")
+        elif job["status"] == CANCELLED:
+            yield f"Cancelled — job `{job_id}`"
+        else:
+            yield job["report"]
+
+
+@traced("ui.part1")
+async def on_analyze_part1(image_path, essay, request: gr.Request = None):
+    if not JOB_QUEUE_ENABLED:  # with the queue, the workers hold the API key
+        _check_api_key_or_raise()
     if not image_path:
         raise ValueError("Please upload the Task 1 image/chart/graph.")
     if not essay or len(essay.strip()) < 30:
         raise ValueError("Please paste your full Task 1 response (at least 30 chars).")
     logger.info("UI: analyze_part1 invoked")
-    return analyze_part1(image_path, essay)
+    annotate(essay_chars=len(essay), user=_user(request))
+    if JOB_QUEUE_ENABLED:
+        async for markdown in _queued_grading("part1", essay, image_path=image_path):
+            yield markdown
+        return
+    # Imported on the first grading, not at startup: it pulls in LangGraph and the model client.
+    from core.pipeline import stream_analyze_part1_async
+
+    # Each criterion shows up as soon as it is graded.
+    async for markdown in stream_analyze_part1_async(image_path, essay):
+        yield markdown
 
 
-def on_analyze_part2(question, essay):
-    _check_api_key_or_raise()
+@traced("ui.part2")
+async def on_analyze_part2(question, essay, request: gr.Request = None):
+    if not JOB_QUEUE_ENABLED:
+        _check_api_key_or_raise()
     if not question or len(question.strip()) < 10:
         raise ValueError("Please paste the Task 2 question.")
     if not essay or len(essay.strip()) < 30:
         raise ValueError("Please paste your full Task 2 essay (at least 30 chars).")
     logger.info("UI: analyze_part2 invoked")
-    return analyze_part2(question, essay)
+    annotate(essay_chars=len(essay), user=_user(request))
+    if JOB_QUEUE_ENABLED:
+        async for markdown in _queued_grading("part2", essay, question=question):
+            yield markdown
+        return
+    from core.pipeline import stream_analyze_part2_async
+
+    async for markdown in stream_analyze_part2_async(question, essay):
+        yield markdown
+
+
+def on_check_job(job_id: str):
+    from core.jobs import get_job_queue
+
+    job = get_job_queue().get((job_id or "").strip().strip("`"))
+    if job is None:
+        return "No such job."
+    if job["status"] == "queued":
+        return f"**Queued** ({job['position']} ahead)"
+    if job["status"] == "failed":
+        return f"**Failed:** {job['error']}"
+    head = f"**{job['status'].capitalize()}**" + (" (cancelling)" if job["cancel_requested"] else "")
+    return f"{head}\n\n{job['report'] or ''}"
+
+
+def on_cancel_job(job_id: str):
+    from core.jobs import get_job_queue
+
+    status = get_job_queue().cancel((job_id or "").strip().strip("`"))
+    return "No such job." if status is None else f"**{status.capitalize()}**"
 
 APP_CSS = """
 #out1 h2, #out2 h2 { border-bottom: 1px solid #eaecef; padding-bottom: 2px; }
@@ -84,6 +173,16 @@ The key is stored **locally** on your machine (in `.env`) and is **not shared**
             clear2 = gr.Button("Clear")
         out2 = gr.Markdown(label="Feedback", elem_id="out2", line_breaks=True)
 
+    if JOB_QUEUE_ENABLED:
+        with gr.Tab("Jobs"):
+            job_box = gr.Textbox(label="Job id", placeholder="shown while your essay is queued")
+            with gr.Row():
+                check_btn = gr.Button("Check", variant="primary")
+                cancel_btn = gr.Button("Cancel")
+            job_out = gr.Markdown(line_breaks=True)
+        check_btn.click(on_check_job, inputs=[job_box], outputs=[job_out])
+        cancel_btn.click(on_cancel_job, inputs=[job_box], outputs=[job_out])
+
     with gr.Tab("Settings"):
         gr.Markdown(f"Set your API key. This will be saved to `.env` as `{ENV_VAR_NAME}`.")
         key_box = gr.Textbox(label=f"{ENV_VAR_NAME}", type="password", placeholder="AIza-… (your Google API key)")
@@ -139,5 +238,68 @@ The key is stored **locally** on your machine (in `.env`) and is **not shared**
 
 
 
+def _gradio_queue_depth() -> int | None:
+    # Gradio has no public queue stats; its private queue is read defensively,
+    # so a Gradio upgrade drops these samples instead of breaking the scrape.
+    queue = getattr(demo, "_queue", None)
+    return len(queue) if hasattr(queue, "__len__") else None
+
+
+def _gradio_active_workers() -> int | None:
+    count = getattr(getattr(demo, "_queue", None), "get_active_worker_count", None)
+    return count() if callable(count) else None
+
+
+def _job_stat(name: str):
+    def read():
+        if not JOB_QUEUE_ENABLED:
+            return None
+        from core.jobs import get_job_queue
+
+        return get_job_queue().stats()[name]
+    return read
+
+
+# Registered once per process (create_app may run more than once, e.g. in tests).
+metrics.Gauge("ielts_gradio_queue_depth", "Gradio events waiting in the queue.", callback=_gradio_queue_depth)
+metrics.Gauge("ielts_gradio_active_workers", "Gradio events being processed.", callback=_gradio_active_workers)
+metrics.Gauge("ielts_jobs_queued", "Gradings waiting in the job queue.", callback=_job_stat("queued"), shared=True)
+metrics.Gauge("ielts_jobs_running", "Gradings being run by a worker.", callback=_job_stat("running"), shared=True)
+
+
+def create_app():
+    """The Gradio app on a FastAPI server, with Prometheus metrics at /metrics and the JSON API (app/api.py)."""
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+
+    from app.api import add_routes
+    from app.serve import drain_on_signals
+    from core.observability import init_observability
+
+    init_observability()
+    demo.queue(default_concurrency_limit=UI_CONCURRENCY_LIMIT)
+    app = FastAPI(lifespan=drain_on_signals)
+
+    add_routes(app)
+    if METRICS_ENABLED:
+        @app.get("/metrics", include_in_schema=False)
+        def prometheus_metrics():
+            return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+    return gr.mount_gradio_app(app, demo, path="/")
+
+
 if __name__ == "__main__":
-    demo.launch(server_name="0.0.0.0", server_port=7860)
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print an import-time breakdown of a cold start and exit")
+    if parser.parse_args().profile_startup:
+        from core.startup import print_profile
+        print_profile("app.ui")
+        raise SystemExit(0)
+
+    import uvicorn
+
+    uvicorn.run(create_app(), host="0.0.0.0", port=7860)
@@ -0,0 +1,66 @@
+"""
+Many concurrent gradings on a single event loop against a local fake model.
+
+    python -m benchmarks.bench_async_load [-n 500] [--latency 0.5]
+
+Every LLM call sleeps for `--latency` seconds, so a grading takes about one
+latency (the four criteria run in parallel; the aggregator is local). On the
+async path nothing blocks a thread while waiting, so the wall time is that
+latency plus the CPU cost of the graph itself, instead of scaling with the
+number of worker threads.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Every grading below is identical; measure the graph, not the caches.
+os.environ.setdefault("RESULT_CACHE_ENABLED", "0")
+os.environ.setdefault("NODE_CACHE_ENABLED", "0")
+# ...and not the client-side rate limiter either (see bench_rate_limit.py).
+os.environ.setdefault("LLM_RPM", "0")
+os.environ.setdefault("LLM_TPM", "0")
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "100000")
+
+from benchmarks.fake_llm import FakeChatModel, install_fake_model
+
+QUESTION = "Some people think that university education should be free for everyone. Discuss both views."
+ESSAY = "It is often argued that higher education should be funded by the state. " * 10
+
+
+async def _run(n: int) -> tuple[float, int]:
+    from core.pipeline import analyze_part2_async
+
+    in_flight = peak = 0
+
+    async def one():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await analyze_part2_async(QUESTION, ESSAY)
+        finally:
+            in_flight -= 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    return time.perf_counter() - start, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=500, help="concurrent gradings")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    fake = FakeChatModel(latency=args.latency)
+    install_fake_model(fake)
+
+    wall, peak = asyncio.run(_run(args.n))
+    print(f"{args.n} gradings, {fake.calls} LLM calls, peak in flight {peak}")
+    print(f"wall {wall:.2f} s | {args.n / wall:.1f} gradings/s | "
+          f"ideal per grading {args.latency:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
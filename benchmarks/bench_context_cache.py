@@ -0,0 +1,84 @@
+"""
+Input tokens and latency per grading with and without context caching.
+
+    python -m benchmarks.bench_context_cache [-n 100] [-c 10] [--latency 0.1] [--prefill 0.2]
+
+Grades Task 2 essays against the fake model with the static system prompts
+sent inline, then by cached-content reference through core/context_cache.py on
+a local FakeCacheService. The fake charges `--prefill` seconds per 1000
+uncached input tokens before answering, standing in for time to first token.
+The last run expires every cache halfway through, to show requests falling
+back inline and the caches being recreated without failing a grading.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("RESULT_CACHE_ENABLED", "0")
+os.environ.setdefault("NODE_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_RPM", "0")
+os.environ.setdefault("LLM_TPM", "0")
+
+from benchmarks.fake_llm import FakeCacheService, FakeChatModel, install_fake_model
+
+QUESTION = "Some people think that university education should be free for everyone. Discuss both views."
+ESSAY = "It is often argued that higher education should be funded by the state. " * 30
+
+
+async def _run(n: int, concurrency: int, mode: str, on_half=None) -> tuple[list[float], int]:
+    from core.pipeline import analyze_part2_async
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failed, done = [], 0, 0
+
+    async def one(i):
+        nonlocal failed, done
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await analyze_part2_async(QUESTION, ESSAY + str(i), mode=mode)
+            except Exception:
+                failed += 1
+            latencies.append(time.perf_counter() - start)
+            done += 1
+            if done == n // 2 and on_half:
+                on_half()
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return latencies, failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100, help="gradings per run")
+    parser.add_argument("-c", "--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per fake LLM call, before prefill")
+    parser.add_argument("--prefill", type=float, default=0.2, help="seconds per 1000 uncached input tokens")
+    parser.add_argument("--mode", choices=("fanout", "fused"), default="fanout")
+    args = parser.parse_args()
+
+    from core.context_cache import ContextCache
+    from core.metrics import percentile
+
+    print(f"{args.n} Task 2 gradings ({args.mode}), {args.concurrency} at a time")
+    print(f"{'':<18}{'input tok':>10}{'cached':>8}{'billed':>8}{'p50 s':>8}{'p95 s':>8}{'failed':>7}  cache")
+    for label in ("inline", "context cache", "cache expires"):
+        service = FakeCacheService()
+        fake = FakeChatModel(latency=args.latency, prefill_seconds_per_1k=args.prefill, cache_service=service)
+        cache = ContextCache(service, min_tokens=1024) if label != "inline" else None
+        install_fake_model(fake, context_cache=cache)
+        on_half = service.expire_all if label == "cache expires" else None
+        latencies, failed = asyncio.run(_run(args.n, args.concurrency, args.mode, on_half))
+        per = args.n
+        counts = cache.stats() if cache else {}
+        detail = ", ".join(f"{k} {counts[k]}" for k in ("hits", "inline", "created", "expired")) if cache else ""
+        print(f"{label:<18}{fake.input_tokens / per:>10.0f}{fake.cached_tokens / per:>8.0f}"
+              f"{(fake.input_tokens - fake.cached_tokens) / per:>8.0f}"
+              f"{percentile(latencies, 50):>8.2f}{percentile(latencies, 95):>8.2f}{failed:>7}  {detail}")
+        if cache:
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()
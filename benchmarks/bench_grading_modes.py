@@ -0,0 +1,49 @@
+"""
+LLM calls and approximate input tokens per grading: fan-out graph vs. fused mode.
+
+    python -m benchmarks.bench_grading_modes
+
+Runs against the local fake model, so token counts are estimates
+(see benchmarks/fake_llm.py).
+"""
+import os
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("RESULT_CACHE_ENABLED", "0")
+os.environ.setdefault("NODE_CACHE_ENABLED", "0")
+
+from benchmarks.fake_llm import FakeChatModel, install_fake_model
+
+QUESTION = "Some people think that university education should be free for everyone. Discuss both views."
+ESSAY = "It is often argued that higher education should be funded by the state. " * 30
+
+
+def main() -> None:
+    from PIL import Image
+
+    install_fake_model(FakeChatModel())
+    from core.pipeline import analyze_part1, analyze_part2
+
+    with tempfile.TemporaryDirectory() as td:
+        image = Path(td) / "chart.png"
+        Image.new("RGB", (800, 600), (73, 109, 137)).save(image)
+
+        cases = {
+            "part1": lambda mode: analyze_part1(image, ESSAY, mode=mode),
+            "part2": lambda mode: analyze_part2(QUESTION, ESSAY, mode=mode),
+        }
+        for task, run in cases.items():
+            results = {}
+            for mode in ("fanout", "fused"):
+                fake = FakeChatModel()
+                install_fake_model(fake)
+                run(mode)
+                results[mode] = (fake.calls, fake.input_tokens)
+            (c1, t1), (c2, t2) = results["fanout"], results["fused"]
+            print(f"{task}: fanout {c1} calls / ~{t1} input tokens | fused {c2} calls / ~{t2} input tokens "
+                  f"| {c1 / c2:.1f}x fewer calls, {t1 / t2:.1f}x fewer tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Bursty load against a fake model with a server-side concurrency quota.
+
+    python -m benchmarks.bench_rate_limit [-n 100] [--quota 8] [--latency 0.2]
+
+The fake answers 429 to any call beyond `--quota` in flight. Without the
+client-side limiter most gradings of a burst fail; with it the AIMD controller
+settles near the quota, throttled calls back off and are retried through the
+limiter, and every grading completes.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("RESULT_CACHE_ENABLED", "0")
+os.environ.setdefault("NODE_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_RPM", "0")
+os.environ.setdefault("LLM_TPM", "0")
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "64")
+os.environ.setdefault("LLM_RETRIES", "20")
+os.environ.setdefault("LLM_BACKOFF_BASE_SECONDS", "0.05")
+os.environ.setdefault("LLM_BACKOFF_MAX_SECONDS", "1")
+
+from benchmarks.fake_llm import FakeChatModel, install_fake_model
+
+QUESTION = "Some people think that university education should be free for everyone. Discuss both views."
+ESSAY = "It is often argued that higher education should be funded by the state. " * 10
+
+
+async def _run(n: int) -> int:
+    from core.pipeline import analyze_part2_async
+
+    results = await asyncio.gather(
+        *(analyze_part2_async(QUESTION, ESSAY + str(i)) for i in range(n)), return_exceptions=True
+    )
+    return sum(not isinstance(r, Exception) for r in results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100, help="gradings in the burst")
+    parser.add_argument("--quota", type=int, default=8, help="concurrent calls the fake server accepts")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    from core.ratelimit import get_limiter
+
+    for limited in (False, True):
+        fake = FakeChatModel(latency=args.latency, max_concurrent=args.quota)
+        install_fake_model(fake, limited=limited)
+        start = time.perf_counter()
+        ok = asyncio.run(_run(args.n))
+        wall = time.perf_counter() - start
+        label = "limiter on " if limited else "limiter off"
+        print(f"{label}: {ok}/{args.n} gradings ok, {fake.errors} 429s, wall {wall:.2f} s")
+    print(f"limiter stats: {get_limiter().stats()}")
+
+
+if __name__ == "__main__":
+    main()
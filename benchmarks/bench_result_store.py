@@ -0,0 +1,76 @@
+"""
+Grading history at scale: write cost per grading and query latency over a large store.
+
+    python -m benchmarks.bench_result_store [-n 200000] [--users 5000] [--days 365] [--queries 20]
+
+Fills a temporary store with `n` gradings spread over `days` and `users`
+(through ResultStore.record, so the rollups are maintained as in production),
+then times a user's history page, their weekly progress over the year, and
+the monthly usage report, from the rollups and from the raw gradings.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from core.results import DAY, ResultStore
+
+CRITERIA = ("task_response", "coherence_and_cohesion", "lexical_resource", "grammatical_range_and_accuracy")
+
+RAW_USAGE = (
+    "SELECT strftime('%Y-%m-01', created, 'unixepoch') AS period, task, COUNT(*) AS gradings,"
+    " SUM(cache_hit) AS cache_hits, SUM(status != 'ok') AS errors, AVG(latency_ms) AS mean_latency_ms,"
+    " SUM(llm_calls), SUM(input_tokens), SUM(output_tokens), SUM(cached_tokens)"
+    " FROM gradings WHERE created >= ? GROUP BY period, task"
+)
+
+
+def _ms(fn, n: int) -> tuple[float, float]:
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), max(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=200_000, help="gradings in the store")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--queries", type=int, default=20, help="timed runs per query")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as td:
+        store = ResultStore(Path(td) / "gradings.sqlite3")
+        start = time.perf_counter()
+        for i in range(args.n):
+            bands = {key: rng.choice((5.0, 5.5, 6.0, 6.5, 7.0, 7.5)) for key in CRITERIA}
+            store.record(task=rng.choice(("part1", "part2")), user=f"user{rng.randrange(args.users)}",
+                         mode="fanout", inputs_hash=f"{i:x}", overall_band=sum(bands.values()) / 4, bands=bands,
+                         latency_ms=rng.lognormvariate(8, 0.4), llm_calls=4, input_tokens=8000, output_tokens=1200,
+                         created=now - rng.random() * args.days * DAY)
+        write_us = (time.perf_counter() - start) * 1e6 / args.n
+        size_mb = sum(f.stat().st_size for f in Path(td).iterdir()) / 1e6
+        print(f"{args.n} gradings, {args.users} users, {args.days} days: {write_us:.0f} µs per record, "
+              f"{size_mb:.0f} MB on disk")
+
+        year = now - 365 * DAY
+        cases = {
+            "history (20 latest)": lambda: store.history("user42", "part2"),
+            "progress (weekly, 1 year)": lambda: store.progress("user42", "part2", since=year),
+            "usage (monthly, all tasks)": lambda: store.usage(bucket="month", since=year),
+            "usage from raw rows": lambda: store._db.execute(RAW_USAGE, (year,)).fetchall(),
+        }
+        for name, query in cases.items():
+            p50, worst = _ms(query, args.queries)
+            print(f"{name:28} p50 {p50:8.3f} ms | max {worst:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Tail latency with and without deadlines and hedged requests.
+
+    python -m benchmarks.bench_tail_latency [-n 400] [--tail-rate 0.03] [--tail 3]
+
+The fake model answers in `--latency` seconds, except for `--tail-rate` of
+calls that take `--tail` seconds. A fan-out grading waits for its slowest
+criterion, so without a policy its p99 is the tail. Hedging re-sends calls
+still running after the recent p95; a deadline (with graceful degradation)
+caps the wait outright at the cost of a placeholder criterion.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("RESULT_CACHE_ENABLED", "0")
+os.environ.setdefault("NODE_CACHE_ENABLED", "0")
+
+from benchmarks.fake_llm import FakeChatModel, install_fake_model
+
+QUESTION = "Some people think that university education should be free for everyone. Discuss both views."
+ESSAY = "It is often argued that higher education should be funded by the state. " * 10
+
+
+async def _run(n: int, concurrency: int) -> tuple[list[float], int]:
+    from core.pipeline import analyze_part2_async
+    from core.resilience import DEGRADED_NOTE
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, degraded = [], 0
+
+    async def one(i):
+        nonlocal degraded
+        async with semaphore:
+            start = time.perf_counter()
+            report = await analyze_part2_async(QUESTION, ESSAY + str(i))
+            latencies.append(time.perf_counter() - start)
+            degraded += DEGRADED_NOTE in report
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return latencies, degraded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=400, help="gradings")
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1, help="usual seconds per fake LLM call")
+    parser.add_argument("--tail-rate", type=float, default=0.03, help="share of slow calls")
+    parser.add_argument("--tail", type=float, default=3.0, help="seconds per slow call")
+    args = parser.parse_args()
+
+    from core.metrics import percentile
+    from core.resilience import ResilientModel
+
+    policies = {
+        "no policy": lambda fake: fake,
+        "hedged at p95": lambda fake: ResilientModel(fake, hedge=True, hedge_min_seconds=0.0,
+                                                     hedge_nodes=None, hedge_min_samples=10),
+        "deadline 0.5 s": lambda fake: ResilientModel(fake, timeout=0.5, deadline=0.5, retries=0),
+    }
+    for label, wrap in policies.items():
+        fake = FakeChatModel(latency=args.latency, tail_rate=args.tail_rate, tail_latency=args.tail, seed=7)
+        install_fake_model(fake, limited=False)
+        import core.criteria
+        core.criteria.model = wrap(fake)
+        latencies, degraded = asyncio.run(_run(args.n, args.concurrency))
+        print(f"{label:>15}: p50 {percentile(latencies, 50):.2f} s | p95 {percentile(latencies, 95):.2f} s | "
+              f"p99 {percentile(latencies, 99):.2f} s | max {max(latencies):.2f} s | "
+              f"{fake.calls} calls | {degraded} degraded reports")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Per-request workflow overhead: rebuilding the graph vs. the compile-once registry,
+and building every prompt template per call vs. the ones each rubric compiles once.
+
+    python -m benchmarks.bench_workflow_registry [-n 50]
+
+No API calls are made; only graph and prompt construction is timed.
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# The vendor model is constructed at import time and wants a key to exist.
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+
+from core.criteria import get_rubric
+from core.workflows import clear_workflows, get_workflow, write_mermaid
+from vendors.part1.main import build_workflow as build_part1
+from vendors.part2.main import build_workflow as build_part2
+
+
+def _per_call_ms(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) * 1000 / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=50, help="iterations per case")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        md = Path(td) / "Workflow.md"
+        for name, build in (("part1", build_part1), ("part2", build_part2)):
+            # What every request used to pay: build + compile + Mermaid export.
+            def rebuild(build=build):
+                write_mermaid(build(), md)
+
+            clear_workflows()
+            get_workflow(name)  # first (cold) build is paid once per process
+
+            before = _per_call_ms(rebuild, args.n)
+            after = _per_call_ms(lambda name=name: get_workflow(name), args.n)
+            print(f"{name}: rebuild per request {before:8.3f} ms | registry {after:8.4f} ms "
+                  f"| saved {before - after:8.3f} ms/request")
+
+            # The criterion nodes used to build their ChatPromptTemplate on every call.
+            rubric = get_rubric(name)
+            before = _per_call_ms(rubric._compile, args.n)
+            after = _per_call_ms(rubric.prompts, args.n)
+            print(f"{name}: prompts per call  {before:8.3f} ms | compiled {after:8.4f} ms "
+                  f"| saved {before - after:8.3f} ms/grading")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Compact vs. full prompts: tokens per grading and how closely the bands agree.
+
+    python -m benchmarks.eval_prompts [--set benchmarks/eval/task2.jsonl] [--mode fanout|fused]
+                                      [--min-agreement 0.9] [--fake]
+
+Grades every essay of the eval set twice, once with PROMPT_STYLE=full and once
+with PROMPT_STYLE=compact (caches off), and reports input/output tokens per
+grading and, per criterion and overall, the share of essays whose compact band
+is within half a band of the full one. Records with a reference "band" also
+get the mean absolute error of each style against it.
+
+Needs GOOGLE_API_KEY: it calls the real model, 2 x 4 requests per essay in
+fanout mode. With --fake it runs against benchmarks/fake_llm.py instead, which
+only measures prompt tokens (the fake answers the same whatever it is asked).
+
+Exits non-zero if compact does not use fewer tokens or agrees less than
+--min-agreement.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_SET = HERE / "eval" / "task2.jsonl"
+
+
+class _TokenCounter:
+    """Tracing listener that adds up the tokens of every LLM call."""
+
+    def __init__(self):
+        self.calls = self.input_tokens = self.output_tokens = 0
+
+    def span_started(self, span) -> None:
+        pass
+
+    def span_ended(self, span) -> None:
+        if span.name == "llm":
+            self.calls += 1
+            self.input_tokens += span.attributes.get("input_tokens") or 0
+            self.output_tokens += span.attributes.get("output_tokens") or 0
+
+
+def load_set(path: str | Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def grade_all(records: list[dict], style: str, mode: str) -> tuple[list[dict], _TokenCounter]:
+    """Bands ({criterion: band, "overall": band}) per record with PROMPT_STYLE=`style`, and the tokens spent."""
+    from core import config, tracing
+    from core.criteria import get_rubric
+    from core.workflows import get_workflow, workflow_name
+
+    config.PROMPT_STYLE = style
+    counter = _TokenCounter()
+    tracing.add_listener(counter)
+    workflow = get_workflow(workflow_name("part2", mode))
+    titles = get_rubric("part2").titles
+    results = []
+    try:
+        for record in records:
+            with tracing.span("eval.grading", style=style, essay=record.get("id")):
+                state = workflow.invoke({"original_question": record["question"], "student_essay": record["essay"]})
+            criteria = state.get("criteria") or {}
+            bands = {key: (criteria.get(key) or {}).get("band") for key in titles}
+            bands["overall"] = state.get("estimated_band_score")
+            results.append(bands)
+            print(f"  {style:<8}{record.get('id', len(results)):<10}{bands['overall']}", file=sys.stderr)
+    finally:
+        tracing.remove_listener(counter)
+    return results, counter
+
+
+def agreement(full: list[dict], compact: list[dict], within: float = 0.5) -> dict[str, float]:
+    """Per band key, the share of records where both styles gave a band and they differ by at most `within`."""
+    shares = {}
+    for key in full[0] if full else ():
+        pairs = [(f[key], c[key]) for f, c in zip(full, compact)]
+        close = sum(1 for a, b in pairs if a is not None and b is not None and abs(a - b) <= within)
+        shares[key] = close / len(pairs)
+    return shares
+
+
+def mean_abs_error(results: list[dict], records: list[dict]) -> float | None:
+    errors = [abs(r["overall"] - rec["band"]) for r, rec in zip(results, records)
+              if rec.get("band") is not None and r["overall"] is not None]
+    return sum(errors) / len(errors) if errors else None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--set", default=str(DEFAULT_SET), help="JSONL of {id, question, essay[, band]}")
+    parser.add_argument("--mode", choices=("fanout", "fused"), default="fanout")
+    parser.add_argument("--min-agreement", type=float, default=0.9,
+                        help="required share of essays with the compact band within 0.5 of the full one")
+    parser.add_argument("--fake", action="store_true", help="use the offline fake model (tokens only)")
+    args = parser.parse_args(argv)
+
+    # Both styles must really call the model.
+    os.environ["RESULT_CACHE_ENABLED"] = "0"
+    os.environ["NODE_CACHE_ENABLED"] = "0"
+    if args.fake:
+        from benchmarks.fake_llm import FakeChatModel, install_fake_model
+
+        install_fake_model(FakeChatModel(latency=0))
+    elif not os.getenv("GOOGLE_API_KEY"):
+        sys.exit("GOOGLE_API_KEY is not set (or pass --fake for a token-only dry run)")
+
+    records = load_set(args.set)
+    full, full_tokens = grade_all(records, "full", args.mode)
+    compact, compact_tokens = grade_all(records, "compact", args.mode)
+
+    n = len(records)
+    print(f"{n} essays, {args.mode} mode")
+    print(f"{'':<22}{'full':>10}{'compact':>10}{'change':>9}")
+    for label, attr in (("input tokens/grading", "input_tokens"), ("output tokens/grading", "output_tokens")):
+        before, after = getattr(full_tokens, attr) / n, getattr(compact_tokens, attr) / n
+        change = f"{after / before - 1:+.0%}" if before else "n/a"
+        print(f"{label:<22}{before:>10.0f}{after:>10.0f}{change:>9}")
+    print(f"{'LLM calls/grading':<22}{full_tokens.calls / n:>10.1f}{compact_tokens.calls / n:>10.1f}")
+
+    shares = agreement(full, compact)
+    print("\nbands within 0.5 of full:")
+    for key, share in shares.items():
+        print(f"  {key:<34}{share:>6.0%}")
+    diffs = [c["overall"] - f["overall"] for f, c in zip(full, compact)
+             if f["overall"] is not None and c["overall"] is not None]
+    if diffs:
+        print(f"  mean overall difference (compact - full): {sum(diffs) / len(diffs):+.2f}")
+    for style, results in (("full", full), ("compact", compact)):
+        error = mean_abs_error(results, records)
+        if error is not None:
+            print(f"  {style} vs reference bands: mean abs error {error:.2f}")
+
+    failures = []
+    total_full = full_tokens.input_tokens + full_tokens.output_tokens
+    total_compact = compact_tokens.input_tokens + compact_tokens.output_tokens
+    if total_compact >= total_full:
+        failures.append(f"compact used {total_compact} tokens, full {total_full}")
+    if not args.fake and min(shares.values(), default=1.0) < args.min_agreement:
+        failures.append(f"agreement below {args.min_agreement:.0%}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+A local stand-in for the Gemini chat model, for benchmarks and tests.
+
+It never touches the network: every call sleeps for `latency` seconds
+(time.sleep for invoke, asyncio.sleep for ainvoke) and returns `response`,
+or the response of the first `rules` entry whose marker appears in the prompt.
+When streamed, the response arrives word by word after the same delay.
+With `error_rate` > 0, that share of calls fails with a 429 (FakeRateLimitError)
+instead, and with `max_concurrent` > 0 any call beyond that many in flight does
+too (like a server-side quota), to exercise the client-side limiter.
+With `tail_rate` > 0, that share of calls takes `tail_latency` instead of
+`latency` (a slow tail, for timeouts and hedged requests).
+With `latency_sigma` > 0, delays are log-normal around `latency` (same mean)
+instead of constant, and with `server_error_rate` > 0 that share of calls
+fails with a 503 (FakeServerError), which the retry policy retries.
+
+`recording` replays real answers: graph node -> list of responses, taken in
+turn (see load_recording / RecordingModel). Nodes without a recording fall
+back to `rules` and `response`. All randomness comes from `seed`.
+
+It also counts calls and approximate input tokens (text chars / 4, plus a
+flat 258 tokens per image, which is what Gemini bills for a small image).
+With `prefill_seconds_per_1k` > 0, every 1000 input tokens that are not read
+from a context cache add that much to the delay (the model reading the prompt
+before its first token).
+
+FakeCacheService stands in for Gemini's cachedContents API (see
+core/context_cache.py): give the same one to FakeChatModel(cache_service=...)
+and to install_fake_model(..., context_cache=...), and requests sent with
+`cached_content=<name>` get that system prompt from it, are billed the cached
+part as `cache_read`, and fail like Gemini (403 "CachedContent not found")
+once it has expired or been deleted.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig
+from pydantic import Field, PrivateAttr
+
+DEFAULT_RESPONSE = """**1. What You Did Well:**
+* Clear position and relevant ideas.
+
+**2. What You Could Have Done Better:**
+* Some points lack support.
+
+**6. Final Score:**
+Final Score: 6"""
+
+CRITERION_JSON_RESPONSE = json.dumps({
+    "report": DEFAULT_RESPONSE,
+    "strengths": ["Clear position and relevant ideas."],
+    "weaknesses": ["Some points lack support."],
+    "examples": [{"original": "Many people thinks so.", "improved": "Many people think so."}],
+    "band": 6,
+})
+FUSED_RESPONSE = "{" + ", ".join(
+    f'"{key}": {CRITERION_JSON_RESPONSE}'
+    for key in ("task_response", "coherence_and_cohesion", "lexical_resource", "grammatical_range_and_accuracy")
+) + "}"
+
+# Marker -> response, checked in order against the whole prompt text (the fused prompt has both markers).
+DEFAULT_RULES = [("with exactly these keys", FUSED_RESPONSE), ("=== OUTPUT FORMAT ===", CRITERION_JSON_RESPONSE)]
+IMAGE_TOKENS = 258
+
+
+def _prompt_parts(messages) -> tuple[str, int]:
+    texts, images = [], 0
+    for message in messages:
+        content = message.content
+        if isinstance(content, str):
+            texts.append(content)
+            continue
+        for part in content:
+            if isinstance(part, str):
+                texts.append(part)
+            elif part.get("type") == "image_url":
+                images += 1
+            else:
+                texts.append(part.get("text", ""))
+    return "\n".join(texts), images
+
+
+class FakeRateLimitError(Exception):
+    """What the fake raises instead of Google's ResourceExhausted."""
+    code = 429
+
+
+class FakeServerError(Exception):
+    """What the fake raises instead of Google's ServiceUnavailable."""
+    code = 503
+
+
+def load_recording(path: str | Path) -> dict[str, list[str]]:
+    """Node -> responses from a JSONL file of {"node": ..., "response": ...} lines."""
+    recording: dict[str, list[str]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                recording.setdefault(row["node"], []).append(row["response"])
+    return recording
+
+
+class FakeCacheNotFound(Exception):
+    code = 403
+
+
+class FakeCacheService:
+    """In-memory cachedContents: name -> system prompt, with a TTL on `clock`."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.caches: dict[str, tuple[str, float]] = {}
+        self.counts = {"created": 0, "refreshed": 0, "deleted": 0}
+        self._lock = threading.Lock()
+
+    def create(self, model: str, system: str, ttl: float) -> str:
+        with self._lock:
+            self.counts["created"] += 1
+            name = f"cachedContents/fake-{self.counts['created']}"
+            self.caches[name] = (system, self.clock() + ttl)
+        return name
+
+    def refresh(self, name: str, ttl: float) -> None:
+        with self._lock:
+            system, _ = self._live(name)
+            self.caches[name] = (system, self.clock() + ttl)
+            self.counts["refreshed"] += 1
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self.caches.pop(name, None)
+            self.counts["deleted"] += 1
+
+    def expire_all(self) -> None:
+        with self._lock:
+            self.caches.clear()
+
+    def _live(self, name: str) -> tuple[str, float]:
+        cached = self.caches.get(name)
+        if cached is None or cached[1] <= self.clock():
+            raise FakeCacheNotFound(f"403 CachedContent not found (or permission denied): {name} (fake)")
+        return cached
+
+    def get(self, name: str) -> str:
+        with self._lock:
+            return self._live(name)[0]
+
+
+class FakeChatModel(BaseChatModel):
+    response: str = DEFAULT_RESPONSE
+    rules: list = Field(default_factory=lambda: list(DEFAULT_RULES))
+    recording: dict = Field(default_factory=dict)
+    latency: float = 0.0
+    latency_sigma: float = 0.0
+    tail_rate: float = 0.0
+    tail_latency: float = 0.0
+    error_rate: float = 0.0
+    server_error_rate: float = 0.0
+    prefill_seconds_per_1k: float = 0.0
+    cache_service: Any = None
+    max_concurrent: int = 0
+    seed: int = 0
+    calls: int = 0
+    errors: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    _rng: random.Random = PrivateAttr(default=None)
+    _active: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _replayed: dict = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, context: Any, /) -> None:
+        self._rng = random.Random(self.seed)
+
+    def _enter(self) -> None:
+        with self._lock:
+            over = self.max_concurrent and self._active >= self.max_concurrent
+            if over or (self.error_rate and self._rng.random() < self.error_rate):
+                self.errors += 1
+                raise FakeRateLimitError("429 RESOURCE_EXHAUSTED (fake)")
+            if self.server_error_rate and self._rng.random() < self.server_error_rate:
+                self.errors += 1
+                raise FakeServerError("503 UNAVAILABLE (fake)")
+            self._active += 1
+
+    def _delay(self) -> float:
+        with self._lock:
+            if self.tail_rate and self._rng.random() < self.tail_rate:
+                return self.tail_latency
+            if self.latency_sigma:
+                sigma = self.latency_sigma
+                return self.latency * math.exp(self._rng.gauss(-sigma * sigma / 2, sigma))
+        return self.latency
+
+    def _exit(self) -> None:
+        with self._lock:
+            self._active -= 1
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-ielts"
+
+    def _replay(self, node: str | None) -> str | None:
+        responses = self.recording.get(node)
+        if not responses:
+            return None
+        with self._lock:
+            i = self._replayed.get(node, 0)
+            self._replayed[node] = i + 1
+        return responses[i % len(responses)]
+
+    def _cached_prompt(self, cached_content: str | None) -> str:
+        """The system prompt a request's cached_content refers to (raises like Gemini if it is gone)."""
+        if not cached_content:
+            return ""
+        if self.cache_service is None:
+            raise FakeCacheNotFound(f"403 CachedContent not found: {cached_content} (fake)")
+        return self.cache_service.get(cached_content)
+
+    def _prefill(self, messages) -> float:
+        if not self.prefill_seconds_per_1k:
+            return 0.0
+        text, images = _prompt_parts(messages)
+        return (len(text) // 4 + images * IMAGE_TOKENS) / 1000 * self.prefill_seconds_per_1k
+
+    def _result(self, messages, run_manager=None, cached: str = "") -> ChatResult:
+        text, images = _prompt_parts(messages)
+        self.calls += 1
+        cached_tokens = len(cached) // 4
+        input_tokens = len(text) // 4 + images * IMAGE_TOKENS + cached_tokens
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached_tokens
+        text = f"{cached}\n{text}" if cached else text
+        node = (getattr(run_manager, "metadata", None) or {}).get("langgraph_node")
+        content = self._replay(node)
+        if content is None:
+            content = next((response for marker, response in self.rules if marker in text), self.response)
+        usage = {"input_tokens": input_tokens, "output_tokens": len(content) // 4,
+                 "total_tokens": input_tokens + len(content) // 4}
+        if cached_tokens:
+            usage["input_token_details"] = {"cache_read": cached_tokens}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content, usage_metadata=usage))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        cached = self._cached_prompt(kwargs.get("cached_content"))
+        self._enter()
+        try:
+            if delay := self._delay() + self._prefill(messages):
+                time.sleep(delay)
+            return self._result(messages, run_manager, cached)
+        finally:
+            self._exit()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        cached = self._cached_prompt(kwargs.get("cached_content"))
+        self._enter()
+        try:
+            if delay := self._delay() + self._prefill(messages):
+                await asyncio.sleep(delay)
+            return self._result(messages, run_manager, cached)
+        finally:
+            self._exit()
+
+    def _chunks(self, messages, run_manager=None, cached: str = ""):
+        message = self._result(messages, run_manager, cached).generations[0].message
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            usage = message.usage_metadata if i == len(words) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=(" " if i else "") + word, usage_metadata=usage))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        cached = self._cached_prompt(kwargs.get("cached_content"))
+        self._enter()
+        try:
+            if delay := self._delay() + self._prefill(messages):
+                time.sleep(delay)
+            chunks = list(self._chunks(messages, run_manager, cached))
+        finally:
+            self._exit()
+        for chunk in chunks:
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        cached = self._cached_prompt(kwargs.get("cached_content"))
+        self._enter()
+        try:
+            if delay := self._delay() + self._prefill(messages):
+                await asyncio.sleep(delay)
+            chunks = list(self._chunks(messages, run_manager, cached))
+        finally:
+            self._exit()
+        for chunk in chunks:
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def install_fake_model(fake: BaseChatModel, limited: bool = True, context_cache=None) -> None:
+    """
+    Points the grading nodes (core.criteria) at `fake` instead of the real model, behind the
+    shared rate limiter and retry policy like the real one (unless `limited=False`).
+    With `context_cache` (a core.context_cache.ContextCache, e.g. on a
+    FakeCacheService), static system prompts are sent by cache reference.
+    """
+    # The UI handlers refuse to grade without a key.
+    os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+    import core.criteria
+    from core.ratelimit import rate_limited
+    from core.resilience import resilient
+
+    if context_cache is not None:
+        from core.context_cache import ContextCachedModel
+
+        fake = ContextCachedModel(fake, context_cache)
+    model = resilient(rate_limited(fake)) if limited else fake
+    core.criteria.model = model
+
+
+class RecordingModel(Runnable):
+    """
+    Passes calls through to `model` and appends {"node", "response"} for each answer
+    to `path`, to be replayed later with FakeChatModel(recording=load_recording(path)).
+    """
+
+    def __init__(self, model, path: str | Path):
+        self.bound = model
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _record(self, config: RunnableConfig | None, result):
+        node = ((config or {}).get("metadata") or {}).get("langgraph_node", "")
+        line = json.dumps({"node": node, "response": result.content}, ensure_ascii=False)
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        return result
+
+    def invoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        return self._record(config, self.bound.invoke(input, config, **kwargs))
+
+    async def ainvoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        return self._record(config, await self.bound.ainvoke(input, config, **kwargs))
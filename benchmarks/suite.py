@@ -0,0 +1,296 @@
+"""
+Offline benchmark suite: every grading entry point, end to end, against the fake model.
+
+    python -m benchmarks.suite [-n 200] [-c 16] [--latency 0.2] [--sigma 0.5]
+                               [--error-rate 0] [--server-error-rate 0]
+                               [--recording benchmarks/recordings/sample.jsonl]
+                               [--scenarios pipeline_part2 ui_part2 ...]
+                               [--out results.json] [--baseline results.json --tolerance 0.25]
+
+Scenarios drive core.pipeline.analyze_part1/2 (sync from a thread pool, and
+async), core.batch.grade_batch, and the Gradio handlers in app.ui. Each one
+runs in a fresh interpreter, so its peak RSS is its own, and reports
+throughput, p50/p95/p99 latency per grading, CPU time per grading and peak
+RSS. LLM calls go to benchmarks.fake_llm (replayed responses, log-normal
+latency, optional 429/503 errors), so nothing touches the network and runs
+with the same --seed are comparable.
+
+With --baseline (an earlier --out file), the suite exits non-zero when a
+scenario's throughput, p95, CPU per grading or peak RSS is worse than the
+baseline by more than --tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_RECORDING = HERE / "recordings" / "sample.jsonl"
+
+QUESTION = "Some people think that university education should be free for everyone. Discuss both views."
+ESSAY = "It is often argued that higher education should be funded by the state. " * 10
+TASK1_ESSAY = "The chart shows how household spending changed between 1990 and 2010 in three countries. " * 4
+
+
+def _env() -> None:
+    # Every grading is different, but measure the graph, not the caches or the quota.
+    os.environ.setdefault("RESULT_CACHE_ENABLED", "0")
+    os.environ.setdefault("NODE_CACHE_ENABLED", "0")
+    os.environ.setdefault("RESULT_STORE_ENABLED", "0")
+    os.environ.setdefault("LLM_RPM", "0")
+    os.environ.setdefault("LLM_TPM", "0")
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", "100000")
+    os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+
+
+def _image(folder: Path) -> Path:
+    from PIL import Image, ImageDraw
+
+    path = folder / "chart.png"
+    image = Image.new("RGB", (800, 500), "white")
+    draw = ImageDraw.Draw(image)
+    for i, height in enumerate((120, 260, 340, 180, 300)):
+        draw.rectangle((80 + i * 140, 450 - height, 160 + i * 140, 450), fill=(40 + i * 40, 90, 160))
+    image.save(path)
+    return path
+
+
+# --- scenarios: each grades n essays with at most c in flight and returns the latencies ---
+
+def _threaded(n: int, c: int, grade) -> tuple[list[float], int]:
+    latencies, errors = [], 0
+
+    def one(i):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            grade(i)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=c) as pool:
+        list(pool.map(one, range(n)))
+    return latencies, errors
+
+
+def _concurrent(n: int, c: int, grade) -> tuple[list[float], int]:
+    latencies, errors = [], 0
+
+    async def run():
+        semaphore = asyncio.Semaphore(c)
+
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await grade(i)
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(one(i) for i in range(n)))
+
+    asyncio.run(run())
+    return latencies, errors
+
+
+def pipeline_part1(n, c, folder):
+    from core.pipeline import analyze_part1
+
+    image = _image(folder)
+    return _threaded(n, c, lambda i: analyze_part1(image, f"{TASK1_ESSAY} ({i})"))
+
+
+def pipeline_part2(n, c, folder):
+    from core.pipeline import analyze_part2
+
+    return _threaded(n, c, lambda i: analyze_part2(QUESTION, f"{ESSAY} ({i})"))
+
+
+def pipeline_part1_async(n, c, folder):
+    from core.pipeline import analyze_part1_async
+
+    image = _image(folder)
+    return _concurrent(n, c, lambda i: analyze_part1_async(image, f"{TASK1_ESSAY} ({i})"))
+
+
+def pipeline_part2_async(n, c, folder):
+    from core.pipeline import analyze_part2_async
+
+    return _concurrent(n, c, lambda i: analyze_part2_async(QUESTION, f"{ESSAY} ({i})"))
+
+
+def batch(n, c, folder):
+    from core.batch import grade_batch, normalize_record
+
+    image = _image(folder)
+    records = [
+        normalize_record({"task": "part1", "image": str(image), "essay": f"{TASK1_ESSAY} ({i})"}) if i % 2
+        else normalize_record({"task": "part2", "question": QUESTION, "essay": f"{ESSAY} ({i})"})
+        for i in range(n)
+    ]
+    stats = asyncio.run(grade_batch(records, folder / "results.jsonl", concurrency=c, resume=False))
+    return stats.latencies, stats.failed
+
+
+def _drain_handler(handler, *args):
+    async def run():
+        async for _ in handler(*args):
+            pass
+    return run()
+
+
+def ui_part1(n, c, folder):
+    from app.ui import on_analyze_part1
+
+    image = str(_image(folder))
+    return _concurrent(n, c, lambda i: _drain_handler(on_analyze_part1, image, f"{TASK1_ESSAY} ({i})"))
+
+
+def ui_part2(n, c, folder):
+    from app.ui import on_analyze_part2
+
+    return _concurrent(n, c, lambda i: _drain_handler(on_analyze_part2, QUESTION, f"{ESSAY} ({i})"))
+
+
+SCENARIOS = {f.__name__: f for f in (pipeline_part1, pipeline_part2, pipeline_part1_async, pipeline_part2_async,
+                                     batch, ui_part1, ui_part2)}
+
+
+def _peak_rss_mb(usage) -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_one(name: str, args) -> dict:
+    """Runs one scenario in this process (normally a fresh one) and returns its numbers."""
+    _env()
+    from benchmarks.fake_llm import FakeChatModel, install_fake_model, load_recording
+    from core.metrics import percentile
+
+    fake = FakeChatModel(
+        latency=args.latency, latency_sigma=args.sigma, error_rate=args.error_rate,
+        server_error_rate=args.server_error_rate, seed=args.seed,
+        recording=load_recording(args.recording) if args.recording else {},
+    )
+    install_fake_model(fake)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Warm-up (imports, graph compilation) is not what we are measuring.
+        SCENARIOS[name](1, 1, Path(tmp))
+        calls = fake.calls
+        before = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        latencies, errors = SCENARIOS[name](args.n, args.concurrency, Path(tmp))
+        wall = time.perf_counter() - start
+        after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return {
+        "scenario": name,
+        "n": args.n,
+        "errors": errors,
+        "llm_calls": fake.calls - calls,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(args.n / wall, 3),
+        **{f"p{p}_s": round(percentile(latencies, p), 4) for p in (50, 95, 99)},
+        "cpu_s": round(cpu, 3),
+        "cpu_ms_per_grading": round(cpu * 1000 / args.n, 2),
+        "peak_rss_mb": round(_peak_rss_mb(after), 1),
+    }
+
+
+def _child_args(args) -> list[str]:
+    argv = ["-n", str(args.n), "-c", str(args.concurrency), "--latency", str(args.latency),
+            "--sigma", str(args.sigma), "--error-rate", str(args.error_rate),
+            "--server-error-rate", str(args.server_error_rate), "--seed", str(args.seed)]
+    return argv + ["--recording", args.recording or ""]
+
+
+# Higher is better for throughput only.
+_CHECKS = {"throughput_per_s": -1, "p95_s": 1, "cpu_ms_per_grading": 1, "peak_rss_mb": 1}
+
+
+def regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Human-readable regressions of `results` against `baseline` beyond `tolerance` (0.25 = 25 %)."""
+    old = {r["scenario"]: r for r in baseline}
+    found = []
+    for result in results:
+        base = old.get(result["scenario"])
+        if base is None:
+            continue
+        for key, direction in _CHECKS.items():
+            before, now = base.get(key), result.get(key)
+            if not before or now is None:
+                continue
+            change = (now - before) / before * direction
+            if change > tolerance:
+                found.append(f"{result['scenario']}: {key} {before} -> {now} ({change:+.0%} worse)")
+    return found
+
+
+def _table(results: list[dict]) -> str:
+    header = (f"{'scenario':<22}{'n':>6}{'err':>5}{'grad/s':>9}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}"
+              f"{'cpu ms/grad':>13}{'peak MB':>9}")
+    rows = [header]
+    for r in results:
+        rows.append(f"{r['scenario']:<22}{r['n']:>6}{r['errors']:>5}{r['throughput_per_s']:>9.1f}"
+                    f"{r['p50_s']:>8.3f}{r['p95_s']:>8.3f}{r['p99_s']:>8.3f}"
+                    f"{r['cpu_ms_per_grading']:>13.1f}{r['peak_rss_mb']:>9.0f}")
+    return "\n".join(rows)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=200, help="gradings per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="mean seconds per fake LLM call")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of the latency (0: constant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with a 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="share of calls answered with a 503")
+    parser.add_argument("--recording", default=str(DEFAULT_RECORDING), help="JSONL of recorded responses to replay")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--out", help="write the results as JSON here")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--run-one", choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one, args)))
+        return
+
+    results = []
+    for name in args.scenarios:
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", "--run-one", name, *_child_args(args)],
+            capture_output=True, text=True, check=False,
+        )
+        if child.returncode:
+            sys.exit(f"{name} failed:\n{child.stderr[-2000:]}")
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+        print(f"{name}: done in {results[-1]['wall_s']} s", file=sys.stderr)
+
+    print(_table(results))
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        found = regressions(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Batch grading for whole class sets.
+
+Reads essays from a JSONL or CSV file, grades them with bounded concurrency
+through the async pipeline, and appends one JSON line per essay to the output
+file as soon as it is graded. Rerunning with the same output file resumes:
+essays already graded successfully are skipped, failed ones are retried.
+
+Each input record has an `essay` and either a `question` (Task 2) or an
+`image` / `image_path` (Task 1); `task` ("part1"/"part2") and `id` are
+optional. Relative image paths are resolved against the input file's folder.
+
+    python -m core.batch essays.jsonl -o results.jsonl --concurrency 8
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TextIO
+
+from core.metrics import percentile
+from core.results import capture_grading
+
+logger = logging.getLogger(__name__)
+
+def _record_id(record: dict) -> str:
+    """Stable id from the record content, so resume works even if rows are reordered."""
+    h = hashlib.sha256()
+    for name in ("task", "question", "image", "essay"):
+        h.update(f"{name}\0{record.get(name) or ''}\0".encode())
+    return h.hexdigest()[:16]
+
+
+def normalize_record(raw: dict, base_dir: Path | None = None) -> dict:
+    """Validates one input row and fills in `task`, `image` and `id`."""
+    record = {k: (v.strip() if isinstance(v, str) else v) for k, v in raw.items() if v not in (None, "")}
+    image = record.pop("image_path", None) or record.get("image")
+    if image:
+        path = Path(image)
+        if not path.is_absolute() and base_dir is not None and not path.exists():
+            path = base_dir / path
+        record["image"] = str(path)
+
+    task = record.get("task") or ("part1" if image else "part2")
+    if task not in ("part1", "part2"):
+        raise ValueError(f"unknown task {task!r} (expected part1 or part2)")
+    if not record.get("essay"):
+        raise ValueError("record has no essay")
+    if task == "part1" and not image:
+        raise ValueError("part1 record has no image")
+    if task == "part2" and not record.get("question"):
+        raise ValueError("part2 record has no question")
+    record["task"] = task
+    record["id"] = str(record.get("id") or _record_id(record))
+    return record
+
+
+def load_records(path: str | Path) -> list[dict]:
+    """Reads a .jsonl or .csv file of essays; rows that fail validation are logged and skipped."""
+    path = Path(path)
+    with path.open(newline="", encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    records, seen = [], set()
+    for n, row in enumerate(rows, start=1):
+        try:
+            record = normalize_record(row, base_dir=path.parent)
+        except ValueError as e:
+            logger.warning("Batch: skipping row %d of %s: %s", n, path, e)
+            continue
+        if record["id"] in seen:
+            logger.warning("Batch: skipping row %d of %s: duplicate id %s", n, path, record["id"])
+            continue
+        seen.add(record["id"])
+        records.append(record)
+    return records
+
+
+def completed_ids(out_path: str | Path) -> set[str]:
+    """Ids that already have a successful result in `out_path` (torn last lines are ignored)."""
+    out_path = Path(out_path)
+    done = set()
+    if not out_path.exists():
+        return done
+    with out_path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if row.get("status") == "ok":
+                done.add(row.get("id"))
+    return done
+
+
+@dataclass
+class BatchStats:
+    total: int = 0
+    skipped: int = 0
+    ok: int = 0
+    failed: int = 0
+    wall_seconds: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Graded essays per second (successes and failures)."""
+        return (self.ok + self.failed) / self.wall_seconds if self.wall_seconds else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "ok": self.ok,
+            "failed": self.failed,
+            "wall_s": round(self.wall_seconds, 3),
+            "throughput_per_s": round(self.throughput, 3),
+            **{
+                f"p{p}_s": round(percentile(self.latencies, p), 3) if self.latencies else None
+                for p in (50, 90, 95, 99)
+            },
+        }
+
+
+async def grade_record(record: dict, mode: str | None = None) -> str:
+    """Grades one normalized record through the async pipeline and returns the Markdown report."""
+    from core.pipeline import analyze_part1_async, analyze_part2_async
+
+    if record["task"] == "part1":
+        return await analyze_part1_async(record["image"], record["essay"], mode)
+    return await analyze_part2_async(record["question"], record["essay"], mode)
+
+
+def _open_output(out_path: Path, resume: bool) -> TextIO:
+    """Opens the results file for appending (emptied unless resuming), on a fresh line."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if not resume:
+        out_path.write_text("")
+    # A crash can leave a torn last line; start on a fresh one.
+    torn = False
+    if out_path.exists() and out_path.stat().st_size:
+        with out_path.open("rb") as f:
+            f.seek(-1, 2)
+            torn = f.read(1) != b"\n"
+    out = out_path.open("a", encoding="utf-8")
+    if torn:
+        out.write("\n")
+    return out
+
+
+def _append(out: TextIO, line: str) -> None:
+    out.write(line)
+    out.flush()
+
+
+async def grade_batch(
+    records: list[dict],
+    out_path: str | Path,
+    *,
+    concurrency: int = 4,
+    mode: str | None = None,
+    resume: bool = True,
+    grade: Callable[[dict, str | None], Awaitable[str]] = grade_record,
+) -> BatchStats:
+    """
+    Grades `records` with at most `concurrency` in flight, appending each result to `out_path`.
+
+    With `resume`, records that already have an "ok" line in `out_path` are skipped.
+    """
+    out_path = Path(out_path)
+    stats = BatchStats(total=len(records))
+    # File I/O runs in threads, off the event loop that drives the gradings.
+    if resume:
+        done = await asyncio.to_thread(completed_ids, out_path)
+        todo = [r for r in records if r["id"] not in done]
+        stats.skipped = len(records) - len(todo)
+    else:
+        todo = records
+    logger.info("Batch: %d to grade, %d already done", len(todo), stats.skipped)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    write_lock = asyncio.Lock()
+    started = time.perf_counter()
+    out = await asyncio.to_thread(_open_output, out_path, resume)
+    try:
+        async def run(record: dict) -> None:
+            async with semaphore:
+                t0 = time.perf_counter()
+                row = {"id": record["id"], "task": record["task"]}
+                try:
+                    with capture_grading() as grading:
+                        report = await grade(record, mode)
+                except Exception as e:
+                    logger.exception("Batch: %s failed", record["id"])
+                    row.update(status="error", error=f"{type(e).__name__}: {e}")
+                    stats.failed += 1
+                else:
+                    row.update(status="ok", band=grading.get("overall_band"), bands=grading.get("bands"),
+                               report=report)
+                    stats.ok += 1
+                latency = time.perf_counter() - t0
+                stats.latencies.append(latency)
+                row["latency_s"] = round(latency, 3)
+                async with write_lock:  # one line at a time
+                    await asyncio.to_thread(_append, out, json.dumps(row, ensure_ascii=False) + "\n")
+                logger.info("Batch: %s %s in %.2f s (%d/%d)", record["id"], row["status"], latency,
+                            stats.ok + stats.failed, len(todo))
+
+        await asyncio.gather(*(run(r) for r in todo))
+    finally:
+        await asyncio.to_thread(out.close)
+    stats.wall_seconds = time.perf_counter() - started
+    return stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    from core import config
+    from core.logging_config import configure_logging
+    from core.observability import init_observability
+
+    parser = argparse.ArgumentParser(prog="python -m core.batch", description="Grade a JSONL/CSV file of essays.")
+    parser.add_argument("input", help="Essays (.jsonl or .csv)")
+    parser.add_argument("-o", "--out", help="Results JSONL (default: <input>.results.jsonl)")
+    parser.add_argument("-c", "--concurrency", type=int, default=config.BATCH_CONCURRENCY)
+    parser.add_argument("--mode", choices=("fanout", "fused"), help="Grading mode (default: GRADING_MODE)")
+    parser.add_argument("--no-resume", action="store_true", help="Start over instead of skipping graded essays")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    init_observability()
+    records = load_records(args.input)
+    out = args.out or str(Path(args.input).with_suffix(".results.jsonl"))
+    stats = asyncio.run(grade_batch(
+        records, out, concurrency=args.concurrency, mode=args.mode, resume=not args.no_resume
+    ))
+    print(json.dumps(stats.summary()))
+
+
+if __name__ == "__main__":
+    main()
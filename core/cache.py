@@ -0,0 +1,390 @@
+"""
+Content-addressed caches.
+
+ResultCache holds finished gradings in two tiers:
+  * an in-memory LRU (per process), and
+  * an optional SQLite file shared by every process that points at it.
+
+Entries expire after `ttl` seconds; the disk tier is trimmed least recently
+used first once it grows past `max_entries` rows or `max_bytes` of payload.
+
+SqliteNodeCache is a LangGraph cache backend that memoizes individual graph
+nodes (see Rubric.cache_policies in core/criteria.py); past `max_entries`
+rows it drops the oldest written first. MemoryNodeCache is the in-process
+one. Neither stores degraded node outputs.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+from langgraph.cache.base import BaseCache, FullKey, Namespace
+from langgraph.cache.memory import InMemoryCache
+
+from core.db import connect as _connect
+from core.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_essay(text: str) -> str:
+    """Canonical form of an essay for hashing: NFC, trimmed, whitespace collapsed."""
+    return _WS_RE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def make_key(
+    task: str,
+    essay: str,
+    *,
+    question: str | None = None,
+    image_bytes: bytes | None = None,
+    model_name: str = "",
+    temperature: float | None = None,
+    prompt_version: str = "",
+    extra: str = "",
+) -> str:
+    """Hashes everything that can change a grading into a single hex key."""
+    h = hashlib.sha256()
+
+    def part(label: str, value: bytes) -> None:
+        h.update(label.encode())
+        h.update(len(value).to_bytes(8, "big"))
+        h.update(value)
+
+    part("task", task.encode())
+    part("essay", normalize_essay(essay).encode())
+    if question is not None:
+        part("question", normalize_essay(question).encode())
+    if image_bytes is not None:
+        part("image", hashlib.sha256(image_bytes).digest())
+    part("model", model_name.encode())
+    part("temperature", repr(temperature).encode())
+    part("prompt", prompt_version.encode())
+    part("extra", extra.encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        *,
+        ttl: float | None = 7 * 24 * 3600,
+        memory_entries: int = 256,
+        max_entries: int = 10_000,
+        max_bytes: int = 200_000_000,
+    ):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        # Running row count and payload bytes of the disk tier, so a set does not
+        # scan the table; None until first needed and after a purge or clear.
+        self._totals: list[int] | None = None
+        self._purged = 0.0
+        if path:
+            self._db = _connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results(accessed)")
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def _remember(self, key: str, created: float, value: str) -> None:
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._expired(created, now):
+                        self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+                        self._remember(key, created, value)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                size = len(value.encode())
+                old = self._db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now),
+                )
+                if self._totals is not None:
+                    self._totals[0] += old is None
+                    self._totals[1] += size - (old[0] if old else 0)
+                self._evict(now)
+
+    def _count(self) -> list[int]:
+        return list(self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone())
+
+    def _evict(self, now: float) -> None:
+        db = self._db
+        # Once a minute: purge expired rows (get never serves them anyway) and
+        # recount, which also picks up rows written by other processes.
+        if now - self._purged > 60:
+            self._purged = now
+            if self.ttl is not None:
+                self.evictions += db.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,)).rowcount
+            self._totals = None
+        if self._totals is None:
+            self._totals = self._count()
+        count, total = self._totals
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Other processes write and evict too: recount before dropping anything.
+        count, total = self._totals = self._count()
+        while count > self.max_entries or total > self.max_bytes:
+            # Drop the least recently used tenth (at least one row) per round.
+            batch = max(1, count // 10, count - self.max_entries)
+            rows = db.execute("SELECT key, size FROM results ORDER BY accessed LIMIT ?", (batch,)).fetchall()
+            if not rows:
+                break
+            db.executemany("DELETE FROM results WHERE key = ?", [(k,) for k, _ in rows])
+            self.evictions += len(rows)
+            count -= len(rows)
+            total -= sum(size for _, size in rows)
+        self._totals = [count, total]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._totals = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+def _cacheable(writes) -> bool:
+    """Node outputs that replaced a failure with a placeholder must not be memoized."""
+    return not any(channel == "degraded" for channel, _ in writes)
+
+
+def _count_lookups(keys: Sequence[FullKey], found: dict) -> dict:
+    CACHE_REQUESTS.inc(len(found), cache="node", result="hit")
+    CACHE_REQUESTS.inc(len(keys) - len(found), cache="node", result="miss")
+    return found
+
+
+class SqliteNodeCache(BaseCache):
+    """LangGraph node cache stored in SQLite, so memoized nodes survive restarts."""
+
+    def __init__(self, path: str | Path, *, max_entries: int = 50_000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Running row count, as in ResultCache: None until first needed and after a purge or clear.
+        self._count: int | None = None
+        self._purged = 0.0
+        self._db = _connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS node_cache ("
+            " ns TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " enc TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " expiry REAL,"
+            " PRIMARY KEY (ns, key))"
+        )
+
+    @staticmethod
+    def _ns(ns: Namespace) -> str:
+        return "/".join(ns)
+
+    def get(self, keys: Sequence[FullKey]) -> dict:
+        now = time.time()
+        values = {}
+        with self._lock:
+            for ns, key in keys:
+                row = self._db.execute(
+                    "SELECT enc, value, expiry FROM node_cache WHERE ns = ? AND key = ?", (self._ns(ns), key)
+                ).fetchone()
+                if row is None:
+                    continue
+                enc, value, expiry = row
+                if expiry is not None and expiry <= now:
+                    self._db.execute("DELETE FROM node_cache WHERE ns = ? AND key = ?", (self._ns(ns), key))
+                    continue
+                values[(ns, key)] = self.serde.loads_typed((enc, value))
+        return _count_lookups(keys, values)
+
+    # sqlite3 blocks, so the async API runs it on a worker thread instead of the event loop.
+    async def aget(self, keys: Sequence[FullKey]) -> dict:
+        return await asyncio.to_thread(self.get, keys)
+
+    def set(self, pairs: Mapping) -> None:
+        now = time.time()
+        rows = []
+        for (ns, key), (value, ttl) in pairs.items():
+            if not _cacheable(value):
+                continue
+            enc, data = self.serde.dumps_typed(value)
+            rows.append((self._ns(ns), key, enc, data, now + ttl if ttl is not None else None))
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO node_cache (ns, key, enc, value, expiry) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            if self._count is not None:
+                # Replaced rows are over-counted, which only brings the recount forward.
+                self._count += len(rows)
+            self._evict(now)
+
+    def _rows(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM node_cache").fetchone()[0]
+
+    def _evict(self, now: float) -> None:
+        db = self._db
+        # Once a minute: purge expired rows and recount (other processes write too).
+        if now - self._purged > 60:
+            self._purged = now
+            self.evictions += db.execute("DELETE FROM node_cache WHERE expiry <= ?", (now,)).rowcount
+            self._count = None
+        if self._count is None:
+            self._count = self._rows()
+        if self._count <= self.max_entries:
+            return
+        self._count = self._rows()
+        if self._count > self.max_entries:
+            # Down to nine tenths of the limit, so the next sweep is a while away.
+            # INSERT OR REPLACE gives a rewritten row a new rowid: lowest rowid = oldest write.
+            batch = self._count - self.max_entries * 9 // 10
+            deleted = db.execute(
+                "DELETE FROM node_cache WHERE rowid IN (SELECT rowid FROM node_cache ORDER BY rowid LIMIT ?)",
+                (batch,),
+            ).rowcount
+            self.evictions += deleted
+            self._count -= deleted
+
+    async def aset(self, pairs: Mapping) -> None:
+        await asyncio.to_thread(self.set, pairs)
+
+    def clear(self, namespaces: Sequence[Namespace] | None = None) -> None:
+        with self._lock:
+            if namespaces is None:
+                self._db.execute("DELETE FROM node_cache")
+            else:
+                self._db.executemany("DELETE FROM node_cache WHERE ns = ?", [(self._ns(ns),) for ns in namespaces])
+            self._count = None
+
+    async def aclear(self, namespaces: Sequence[Namespace] | None = None) -> None:
+        await asyncio.to_thread(self.clear, namespaces)
+
+
+class MemoryNodeCache(InMemoryCache):
+    """LangGraph's in-memory node cache, minus degraded node outputs."""
+
+    def get(self, keys: Sequence[FullKey]) -> dict:
+        return _count_lookups(keys, super().get(keys))
+
+    def set(self, pairs: Mapping) -> None:
+        super().set({k: v for k, v in pairs.items() if _cacheable(v[0])})
+
+    async def aset(self, pairs: Mapping) -> None:
+        self.set(pairs)
+
+
+_cache: ResultCache | None = None
+_node_cache: BaseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache | None:
+    """The process-wide result cache configured from core.config (None when disabled)."""
+    global _cache
+    from core import config
+
+    if not config.RESULT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    config.RESULT_CACHE_PATH or None,
+                    ttl=config.RESULT_CACHE_TTL_SECONDS or None,
+                    memory_entries=config.RESULT_CACHE_MEMORY_ENTRIES,
+                    max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+                    max_bytes=config.RESULT_CACHE_MAX_BYTES,
+                )
+                logger.info("Result cache ready (disk: %s)", config.RESULT_CACHE_PATH or "off")
+    return _cache
+
+
+def get_node_cache() -> BaseCache | None:
+    """The process-wide LangGraph node cache configured from core.config (None when disabled)."""
+    global _node_cache
+    from core import config
+
+    if not config.NODE_CACHE_ENABLED:
+        return None
+    if _node_cache is None:
+        with _cache_lock:
+            if _node_cache is None:
+                if config.NODE_CACHE_PATH:
+                    _node_cache = SqliteNodeCache(config.NODE_CACHE_PATH, max_entries=config.NODE_CACHE_MAX_ENTRIES)
+                else:
+                    _node_cache = MemoryNodeCache()
+                logger.info("Node cache ready (disk: %s)", config.NODE_CACHE_PATH or "off")
+    return _node_cache
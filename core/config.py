@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+
 from dotenv import load_dotenv
 
 ENV_PATH = Path(".env")
@@ -7,6 +8,158 @@ ENV_VAR_NAME = "GOOGLE_API_KEY"
 
 load_dotenv(dotenv_path=ENV_PATH, override=False)
 
+# Cold-start budget for `import app.ui`, checked by tests/test_startup.py.
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "10"))
+
+# How many gradings Gradio may run at the same time per event.
+UI_CONCURRENCY_LIMIT = int(os.getenv("UI_CONCURRENCY_LIMIT", "8"))
+# How many essays `python -m core.batch` grades at the same time by default.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# The Gemini model shared by both tasks (see core/llm.py). LLM_TRANSPORT is
+# "grpc" (default) or "rest".
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash-preview-05-20")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
+LLM_TOP_P = float(os.getenv("LLM_TOP_P", "0.95"))
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT", "grpc")
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+
+# Client-side limits shared by every LLM call (see core/ratelimit.py).
+# 0 disables the requests- or tokens-per-minute bucket. The concurrency limit
+# adapts between MIN and MAX: it grows on success and halves on every 429.
+LLM_RPM = float(os.getenv("LLM_RPM", "150"))
+LLM_TPM = float(os.getenv("LLM_TPM", "1000000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+# Processes sharing the limits above (app.serve workers, scaled core.worker
+# processes); each process's limiter takes an equal share of them.
+LLM_QUOTA_SHARES = int(os.getenv("LLM_QUOTA_SHARES", "1"))
+# Output tokens reserved per call until the real usage is known.
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "1024"))
+
+# Timeouts and retries for every LLM call (see core/resilience.py).
+# Each attempt gets LLM_TIMEOUT_SECONDS; all attempts of one graph node get
+# NODE_DEADLINE_SECONDS, overridable per node, e.g. NODE_DEADLINES="Assessment=240,Summary=60".
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+NODE_DEADLINE_SECONDS = float(os.getenv("NODE_DEADLINE_SECONDS", "150"))
+NODE_DEADLINES = {
+    name.strip(): float(seconds)
+    for name, _, seconds in (item.rpartition("=") for item in os.getenv("NODE_DEADLINES", "").split(",") if "=" in item)
+}
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+# Tail-latency mode: duplicate a criterion call still running after the node's
+# recent HEDGE_PERCENTILE latency (at least HEDGE_MIN_SECONDS); the loser is cancelled.
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "0") not in ("0", "false", "False", "")
+HEDGE_NODES = tuple(n.strip() for n in os.getenv("HEDGE_NODES", "Task Response,CC,Lexical,Grammar,Assessment").split(","))
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SECONDS = float(os.getenv("HEDGE_MIN_SECONDS", "2"))
+# Gemini context caching of the static system prompts (see core/context_cache.py).
+# Caches live CONTEXT_CACHE_TTL_SECONDS and are extended when used within
+# CONTEXT_CACHE_REFRESH_SECONDS of expiring; prompts under CONTEXT_CACHE_MIN_TOKENS
+# are sent inline. Cached input is billed at LLM_CACHED_INPUT_COST_PER_MTOK.
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "0") not in ("0", "false", "False", "")
+CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+CONTEXT_CACHE_REFRESH_SECONDS = float(os.getenv("CONTEXT_CACHE_REFRESH_SECONDS", "300"))
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+CONTEXT_CACHE_RETRY_SECONDS = float(os.getenv("CONTEXT_CACHE_RETRY_SECONDS", "300"))
+# When a criterion still fails, grade without it instead of failing the whole report.
+DEGRADE_ON_FAILURE = os.getenv("DEGRADE_ON_FAILURE", "1") not in ("0", "false", "False", "")
+
+# Per-request tracing (see core/tracing.py); off unless an exporter is set.
+# TRACE_JSONL_PATH gets one JSON line per span; TRACE_OTLP_ENDPOINT is an
+# OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces.
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "ielts-assistant")
+
+# Prometheus metrics at /metrics on the app's port (see core/metrics.py). The
+# cost counter uses these USD prices per million input/output tokens.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False", "")
+# Processes serving one port write their metrics to METRICS_MULTIPROC_DIR every
+# METRICS_SNAPSHOT_SECONDS and /metrics sums them (app.serve sets it up for its workers).
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_SNAPSHOT_SECONDS = float(os.getenv("METRICS_SNAPSHOT_SECONDS", "1"))
+LLM_INPUT_COST_PER_MTOK = float(os.getenv("LLM_INPUT_COST_PER_MTOK", "0.30"))
+LLM_OUTPUT_COST_PER_MTOK = float(os.getenv("LLM_OUTPUT_COST_PER_MTOK", "2.50"))
+LLM_CACHED_INPUT_COST_PER_MTOK = float(os.getenv("LLM_CACHED_INPUT_COST_PER_MTOK", "0.075"))
+
+# Default grading graph: "fanout" (one call per criterion) or "fused"
+# (one call for all four criteria).
+GRADING_MODE = os.getenv("GRADING_MODE", "fanout")
+# The overall band and summary are computed locally; set to 1 to also append
+# the LLM examiner summary (one extra serial LLM call per grading).
+LLM_SUMMARY = os.getenv("LLM_SUMMARY", "0") not in ("0", "false", "False", "")
+# "full" sends the original examiner briefs; "compact" sends short briefs and asks for
+# criterion reports of at most CRITERION_MAX_WORDS words (see core/prompts.py).
+PROMPT_STYLE = os.getenv("PROMPT_STYLE", "full")
+CRITERION_MAX_WORDS = int(os.getenv("CRITERION_MAX_WORDS", "150"))
+# Ask each criterion node for a JSON object (band, strengths, weaknesses, examples, report)
+# in the model's JSON mode, validated with Pydantic (see core/structured.py); 0 = Markdown only.
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "1") not in ("0", "false", "False", "")
+
+# Result cache for repeated submissions (see core/cache.py).
+# An empty RESULT_CACHE_PATH keeps the cache in memory only.
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") not in ("0", "false", "False", "")
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "cache/results.sqlite3")
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+RESULT_CACHE_MEMORY_ENTRIES = int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "256"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(200_000_000)))
+
+# Per-node memoization inside the grading graphs (criterion reports, aggregator).
+NODE_CACHE_ENABLED = os.getenv("NODE_CACHE_ENABLED", "1") not in ("0", "false", "False", "")
+NODE_CACHE_PATH = os.getenv("NODE_CACHE_PATH", "cache/nodes.sqlite3")
+NODE_CACHE_TTL_SECONDS = float(os.getenv("NODE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+NODE_CACHE_MAX_ENTRIES = int(os.getenv("NODE_CACHE_MAX_ENTRIES", "50000"))
+
+# Durable grading queue (see core/jobs.py and core/worker.py). With
+# JOB_QUEUE_ENABLED=1 the UI only submits jobs and polls them; gradings run in
+# `python -m core.worker` processes sharing JOB_QUEUE_PATH. A running job's
+# lease is renewed every JOB_PROGRESS_SECONDS; after JOB_LEASE_SECONDS without
+# renewal it is requeued (up to JOB_MAX_ATTEMPTS claims). UI jobs are claimed
+# before lower-priority ones (e.g. `python -m core.jobs submit`, priority 0).
+JOB_QUEUE_ENABLED = os.getenv("JOB_QUEUE_ENABLED", "0") not in ("0", "false", "False", "")
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "cache/jobs.sqlite3")
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+JOB_PROGRESS_SECONDS = float(os.getenv("JOB_PROGRESS_SECONDS", "1"))
+JOB_UI_PRIORITY = int(os.getenv("JOB_UI_PRIORITY", "10"))
+
+# History of every grading (bands, latency, tokens) for progress pages and usage
+# reports (see core/results.py), written from a background thread.
+RESULT_STORE_ENABLED = os.getenv("RESULT_STORE_ENABLED", "1") not in ("0", "false", "False", "")
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", "cache/gradings.sqlite3")
+
+# JSON grading API (see app/api.py; `python -m app.api` serves it without Gradio).
+# Each process grades up to API_MAX_CONCURRENCY requests at a time and queues up to
+# API_MAX_WAITING more; beyond that it answers 429. API_CORS_ORIGINS is a comma-separated
+# list of front-end origins allowed to call it from the browser (e.g. http://localhost:3000).
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "16"))
+API_MAX_WAITING = int(os.getenv("API_MAX_WAITING", "64"))
+API_CORS_ORIGINS = [origin.strip() for origin in os.getenv("API_CORS_ORIGINS", "").split(",") if origin.strip()]
+API_IDEMPOTENCY_PATH = os.getenv("API_IDEMPOTENCY_PATH", "cache/idempotency.sqlite3")
+API_IDEMPOTENCY_TTL_SECONDS = float(os.getenv("API_IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# Header in which the auth proxy in front of the API passes the signed-in user
+# (e.g. X-Forwarded-User). Gradings are recorded for that user, and the
+# /results routes are served only when it is set. The proxy must strip the
+# header from incoming requests; the API trusts it as is.
+API_USER_HEADER = os.getenv("API_USER_HEADER", "")
+
+# `python -m app.serve` (see app/serve.py) runs SERVE_WORKERS processes behind one port
+# (0 = one per CPU). On SIGTERM running gradings get SHUTDOWN_GRACE_SECONDS to finish;
+# keep the container's stop grace period longer than that.
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "0"))
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "120"))
+
+# Task 1 image preprocessing before upload (see utils/images.py).
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1536"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+
 
 def env_path() -> Path:
     return ENV_PATH
@@ -38,4 +191,7 @@ def set_api_key(value: str, var_name: str = ENV_VAR_NAME) -> None:
         out_lines.append(f"{var_name}={value}")
     ENV_PATH.write_text("\n".join(out_lines) + "\n")
     
-    os.environ[var_name] = value
\ No newline at end of file
+    os.environ[var_name] = value
+    # The shared Gemini client picks the new key up on its next call.
+    from core.llm import reset_chat_model
+    reset_chat_model()
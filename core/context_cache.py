@@ -0,0 +1,313 @@
+"""
+Provider-side context caching for the static examiner briefs.
+
+Every criterion prompt starts with the same long system message; only the
+essay, the question and the image change. With CONTEXT_CACHE_ENABLED=1 each
+distinct system message (per model) is uploaded once as a Gemini cached
+content, and later requests send only the human message plus
+`cached_content=<name>`. Gemini then bills the cached part at the cached-input
+rate and does not have to re-read it, which also shortens time to first token.
+
+ContextCache manages the lifecycle:
+  * system messages shorter than CONTEXT_CACHE_MIN_TOKENS are sent inline
+    (Gemini refuses to cache less);
+  * one request per brief creates its cache; concurrent ones go inline rather
+    than wait for it;
+  * a cache used within CONTEXT_CACHE_REFRESH_SECONDS of expiring gets its TTL
+    extended; a failed create or refresh is not retried for
+    CONTEXT_CACHE_RETRY_SECONDS;
+  * caches this process created are deleted at exit.
+
+ContextCachedModel puts it in front of the chat model. If a request fails
+because its cache has gone (expired, deleted, another process's cleanup), the
+entry is dropped and the request is resent inline once.
+
+The backend is anything with create / refresh / delete (see GeminiCacheBackend);
+benchmarks/fake_llm.py has a local stand-in for offline runs and tests.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from core.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def is_cache_miss_error(exc: BaseException) -> bool:
+    """True when a request failed because its cached content no longer exists."""
+    text = str(exc).lower()
+    if "cachedcontent" in text.replace(" ", "") or "cached content" in text:
+        return True
+    return getattr(exc, "code", None) == 404 or "NotFound" in type(exc).__name__
+
+
+@dataclass
+class _Entry:
+    name: str | None = None
+    expires_at: float = 0.0
+    busy: bool = False          # a create or refresh is in flight
+    retry_at: float = 0.0       # after a failure, send inline until then
+
+
+class ContextCache:
+    """Which provider cache holds which (model, system message), and when it expires."""
+
+    def __init__(self, backend, *, ttl: float = 3600, refresh: float = 300, min_tokens: int = 1024,
+                 retry: float = 300, clock: Callable[[], float] = time.time):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh = min(refresh, ttl / 2)
+        self.min_tokens = min_tokens
+        self.retry = retry
+        self.clock = clock
+        self.entries: dict[str, _Entry] = {}
+        self.counts = {"hits": 0, "inline": 0, "created": 0, "refreshed": 0, "expired": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, system: str) -> str:
+        return hashlib.sha256(f"{model}\0{system}".encode()).hexdigest()
+
+    def _claim(self, key: str) -> tuple[str | None, str | None]:
+        """(cache name to use now, work to do: "create" / "refresh" / None)."""
+        now = self.clock()
+        with self._lock:
+            entry = self.entries.setdefault(key, _Entry())
+            live = entry.name is not None and entry.expires_at > now
+            work = None
+            if not entry.busy and now >= entry.retry_at:
+                if not live:
+                    work = "create"
+                elif entry.expires_at - now < self.refresh:
+                    work = "refresh"
+                entry.busy = work is not None
+            self.counts["hits" if live else "inline"] += 1
+            name = entry.name if live else None
+        CACHE_REQUESTS.inc(cache="context", result="hit" if live else "miss")
+        return name, work
+
+    def _work(self, key: str, work: str, model: str, system: str) -> str | None:
+        with self._lock:
+            entry = self.entries[key]
+            name = entry.name
+        try:
+            if work == "create":
+                name = self.backend.create(model, system, self.ttl)
+            else:
+                self.backend.refresh(name, self.ttl)
+        except Exception as e:
+            logger.warning("Context cache %s failed for %s: %s", work, model, e)
+            with self._lock:
+                entry.busy = False
+                entry.retry_at = self.clock() + self.retry
+                if work == "refresh":
+                    entry.name = None
+                self.counts["failed"] += 1
+            return None
+        with self._lock:
+            entry.name, entry.expires_at, entry.busy = name, self.clock() + self.ttl, False
+            self.counts["created" if work == "create" else "refreshed"] += 1
+        logger.info("Context cache %s: %s (%s)", "created" if work == "create" else "refreshed", name, model)
+        return name
+
+    def _eligible(self, system: str) -> bool:
+        from core.ratelimit import estimate_tokens
+
+        return estimate_tokens(system) >= self.min_tokens
+
+    def lookup(self, model: str, system: str) -> str | None:
+        """The cache to send with this request, creating or refreshing it if this caller should."""
+        if not self._eligible(system):
+            return None
+        key = self.key(model, system)
+        name, work = self._claim(key)
+        if work is not None:
+            name = self._work(key, work, model, system) or name
+        return name
+
+    async def alookup(self, model: str, system: str) -> str | None:
+        if not self._eligible(system):
+            return None
+        key = self.key(model, system)
+        name, work = self._claim(key)
+        if work is not None:
+            # Cache administration is a plain blocking RPC; keep it off the event loop.
+            name = await asyncio.to_thread(self._work, key, work, model, system) or name
+        return name
+
+    def expired(self, name: str) -> None:
+        """Forgets `name` after the provider said it no longer exists; the next request recreates it."""
+        with self._lock:
+            for entry in self.entries.values():
+                if entry.name == name:
+                    entry.name, entry.expires_at = None, 0.0
+            self.counts["expired"] += 1
+        logger.info("Context cache %s expired; sending inline", name)
+
+    def close(self) -> None:
+        """Deletes every cache this process created (they would otherwise be billed until they expire)."""
+        with self._lock:
+            names = [e.name for e in self.entries.values() if e.name is not None and e.expires_at > self.clock()]
+            self.entries.clear()
+        for name in names:
+            try:
+                self.backend.delete(name)
+            except Exception as e:
+                logger.warning("Could not delete context cache %s: %s", name, e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counts)
+            stats["live"] = sum(1 for e in self.entries.values() if e.name is not None and e.expires_at > self.clock())
+        return stats
+
+
+def _split(input) -> tuple[str | None, list]:
+    """(system text, the other messages) when the prompt starts with a plain-text system message."""
+    messages = input.to_messages() if hasattr(input, "to_messages") else input
+    if isinstance(messages, list) and messages and isinstance(messages[0], SystemMessage) \
+            and isinstance(messages[0].content, str):
+        return messages[0].content, messages[1:]
+    return None, messages
+
+
+class ContextCachedModel(Runnable):
+    """
+    A chat model that sends static system messages by cached-content reference.
+    Attribute access falls through to the wrapped model, like RateLimitedModel.
+    """
+
+    def __init__(self, model, cache: ContextCache):
+        self.bound = model
+        self.cache = cache
+
+    def __getattr__(self, name):
+        if name == "bound":
+            raise AttributeError(name)
+        return getattr(self.bound, name)
+
+    def _model_name(self) -> str:
+        return getattr(self.bound, "model", None) or type(self.bound).__name__
+
+    def invoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        system, rest = _split(input)
+        name = self.cache.lookup(self._model_name(), system) if system is not None else None
+        if name is None:
+            return self.bound.invoke(input, config, **kwargs)
+        try:
+            return self.bound.invoke(rest, config, cached_content=name, **kwargs)
+        except Exception as e:
+            if not is_cache_miss_error(e):
+                raise
+            self.cache.expired(name)
+            return self.bound.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        system, rest = _split(input)
+        name = await self.cache.alookup(self._model_name(), system) if system is not None else None
+        if name is None:
+            return await self.bound.ainvoke(input, config, **kwargs)
+        try:
+            return await self.bound.ainvoke(rest, config, cached_content=name, **kwargs)
+        except Exception as e:
+            if not is_cache_miss_error(e):
+                raise
+            self.cache.expired(name)
+            return await self.bound.ainvoke(input, config, **kwargs)
+
+
+class GeminiCacheBackend:
+    """Gemini cachedContents via the generated v1beta CacheService client."""
+
+    def __init__(self, api_key: str | None = None):
+        self.api_key = api_key
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import os
+
+            from google.ai.generativelanguage_v1beta import CacheServiceClient
+
+            from core import config
+
+            self._client = CacheServiceClient(client_options={
+                "api_key": self.api_key or os.getenv(config.ENV_VAR_NAME),
+                "api_endpoint": "generativelanguage.googleapis.com",
+            })
+        return self._client
+
+    def create(self, model: str, system: str, ttl: float) -> str:
+        from google.ai.generativelanguage_v1beta import CachedContent, Content, Part
+        from google.protobuf.duration_pb2 import Duration
+
+        cached = self.client.create_cached_content(cached_content=CachedContent(
+            model=model if model.startswith("models/") else f"models/{model}",
+            display_name="ielts-examiner-brief",
+            system_instruction=Content(parts=[Part(text=system)]),
+            ttl=Duration(seconds=int(ttl)),
+        ))
+        return cached.name
+
+    def refresh(self, name: str, ttl: float) -> None:
+        from google.ai.generativelanguage_v1beta import CachedContent
+        from google.protobuf.duration_pb2 import Duration
+        from google.protobuf.field_mask_pb2 import FieldMask
+
+        self.client.update_cached_content(
+            cached_content=CachedContent(name=name, ttl=Duration(seconds=int(ttl))),
+            update_mask=FieldMask(paths=["ttl"]),
+        )
+
+    def delete(self, name: str) -> None:
+        self.client.delete_cached_content(name=name)
+
+
+_cache: ContextCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_context_cache(backend=None) -> ContextCache:
+    """The process-wide ContextCache (on the Gemini backend unless one is given the first time)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                import atexit
+
+                from core import config
+
+                _cache = ContextCache(
+                    backend if backend is not None else GeminiCacheBackend(),
+                    ttl=config.CONTEXT_CACHE_TTL_SECONDS,
+                    refresh=config.CONTEXT_CACHE_REFRESH_SECONDS,
+                    min_tokens=config.CONTEXT_CACHE_MIN_TOKENS,
+                    retry=config.CONTEXT_CACHE_RETRY_SECONDS,
+                )
+                atexit.register(_cache.close)
+    return _cache
+
+
+def reset_context_cache() -> None:
+    """Deletes this process's caches and forgets them (e.g. after the API key changes)."""
+    global _cache
+    with _cache_lock:
+        cache, _cache = _cache, None
+    if cache is not None:
+        cache.close()
+
+
+def context_cached(model, backend=None) -> ContextCachedModel:
+    """Wraps `model` so static system messages go through the shared ContextCache."""
+    return ContextCachedModel(model, get_context_cache(backend))
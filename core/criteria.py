@@ -0,0 +1,393 @@
+"""
+Grading graphs generated from rubric files.
+
+Each task is described by rubrics/<task>.toml: its title, which graph state
+fields feed which template variables, the student-side (human) prompt, the
+prompts of the fused and LLM summary nodes, and per criterion its title,
+graph node name, examiner brief and compact brief. A Rubric turns one file
+into the LangGraph state, nodes, cache policies and compiled graphs, so both
+tasks (and any task added as a new TOML file) share one implementation:
+
+    get_rubric("part2").build("fanout", use_async=True)
+
+Every ChatPromptTemplate is compiled once per prompt style (see core.prompts)
+and then reused by every call, together with its hash for the node cache.
+The fused output schema is a Pydantic model with one CriterionReport per
+criterion of the rubric; with STRUCTURED_OUTPUT=1 each criterion node asks
+for a CriterionReport as JSON too (see core/structured.py).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import operator
+import threading
+import tomllib
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Annotated, TypedDict
+
+from langchain_core.prompts import (
+    ChatPromptTemplate,
+    HumanMessagePromptTemplate,
+    SystemMessagePromptTemplate,
+)
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import CachePolicy
+from pydantic import create_model
+
+from core import config
+from core.llm import chat_model as model  # benchmarks/fake_llm.py swaps this for a fake
+from core.metrics import STRUCTURED_OUTPUTS
+from core.prompts import (
+    brief_report,
+    compact_brief,
+    compact_summary_brief,
+    prompt_signature,
+    prompt_style,
+)
+from core.resilience import graceful_criterion, graceful_summary
+from core.schemas import CriterionReport
+from core.scoring import parse_criterion_report, summarize, with_llm_summary
+from core.structured import (
+    CRITERION_OUTPUT,
+    JSON_MODE,
+    StructuredOutputError,
+    parse_criterion_output,
+    parse_structured,
+    to_assessment,
+)
+
+logger = logging.getLogger(__name__)
+
+RUBRICS_DIR = Path(__file__).resolve().parents[1] / "rubrics"
+MODES = ("fanout", "fused")
+
+# Graph node names shared by every task (core.streaming streams the summary node's tokens).
+FUSED_NODE = "Assessment"
+AGGREGATOR_NODE = "Aggregator"
+SUMMARY_NODE = "Summary"
+
+# Prompt names besides the criterion keys.
+FUSED = "fused"
+SUMMARY = "summary"
+
+_FUSED_OUTPUT = """
+=== OUTPUT FORMAT ===
+Return a single JSON object and nothing else, with exactly these keys:
+{{
+%s
+}}
+Each "report" is Markdown inside a JSON string (escape newlines and quotes). "strengths" and "weaknesses" hold \
+up to 3 short points each; each of "examples" quotes a sentence from the response and improves it. Each "band" \
+is the final score that report ends with.
+"""
+
+
+def _llm():
+    """The chat model for criterion nodes, in JSON mode when they ask for JSON."""
+    return model.bind(**JSON_MODE) if config.STRUCTURED_OUTPUT else model
+
+
+def merge_dicts(left: dict | None, right: dict | None) -> dict:
+    """Reducer so the parallel criterion nodes can each add their own entry."""
+    return {**(left or {}), **(right or {})}
+
+
+@dataclass(frozen=True)
+class Criterion:
+    key: str
+    title: str
+    node: str
+    system: str
+    compact_focus: str
+    compact_bands: str
+
+
+class Rubric:
+    def __init__(self, name: str, data: dict):
+        task, prompts = data["task"], data["prompts"]
+        self.name = name
+        self.title = task["title"]
+        self.version = str(task["version"])
+        self.inputs: dict[str, str] = dict(task["inputs"])  # template variable -> state field
+        self.image: str | None = task.get("image")
+        self.human = prompts["human"].strip()
+        self.fused_intro = prompts["fused"].strip()
+        self.summary_system = prompts["summary_system"].strip()
+        self.summary_human = prompts["summary_human"].strip()
+        self.criteria = {
+            c["key"]: Criterion(c["key"], c["title"], c["node"], c["system"].strip(),
+                                c["compact_focus"], c["compact_bands"])
+            for c in data["criteria"]
+        }
+        if not self.criteria:
+            raise ValueError("a rubric needs at least one criterion")
+        if {FUSED, SUMMARY} & set(self.criteria):
+            raise ValueError(f"criterion keys {FUSED!r} and {SUMMARY!r} are reserved")
+        self.titles = {key: c.title for key, c in self.criteria.items()}
+        self.state = TypedDict(f"{name.capitalize()}State", {
+            **{field: str for field in self.inputs.values()},
+            **{key: str for key in self.criteria},
+            "criteria": Annotated[dict, merge_dicts],
+            "estimated_band_score": float,
+            "aggregated_result": str,
+            # Nodes that failed and were replaced by a placeholder (see core.resilience).
+            "degraded": Annotated[list, operator.add],
+        })
+        self.fused_schema = create_model(
+            f"{name.capitalize()}Assessment", **{key: (CriterionReport, ...) for key in self.criteria}
+        )
+        self._compiled: dict[str, tuple[dict, dict]] = {}
+        self._lock = threading.Lock()
+        self.prompts()  # compile (and check) the current style now rather than on the first grading
+
+    # --- prompts ---
+
+    def _human_message(self):
+        if self.image is None:
+            return HumanMessagePromptTemplate.from_template(self.human)
+        return HumanMessagePromptTemplate.from_template([
+            {"type": "text", "text": self.human},
+            {"type": "image_url", "image_url": f"{{{self.image}}}"},
+        ])
+
+    def _fused_output(self) -> str:
+        first, *rest = self.criteria.values()
+        lines = [(f'  "{first.key}": {{{{"report": "<the complete {first.title} assessment, formatted as its '
+                  'brief requires>", "strengths": ["<...>"], "weaknesses": ["<...>"], '
+                  '"examples": [{{"original": "<...>", "improved": "<...>"}}], "band": <number 0-9>}}')]
+        lines += [f'  "{c.key}": {{{{"report": "<...>", "strengths": [...], "weaknesses": [...], "examples": [...], '
+                  '"band": <number 0-9>}}' for c in rest]
+        return _FUSED_OUTPUT % ",\n".join(lines)
+
+    def _compile(self) -> dict[str, ChatPromptTemplate]:
+        compact = prompt_style() == "compact"
+        human = self._human_message()
+        output = CRITERION_OUTPUT if config.STRUCTURED_OUTPUT else ""
+        prompts, briefs = {}, {}
+        for key, c in self.criteria.items():
+            briefs[key] = compact_brief(self.title, c.title, c.compact_focus, c.compact_bands) if compact else c.system
+            prompts[key] = ChatPromptTemplate.from_messages([
+                SystemMessagePromptTemplate.from_template(briefs[key] + output), human,
+            ])
+        all_briefs = "\n\n".join(f"=== CRITERION `{key}`: {c.title} ===\n{briefs[key]}" for key, c in self.criteria.items())
+        prompts[FUSED] = ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(f"{self.fused_intro}\n\n{all_briefs}{self._fused_output()}"),
+            human,
+        ])
+        prompts[SUMMARY] = ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(
+                compact_summary_brief(self.title) if compact else self.summary_system
+            ),
+            HumanMessagePromptTemplate.from_template(self.summary_human),
+        ])
+        reports = {f"{key}_report" for key in self.criteria}
+        for name, prompt in prompts.items():
+            expected = reports if name == SUMMARY else set(self.inputs)
+            unknown = set(prompt.input_variables) - expected
+            if unknown:
+                raise ValueError(f"rubric {self.name}: {name} prompt uses unknown variables {sorted(unknown)}")
+        return prompts
+
+    def prompts(self) -> dict[str, ChatPromptTemplate]:
+        """Compiled prompts of the current prompt style: one per criterion key, plus FUSED and SUMMARY."""
+        return self._prompts_and_hashes()[0]
+
+    def prompt_hash(self, name: str) -> str:
+        return self._prompts_and_hashes()[1][name]
+
+    def _prompts_and_hashes(self) -> tuple[dict, dict]:
+        # PROMPT_STYLE can change at runtime (tests, benchmarks/eval_prompts.py); each style compiles once.
+        signature = prompt_signature()
+        compiled = self._compiled.get(signature)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(signature)
+                if compiled is None:
+                    prompts = self._compile()
+                    hashes = {name: hashlib.sha256(repr(p).encode()).hexdigest() for name, p in prompts.items()}
+                    compiled = self._compiled[signature] = (prompts, hashes)
+        return compiled
+
+    def essay_inputs(self, state) -> dict:
+        return {variable: state[field] for variable, field in self.inputs.items()}
+
+    def summary_inputs(self, state) -> dict:
+        criteria = state.get("criteria") or {}
+        return {f"{key}_report": brief_report(criteria.get(key), state[key]) for key in self.criteria}
+
+    # --- nodes ---
+
+    def criterion_node(self, key: str, use_async: bool = False):
+        title, name = self.criteria[key].title, self.criteria[key].node
+
+        def update(text: str) -> dict:
+            # The Markdown report plus its structured form.
+            if config.STRUCTURED_OUTPUT:
+                assessment, parsed = parse_criterion_output(text)
+                STRUCTURED_OUTPUTS.inc(node=name, result=parsed)
+                if parsed == "fallback":
+                    logger.warning("%s: no valid JSON in the answer, reading it as Markdown", title)
+            else:
+                assessment = parse_criterion_report(text)
+            return {key: assessment.report, "criteria": {key: assessment.model_dump()}}
+
+        if use_async:
+            async def node(state):
+                logger.info("Starting %s Analysis", title)
+                response = await (self.prompts()[key] | _llm()).ainvoke(self.essay_inputs(state))
+                return update(response.content)
+        else:
+            def node(state):
+                logger.info("Starting %s Analysis", title)
+                response = (self.prompts()[key] | _llm()).invoke(self.essay_inputs(state))
+                return update(response.content)
+        node.__name__ = key
+        return node
+
+    def _fused_update(self, text: str) -> dict:
+        try:
+            result, repaired = parse_structured(text, self.fused_schema)
+        except StructuredOutputError:
+            STRUCTURED_OUTPUTS.inc(node=FUSED_NODE, result="fallback")
+            raise
+        STRUCTURED_OUTPUTS.inc(node=FUSED_NODE, result="repaired" if repaired else "ok")
+        assessments = {key: to_assessment(getattr(result, key)) for key in self.criteria}
+        update = {key: assessment.report for key, assessment in assessments.items()}
+        update["criteria"] = {key: assessment.model_dump() for key, assessment in assessments.items()}
+        return update
+
+    def fused_node(self, use_async: bool = False):
+        if use_async:
+            async def fused_assessment(state):
+                logger.info("Starting Fused Analysis")
+                chain = self.prompts()[FUSED] | model.bind(**JSON_MODE)
+                return self._fused_update((await chain.ainvoke(self.essay_inputs(state))).content)
+        else:
+            def fused_assessment(state):
+                logger.info("Starting Fused Analysis")
+                chain = self.prompts()[FUSED] | model.bind(**JSON_MODE)
+                return self._fused_update(chain.invoke(self.essay_inputs(state)).content)
+        return fused_assessment
+
+    def summary_node(self, use_async: bool = False):
+        def update(state, summary: str) -> dict:
+            logger.info("Final Report!")
+            return {"aggregated_result": with_llm_summary(state.get("aggregated_result"), summary)}
+
+        if use_async:
+            async def aggregator(state):
+                logger.info("Summarizing")
+                response = await (self.prompts()[SUMMARY] | model).ainvoke(self.summary_inputs(state))
+                return update(state, response.content)
+        else:
+            def aggregator(state):
+                logger.info("Summarizing")
+                response = (self.prompts()[SUMMARY] | model).invoke(self.summary_inputs(state))
+                return update(state, response.content)
+        return aggregator
+
+    def local_aggregator(self, state) -> dict:
+        """Computes the overall band and summary from the structured criterion results, without an LLM call."""
+        logger.info("Summarizing locally")
+        overall, summary = summarize(self.title, state.get("criteria") or {}, self.titles)
+        return {"estimated_band_score": overall, "aggregated_result": summary}
+
+    def llm_nodes(self) -> dict[str, tuple[str, Callable[[dict], dict]]]:
+        """Graph node name -> (prompt name, inputs function) for every node that calls the model."""
+        nodes = {c.node: (key, self.essay_inputs) for key, c in self.criteria.items()}
+        nodes[FUSED_NODE] = (FUSED, self.essay_inputs)
+        nodes[SUMMARY_NODE] = (SUMMARY, self.summary_inputs)
+        return nodes
+
+    # --- graphs ---
+
+    def _cache_policy(self, prompt: str, inputs_fn, ttl=None) -> CachePolicy:
+        """Memoizes a node on its own inputs, its prompt template and the model settings."""
+        def key_func(state):
+            try:
+                inputs = inputs_fn(state)
+            except KeyError:
+                # Partial state (e.g. when LangGraph draws the graph); the node itself will fail on real runs.
+                inputs = None
+            payload = {
+                "prompt": self.prompt_hash(prompt),
+                "model": getattr(model, "model", type(model).__name__),
+                "temperature": getattr(model, "temperature", None),
+                "inputs": inputs,
+            }
+            return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+        return CachePolicy(key_func=key_func, ttl=ttl)
+
+    def cache_policies(self, ttl=None) -> dict[str, CachePolicy]:
+        """CachePolicy for every LLM node, keyed by graph node name."""
+        return {node: self._cache_policy(prompt, inputs_fn, ttl) for node, (prompt, inputs_fn) in self.llm_nodes().items()}
+
+    def build(self, mode: str = "fanout", *, use_async: bool = False, llm_summary: bool = False,
+              cache=None, cache_ttl=None, degrade: bool = False):
+        """
+        Compiles the grading graph. "fanout" runs one LLM call per criterion; "fused"
+        grades every criterion in a single call. Either way the overall band and
+        summary are computed locally; `llm_summary=True` adds the LLM examiner summary
+        as an extra final step.
+
+        With a LangGraph `cache`, every LLM node is memoized on its inputs and prompt.
+        With `degrade=True`, a criterion (or the LLM summary) that still fails after
+        its retries is replaced by a placeholder instead of failing the whole grading.
+        The fused node is never degraded: without its one call there is no band left.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown grading mode: {mode!r} (expected one of {MODES})")
+        policies = self.cache_policies(cache_ttl) if cache is not None else {}
+        graph = StateGraph(self.state)
+
+        if mode == "fused":
+            graph.add_node(FUSED_NODE, self.fused_node(use_async), cache_policy=policies.get(FUSED_NODE))
+            graph.add_edge(START, FUSED_NODE)
+            graph.add_edge(FUSED_NODE, AGGREGATOR_NODE)
+        else:
+            for key, c in self.criteria.items():
+                node = self.criterion_node(key, use_async)
+                graph.add_node(c.node, graceful_criterion(node, key) if degrade else node,
+                               cache_policy=policies.get(c.node))
+                graph.add_edge(START, c.node)
+                graph.add_edge(c.node, AGGREGATOR_NODE)
+        graph.add_node(AGGREGATOR_NODE, self.local_aggregator)
+
+        if llm_summary:
+            summary = self.summary_node(use_async)
+            graph.add_node(SUMMARY_NODE, graceful_summary(summary) if degrade else summary,
+                           cache_policy=policies.get(SUMMARY_NODE))
+            graph.add_edge(AGGREGATOR_NODE, SUMMARY_NODE)
+            graph.add_edge(SUMMARY_NODE, END)
+        else:
+            graph.add_edge(AGGREGATOR_NODE, END)
+        return graph.compile(cache=cache)
+
+
+def load_rubric(path: str | Path) -> Rubric:
+    path = Path(path)
+    with path.open("rb") as f:
+        data = tomllib.load(f)
+    try:
+        return Rubric(path.stem, data)
+    except KeyError as e:
+        raise ValueError(f"{path}: missing {e}") from None
+
+
+def rubric_names() -> tuple[str, ...]:
+    return tuple(sorted(p.stem for p in RUBRICS_DIR.glob("*.toml")))
+
+
+@cache
+def get_rubric(name: str) -> Rubric:
+    """The rubric in rubrics/<name>.toml, loaded and compiled once per process."""
+    path = RUBRICS_DIR / f"{name}.toml"
+    if not path.is_file():
+        raise KeyError(f"Unknown task: {name!r} (expected one of {rubric_names()})")
+    return load_rubric(path)
@@ -1,4 +1,5 @@
 from __future__ import annotations
+
 import re
 
 _ANSI_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
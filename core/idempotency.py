@@ -0,0 +1,101 @@
+"""
+Idempotency keys for the HTTP API (app/api.py), on SQLite so every server process sees the same keys.
+
+A client that may retry a grading (timeout, dropped connection, double
+click) sends `Idempotency-Key: <unique string>` with it. The first request
+with a key runs the grading; its response is kept for API_IDEMPOTENCY_TTL_SECONDS
+and replayed to every retry with the same key and body, so a retry never
+pays for a second grading. A retry while the first one is still running is
+refused (409) and one with a different body is rejected (422). A key whose
+request failed, or whose process died mid-grading (nothing written for
+`stale` seconds), can be used again.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+
+from core.db import connect
+
+NEW, DONE, RUNNING, MISMATCH = "new", "done", "running", "mismatch"
+
+
+class IdempotencyStore:
+    def __init__(self, path: str | Path, *, ttl: float = 24 * 3600, stale: float = 600):
+        self.ttl = ttl
+        self.stale = stale
+        self._db = connect(path)
+        self._lock = threading.Lock()
+        self._purged = 0.0
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS requests ("
+            " key TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " response TEXT,"
+            " created REAL NOT NULL)"
+        )
+
+    def begin(self, key: str, fingerprint: str) -> tuple[str, dict | None]:
+        """
+        Claims `key` for a request whose body hashes to `fingerprint`. Returns
+        (NEW, None) to go ahead, (DONE, response) to replay, or (RUNNING | MISMATCH, None).
+        """
+        now = time.time()
+        if now - self._purged > 3600:
+            self._purged = now
+            self.purge()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM requests WHERE key = ? AND (created < ? OR (response IS NULL AND"
+                                 " created < ?))", (key, now - self.ttl, now - self.stale))
+                row = self._db.execute("SELECT fingerprint, response FROM requests WHERE key = ?",
+                                       (key,)).fetchone()
+                if row is None:
+                    self._db.execute("INSERT INTO requests (key, fingerprint, created) VALUES (?, ?, ?)",
+                                     (key, fingerprint, now))
+                    result = NEW, None
+                elif row[0] != fingerprint:
+                    result = MISMATCH, None
+                elif row[1] is None:
+                    result = RUNNING, None
+                else:
+                    result = DONE, json.loads(row[1])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return result
+
+    def finish(self, key: str, response: dict) -> None:
+        with self._lock:
+            self._db.execute("UPDATE requests SET response = ?, created = ? WHERE key = ?",
+                             (json.dumps(response), time.time(), key))
+
+    def abandon(self, key: str) -> None:
+        """Frees the key of a request that did not complete, so a retry runs it again."""
+        with self._lock:
+            self._db.execute("DELETE FROM requests WHERE key = ? AND response IS NULL", (key,))
+
+    def purge(self) -> int:
+        """Deletes expired keys (done hourly by begin)."""
+        with self._lock:
+            return self._db.execute("DELETE FROM requests WHERE created < ?", (time.time() - self.ttl,)).rowcount
+
+
+_store: IdempotencyStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """The process-wide store on API_IDEMPOTENCY_PATH."""
+    global _store
+    from core import config
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IdempotencyStore(config.API_IDEMPOTENCY_PATH, ttl=config.API_IDEMPOTENCY_TTL_SECONDS)
+    return _store
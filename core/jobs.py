@@ -0,0 +1,302 @@
+"""
+A durable grading queue on SQLite, shared by the web front end and the workers.
+
+The UI (or the /jobs API, or `python -m core.jobs submit`) adds a job; worker
+processes (`python -m core.worker`) claim jobs by priority, grade them through
+core.pipeline and write the growing report back, so the submitter just polls
+the job row. Any number of web and worker processes can share one database
+file (WAL mode), and neither loses work when the other restarts:
+
+  * a claimed job holds a lease that its worker renews while grading; a job
+    whose lease runs out (worker killed, host gone) goes back to the queue,
+    up to JOB_MAX_ATTEMPTS claims;
+  * cancelling a queued job is immediate; a running one is flagged, and its
+    worker stops grading at the next progress update.
+
+Statuses: queued -> running -> done | failed | cancelled.
+
+    python -m core.jobs submit essays.jsonl [--priority 0]    # same input as core.batch
+    python -m core.jobs status <id> | cancel <id> | stats | purge [--days 7]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from core.db import connect
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Everything but the image, which only the worker needs.
+_FIELDS = ("id, task, mode, question, essay, image_name, priority, status, report, error, attempts, worker, "
+           "cancel_requested, created, started, finished, updated")
+
+
+def _row(cursor, row) -> dict:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class JobQueue:
+    def __init__(self, path: str | Path, *, lease: float = 60, max_attempts: int = 3):
+        self.path = str(path)
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._db = connect(path)
+        self._db.row_factory = _row
+        self._lock = threading.Lock()
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " task TEXT NOT NULL,"
+            " mode TEXT,"
+            " question TEXT,"
+            " essay TEXT NOT NULL,"
+            " image BLOB,"
+            " image_name TEXT,"
+            " priority INTEGER NOT NULL DEFAULT 0,"
+            " status TEXT NOT NULL,"
+            " report TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " worker TEXT,"
+            " lease_until REAL,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL,"
+            " started REAL,"
+            " finished REAL,"
+            " updated REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS jobs_next ON jobs(status, priority DESC, created);"
+            "CREATE INDEX IF NOT EXISTS jobs_lease ON jobs(status, lease_until);"
+        )
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def _returning(self, sql: str, params=()) -> dict | None:
+        # Step UPDATE ... RETURNING to the end, or its write lock outlives the call.
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return rows[0] if rows else None
+
+    def submit(self, task: str, essay: str, *, question: str | None = None, image: bytes | None = None,
+               image_name: str | None = None, priority: int = 0, mode: str | None = None) -> str:
+        """Queues a grading and returns its job id. Higher `priority` is claimed first."""
+        if task not in ("part1", "part2"):
+            raise ValueError(f"unknown task {task!r} (expected part1 or part2)")
+        if task == "part1" and not image:
+            raise ValueError("part1 jobs need an image")
+        if task == "part2" and not question:
+            raise ValueError("part2 jobs need a question")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, task, mode, question, essay, image, image_name, priority, status, created, updated)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, task, mode, question, essay, image, image_name, priority, QUEUED, now, now),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        job = self._execute(f"SELECT {_FIELDS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is not None and job["status"] == QUEUED:
+            job["position"] = self.position(job)
+        return job
+
+    def position(self, job: dict) -> int:
+        """How many queued jobs will be claimed before `job`."""
+        return self._execute(
+            "SELECT COUNT(*) AS n FROM jobs WHERE status = ? AND (priority > ? OR (priority = ? AND created < ?))",
+            (QUEUED, job["priority"], job["priority"], job["created"]),
+        ).fetchone()["n"]
+
+    def claim(self, worker: str) -> dict | None:
+        """Takes the next job (highest priority, then oldest) for `worker`, with its image; None if idle."""
+        self.requeue_expired()
+        now = time.time()
+        return self._returning(
+            "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, lease_until = ?,"
+            " started = ?, updated = ?"
+            " WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY priority DESC, created LIMIT 1)"
+            " AND status = ?"
+            f" RETURNING {_FIELDS}, image",
+            (RUNNING, worker, now + self.lease, now, now, QUEUED, QUEUED),
+        )
+
+    def progress(self, job_id: str, worker: str, report: str | None = None) -> bool:
+        """Renews the lease (and stores the partial report); False if the job was cancelled or taken away."""
+        now = time.time()
+        if report is None:
+            sql, params = "UPDATE jobs SET lease_until = ?, updated = ?", (now + self.lease, now)
+        else:
+            sql, params = "UPDATE jobs SET lease_until = ?, updated = ?, report = ?", (now + self.lease, now, report)
+        row = self._returning(
+            sql + " WHERE id = ? AND status = ? AND worker = ? RETURNING cancel_requested",
+            (*params, job_id, RUNNING, worker),
+        )
+        return row is not None and not row["cancel_requested"]
+
+    def _finish(self, job_id: str, worker: str, status: str, **fields) -> bool:
+        now = time.time()
+        sets = ", ".join(f"{name} = ?" for name in fields)
+        return self._execute(
+            f"UPDATE jobs SET status = ?, finished = ?, updated = ?, lease_until = NULL, image = NULL, {sets}"
+            " WHERE id = ? AND status = ? AND worker = ?",
+            (status, now, now, *fields.values(), job_id, RUNNING, worker),
+        ).rowcount == 1
+
+    def complete(self, job_id: str, worker: str, report: str) -> bool:
+        return self._finish(job_id, worker, DONE, report=report)
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        return self._finish(job_id, worker, FAILED, error=error)
+
+    def cancelled(self, job_id: str, worker: str) -> bool:
+        """Called by the worker once it has stopped grading a job flagged for cancellation."""
+        return self._finish(job_id, worker, CANCELLED, error="cancelled")
+
+    def release(self, job_id: str, worker: str) -> bool:
+        """Hands a running job back to the queue untouched (worker shutting down); the claim is not counted."""
+        return self._execute(
+            "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, attempts = attempts - 1, updated = ?"
+            " WHERE id = ? AND status = ? AND worker = ?",
+            (QUEUED, time.time(), job_id, RUNNING, worker),
+        ).rowcount == 1
+
+    def cancel(self, job_id: str) -> str | None:
+        """Cancels a job: at once if queued, at its next progress update if running. Returns the new status."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished = ?, updated = ?, image = NULL WHERE id = ? AND status = ?",
+                (CANCELLED, now, now, job_id, QUEUED),
+            )
+            self._db.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated = ? WHERE id = ? AND status = ?",
+                (now, job_id, RUNNING),
+            )
+            row = self._db.execute("SELECT status, cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return "cancelling" if row["status"] == RUNNING and row["cancel_requested"] else row["status"]
+
+    def requeue_expired(self) -> int:
+        """Puts running jobs whose worker stopped renewing the lease back in the queue (or fails them)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ?, updated = ?, image = NULL"
+                " WHERE status = ? AND lease_until < ? AND cancel_requested",
+                (CANCELLED, "cancelled", now, now, RUNNING, now),
+            )
+            failed = self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ?, updated = ?, image = NULL"
+                " WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, "worker lost", now, now, RUNNING, now, self.max_attempts),
+            ).rowcount
+            requeued = self._db.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, updated = ?"
+                " WHERE status = ? AND lease_until < ?",
+                (QUEUED, now, RUNNING, now),
+            ).rowcount
+        if failed or requeued:
+            logger.warning("Jobs: %d requeued, %d failed after their worker stopped responding", requeued, failed)
+        return requeued
+
+    def stats(self) -> dict:
+        counts = {status: 0 for status in (QUEUED, RUNNING, *FINISHED)}
+        for row in self._execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall():
+            counts[row["status"]] = row["n"]
+        oldest = self._execute("SELECT MIN(created) AS t FROM jobs WHERE status = ?", (QUEUED,)).fetchone()["t"]
+        counts["oldest_queued_seconds"] = round(time.time() - oldest, 3) if oldest else 0.0
+        return counts
+
+    def purge(self, older_than: float) -> int:
+        """Deletes finished jobs that finished more than `older_than` seconds ago."""
+        return self._execute(
+            f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) AND finished < ?",
+            (*FINISHED, time.time() - older_than),
+        ).rowcount
+
+
+async def follow(queue: JobQueue, job_id: str, poll: float = 0.5):
+    """Yields the job every time its status, queue position or report changes, until it finishes."""
+    import asyncio
+
+    seen = None
+    while True:
+        job = await asyncio.to_thread(queue.get, job_id)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        state = (job["status"], job.get("position"), job["report"], job["cancel_requested"])
+        if state != seen:
+            seen = state
+            yield job
+        if job["status"] in FINISHED:
+            return
+        await asyncio.sleep(poll)
+
+
+_queue: JobQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """The process-wide queue on JOB_QUEUE_PATH."""
+    global _queue
+    from core import config
+
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(config.JOB_QUEUE_PATH, lease=config.JOB_LEASE_SECONDS,
+                                  max_attempts=config.JOB_MAX_ATTEMPTS)
+    return _queue
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m core.jobs", description="Inspect and feed the grading queue.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit", help="queue every essay of a JSONL/CSV file (as for core.batch)")
+    submit.add_argument("input")
+    submit.add_argument("--priority", type=int, default=0)
+    submit.add_argument("--mode", choices=("fanout", "fused"))
+    for name in ("status", "cancel"):
+        commands.add_parser(name).add_argument("job_id")
+    commands.add_parser("stats")
+    purge = commands.add_parser("purge", help="delete finished jobs")
+    purge.add_argument("--days", type=float, default=7)
+    args = parser.parse_args(argv)
+
+    queue = get_job_queue()
+    if args.command == "submit":
+        from core.batch import load_records
+
+        for record in load_records(args.input):
+            image = Path(record["image"]) if record.get("image") else None
+            job_id = queue.submit(
+                record["task"], record["essay"], question=record.get("question"),
+                image=image.read_bytes() if image else None, image_name=image.name if image else None,
+                priority=args.priority, mode=args.mode,
+            )
+            print(json.dumps({"id": record["id"], "job": job_id}))
+    elif args.command == "status":
+        print(json.dumps(queue.get(args.job_id), indent=2, ensure_ascii=False))
+    elif args.command == "cancel":
+        print(queue.cancel(args.job_id))
+    elif args.command == "stats":
+        print(json.dumps(queue.stats()))
+    else:
+        print(f"deleted {queue.purge(args.days * 86400)} jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+The one Gemini chat model shared by every vendor node.
+
+`chat_model` is a cheap stand-in that the vendor `model.py` modules export.
+The real client is built on first use (not at import), from core.config:
+model name, temperature, top_p and transport. It is wrapped in the shared rate
+limiter and retry/deadline policy (and, with CONTEXT_CACHE_ENABLED, sends the
+static system prompts by cached-content reference: core/context_cache.py), and
+its connections are tuned in one place:
+
+  * gRPC (default): one keep-alive channel for sync calls and one per event
+    loop for async calls, multiplexing every request over HTTP/2;
+  * REST: sync calls use the REST transport's own keep-alive session; async
+    calls always use gRPC (the async client has no REST transport).
+
+Only public constructors of the generated google.ai.generativelanguage
+clients are used; the chat model's `client` and `async_client` are replaced.
+
+`reset_chat_model()` drops the client so the next call builds a new one
+(e.g. after the API key changes in the Settings tab).
+"""
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import weakref
+from typing import Any
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+
+def _channel_options() -> list[tuple[str, Any]]:
+    keepalive_ms = int(config.LLM_KEEPALIVE_SECONDS * 1000)
+    return [
+        ("grpc.keepalive_time_ms", keepalive_ms),
+        ("grpc.keepalive_timeout_ms", min(keepalive_ms, 20_000)),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+    ]
+
+
+def _channel_factory(create_channel):
+    """Wraps a transport's create_channel so our options are added to its defaults."""
+    def create(host, **kwargs):
+        kwargs["options"] = [*(kwargs.get("options") or []), *_channel_options()]
+        return create_channel(host, **kwargs)
+    return create
+
+
+def _transport(transport: str | None, use_async: bool):
+    """The `transport` argument for the generated Gemini clients; gRPC channels get keep-alive options."""
+    from google.ai.generativelanguage_v1beta.services.generative_service import (
+        transports,
+    )
+
+    if not use_async and transport == "rest":
+        return "rest"
+    cls = transports.GenerativeServiceGrpcAsyncIOTransport if use_async else transports.GenerativeServiceGrpcTransport
+
+    def grpc_transport(**kwargs):
+        return cls(channel=_channel_factory(cls.create_channel), **kwargs)
+    return grpc_transport
+
+
+def _client_kwargs(model) -> dict:
+    """Credentials and options for the generated clients, from the chat model's own settings."""
+    from importlib.metadata import version
+
+    import google.auth
+    from google.api_core.client_options import ClientOptions
+    from google.api_core.gapic_v1.client_info import ClientInfo
+    from pydantic import SecretStr
+
+    options = {"api_endpoint": "generativelanguage.googleapis.com", **(model.client_options or {})}
+    credentials, key = model.credentials, model.google_api_key
+    if not credentials:
+        if key:
+            options["api_key"] = key.get_secret_value() if isinstance(key, SecretStr) else key
+        else:
+            credentials, _ = google.auth.default()
+    agent = f"langchain-google-genai/{version('langchain-google-genai')}-ChatGoogleGenerativeAI:{model.model}"
+    return {"credentials": credentials, "client_options": ClientOptions(**options),
+            "client_info": ClientInfo(user_agent=agent)}
+
+
+def _build_client():
+    from google.ai.generativelanguage_v1beta import (
+        GenerativeServiceAsyncClient,
+        GenerativeServiceClient,
+    )
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from pydantic import PrivateAttr, model_validator
+
+    class PooledChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+        """ChatGoogleGenerativeAI with tuned keep-alive transports and one async client per event loop."""
+
+        _async_clients: Any = PrivateAttr(default_factory=weakref.WeakKeyDictionary)
+
+        @model_validator(mode="after")
+        def _pooled_client(self):
+            # Runs after the parent's validator and replaces the client it built
+            # (tests/test_llm.py checks that `client` and `async_client` still exist).
+            self.client = GenerativeServiceClient(
+                **_client_kwargs(self), transport=_transport(self.transport, use_async=False)
+            )
+            return self
+
+        @property
+        def async_client(self):
+            import asyncio
+
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return None
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = GenerativeServiceAsyncClient(
+                    **_client_kwargs(self), transport=_transport(self.transport, use_async=True)
+                )
+                self._async_clients[loop] = client
+            return client
+
+    return PooledChatGoogleGenerativeAI(
+        model=config.LLM_MODEL,
+        temperature=config.LLM_TEMPERATURE,
+        top_p=config.LLM_TOP_P,
+        transport=config.LLM_TRANSPORT,
+        # 429s and transient errors are retried by the limiter and the resilience
+        # policy, so the client's own blind retries are off (this counts attempts).
+        max_retries=1,
+    )
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_chat_model():
+    """The process-wide rate-limited, retrying Gemini model, built on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from core.ratelimit import rate_limited
+                from core.resilience import resilient
+
+                client = _build_client()
+                if config.CONTEXT_CACHE_ENABLED:
+                    from core.context_cache import context_cached
+
+                    client = context_cached(client)
+                _model = resilient(rate_limited(client))
+                logger.info("Gemini client ready (%s, transport %s)", config.LLM_MODEL, config.LLM_TRANSPORT or "grpc")
+    return _model
+
+
+def reset_chat_model() -> None:
+    global _model
+    with _model_lock:
+        _model = None
+    if "core.context_cache" in sys.modules:
+        # Caches belong to the old key's project.
+        sys.modules["core.context_cache"].reset_context_cache()
+
+
+class SharedChatModel(Runnable):
+    """
+    Stands in for the shared model until it is needed. `model` and `temperature`
+    come straight from config, so cache keys never force the client to be built.
+    """
+
+    @property
+    def model(self) -> str:
+        return config.LLM_MODEL
+
+    @property
+    def temperature(self) -> float:
+        return config.LLM_TEMPERATURE
+
+    def __getattr__(self, name):
+        # Private and dunder lookups (pickling, pytest, copy, ...) must not build the client.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(get_chat_model(), name)
+
+    def invoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        return get_chat_model().invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        return await get_chat_model().ainvoke(input, config, **kwargs)
+
+
+chat_model = SharedChatModel()
@@ -0,0 +1,366 @@
+"""
+Latency statistics shared by the batch runner and the retry/hedging policy,
+and the app's Prometheus metrics (see `render`).
+"""
+from __future__ import annotations
+
+import atexit
+import bisect
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: Iterable[float], p: float) -> float:
+    """Linear-interpolated percentile (p in 0..100) of `values`."""
+    values = sorted(values)
+    if not values:
+        return math.nan
+    k = (len(values) - 1) * p / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+class LatencyWindow:
+    """The last `size` latencies of something, for rolling percentiles."""
+
+    def __init__(self, size: int = 200):
+        self._values: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._values.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            values = list(self._values)
+        return percentile(values, p)
+
+
+# --- Prometheus metrics, served at /metrics next to the Gradio app ---
+#
+# Gradings, graph nodes and LLM calls are counted from the tracing spans (see
+# span_started / span_ended, registered by core.observability); caches count their
+# own hits. The text exposition format is written by hand, so the app does not
+# need prometheus_client.
+#
+# Several processes behind one port (app.serve workers) share a directory
+# (METRICS_MULTIPROC_DIR, see share_across_processes): each one writes a
+# snapshot of its values there, and whichever process takes the scrape sums
+# them. Counters and histograms of exited processes stay in the sum, so totals
+# never go down when a worker is replaced; gauges count live processes only,
+# except `shared` ones, which read state every process sees and are reported once.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SECONDS_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labels
+        self._values: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        # One metric per name: a second registration replaces the first, as a
+        # repeated # TYPE line would make Prometheus reject the whole scrape.
+        REGISTRY[:] = [metric for metric in REGISTRY if metric.name != name]
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def current(self) -> dict[tuple, Any]:
+        """This process's values, by label values."""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def add(a, b):
+        return a + b
+
+    def lines(self, values: dict[tuple, Any]) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in sorted(values.items())]
+
+    def samples(self) -> list[str]:
+        return self.lines(self.current())
+
+    def render(self, values: dict[tuple, Any] | None = None) -> str:
+        lines = self.samples() if values is None else self.lines(values)
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *lines])
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    A gauge that is set or moved by the app, or read from `callback` at scrape time.
+    `shared` marks a gauge of state every process sees alike (not summed across processes).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (),
+                 callback: Callable[[], float | None] | None = None, shared: bool = False):
+        super().__init__(name, help, labels)
+        self.callback = callback
+        self.shared = shared
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def current(self) -> dict[tuple, Any]:
+        if self.callback is None:
+            return super().current()
+        try:
+            value = self.callback()
+        except Exception:
+            value = None
+        return {} if value is None else {(): value}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=SECONDS_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = (*sorted(buckets), math.inf)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def current(self) -> dict[tuple, Any]:
+        with self._lock:
+            return {k: (list(c), s) for k, (c, s) in self._values.items()}
+
+    @staticmethod
+    def add(a, b):
+        return [x + y for x, y in zip(a[0], b[0])], a[1] + b[1]
+
+    def lines(self, values: dict[tuple, Any]) -> list[str]:
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+GRADINGS = Counter("ielts_gradings_total", "Finished gradings by task and status (ok or error).", ("task", "status"))
+GRADING_SECONDS = Histogram("ielts_grading_duration_seconds", "Wall time of a grading, cache hits included.", ("task",))
+GRADINGS_IN_FLIGHT = Gauge("ielts_gradings_in_flight", "Gradings currently running.", ("task",))
+NODE_SECONDS = Histogram("ielts_node_duration_seconds", "Wall time of a grading graph node.", ("node",))
+LLM_CALLS = Counter("ielts_llm_calls_total", "LLM calls (every retry and hedge) by node and status.", ("node", "status"))
+LLM_QUEUE_WAIT = Histogram("ielts_llm_queue_wait_seconds", "Time an LLM call waited for the rate limiter.",
+                           buckets=WAIT_BUCKETS)
+LLM_TOKENS = Counter("ielts_llm_tokens_total",
+                     "LLM tokens by node, model and direction (input, output, and cached: input read from a context cache).",
+                     ("node", "model", "direction"))
+LLM_COST = Counter("ielts_llm_cost_usd_total", "Estimated LLM spend in USD (LLM_*_COST_PER_MTOK).", ("model",))
+CACHE_REQUESTS = Counter("ielts_cache_requests_total", "Cache lookups by cache (result, node or context) and result.",
+                         ("cache", "result"))
+STRUCTURED_OUTPUTS = Counter("ielts_structured_outputs_total",
+                             "JSON node outputs by node and how they parsed (ok, repaired, or fallback to Markdown).",
+                             ("node", "result"))
+
+
+def _limiter_stat(name: str) -> Callable[[], float | None]:
+    def read():
+        # Only once the first grading has loaded the limiter; scrapes must not import the grading stack.
+        ratelimit = sys.modules.get("core.ratelimit")
+        return ratelimit.get_limiter().stats()[name] if ratelimit else None
+    return read
+
+
+Gauge("ielts_llm_in_flight", "LLM calls holding a rate limiter slot.", callback=_limiter_stat("in_flight"))
+Gauge("ielts_llm_queue_depth", "LLM calls waiting for the rate limiter.", callback=_limiter_stat("queue_depth"))
+Gauge("ielts_llm_concurrency_limit", "Current adaptive LLM concurrency limit.",
+      callback=_limiter_stat("concurrency_limit"))
+
+
+_shared_dir: Path | None = None
+_snapshot_lock = threading.Lock()
+
+
+def _snapshot() -> dict:
+    return {metric.name: [[list(k), v] for k, v in metric.current().items()] for metric in REGISTRY}
+
+
+def write_snapshot() -> None:
+    """Writes this process's values to the shared directory (atomically, as <pid>.json)."""
+    if _shared_dir is None:
+        return
+    path = _shared_dir / f"{os.getpid()}.json"
+    tmp = path.with_suffix(".tmp")
+    with _snapshot_lock:  # the last file written holds the latest values
+        tmp.write_text(json.dumps(_snapshot()))
+        os.replace(tmp, path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def share_across_processes(directory: str | Path, interval: float = 1.0) -> None:
+    """
+    Makes /metrics report every process writing to `directory`: this one writes its
+    snapshot there every `interval` seconds (and at exit), and `render` sums them all.
+    """
+    global _shared_dir
+    _shared_dir = Path(directory)
+    _shared_dir.mkdir(parents=True, exist_ok=True)
+
+    def run():
+        while True:
+            try:
+                write_snapshot()
+            except OSError as e:
+                logger.warning("Could not write the metrics snapshot: %s", e)
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="metrics-snapshot", daemon=True).start()
+    atexit.register(write_snapshot)
+
+
+def _merged() -> dict[str, dict[tuple, Any]]:
+    """Every metric's values summed over this process (live) and the others' snapshots."""
+    merged = {metric.name: metric.current() for metric in REGISTRY}
+    by_name = {metric.name: metric for metric in REGISTRY}
+    for path in _shared_dir.glob("*.json"):
+        pid = int(path.stem)
+        if pid == os.getpid():
+            continue
+        try:
+            snapshot = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        alive = _alive(pid)
+        for name, values in snapshot.items():
+            metric = by_name.get(name)
+            if metric is None or (isinstance(metric, Gauge) and (metric.shared or not alive)):
+                continue
+            ours = merged[name]
+            for key, value in values:
+                key = tuple(key)
+                ours[key] = metric.add(ours[key], value) if key in ours else value
+    return merged
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (of every process, when shared)."""
+    if _shared_dir is None:
+        return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+    merged = _merged()
+    return "\n".join(metric.render(merged[metric.name]) for metric in REGISTRY) + "\n"
+
+
+def _task(span) -> str:
+    return span.name.split(".", 1)[1]
+
+
+def span_started(span) -> None:
+    if span.name.startswith("pipeline."):
+        GRADINGS_IN_FLIGHT.inc(task=_task(span))
+
+
+def span_ended(span) -> None:
+    seconds = (span.end_ns - span.start_ns) / 1e9
+    attrs = span.attributes
+    if span.name.startswith("pipeline."):
+        task = _task(span)
+        GRADINGS_IN_FLIGHT.dec(task=task)
+        GRADINGS.inc(task=task, status=span.status)
+        GRADING_SECONDS.observe(seconds, task=task)
+    elif span.name.startswith("node."):
+        NODE_SECONDS.observe(seconds, node=attrs.get("node", ""))
+    elif span.name == "llm":
+        from core import config
+
+        LLM_CALLS.inc(node=attrs.get("node", ""), status=span.status)
+        if "queue_wait_ms" in attrs:
+            LLM_QUEUE_WAIT.observe(attrs["queue_wait_ms"] / 1000)
+        model = attrs.get("model") or config.LLM_MODEL
+        input_tokens, output_tokens = attrs.get("input_tokens") or 0, attrs.get("output_tokens") or 0
+        cached_tokens = attrs.get("cached_tokens") or 0
+        if input_tokens or output_tokens:
+            node = attrs.get("node", "")
+            LLM_TOKENS.inc(input_tokens, node=node, model=model, direction="input")
+            LLM_TOKENS.inc(output_tokens, node=node, model=model, direction="output")
+            if cached_tokens:
+                LLM_TOKENS.inc(cached_tokens, node=node, model=model, direction="cached")
+            LLM_COST.inc(((input_tokens - cached_tokens) * config.LLM_INPUT_COST_PER_MTOK
+                          + cached_tokens * config.LLM_CACHED_INPUT_COST_PER_MTOK
+                          + output_tokens * config.LLM_OUTPUT_COST_PER_MTOK) / 1e6, model=model)
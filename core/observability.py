@@ -0,0 +1,37 @@
+"""
+Wires up tracing, metrics and the grading history for a process.
+
+Entry points that grade (app.ui.create_app, app.api.create_api, core.worker,
+core.batch) call init_observability() once at startup: it configures the span
+exporters from TRACE_* and registers core.metrics and core.results as span
+listeners when METRICS_ENABLED / RESULT_STORE_ENABLED; with METRICS_MULTIPROC_DIR
+it also starts sharing this process's metrics with the other workers. Importing core.tracing
+on its own registers nothing, so library use and tests start without
+exporters or listeners.
+"""
+from __future__ import annotations
+
+import atexit
+import threading
+
+from core import config, metrics, results, tracing
+
+_lock = threading.Lock()
+_initialized = False
+
+
+def init_observability() -> None:
+    """Idempotent: a second call (e.g. the UI app mounting the API routes) does nothing."""
+    global _initialized
+    with _lock:
+        if _initialized:
+            return
+        _initialized = True
+        tracing.configure(config.TRACE_JSONL_PATH, config.TRACE_OTLP_ENDPOINT, config.TRACE_SERVICE_NAME)
+        if config.METRICS_ENABLED:
+            tracing.add_listener(metrics)
+            if config.METRICS_MULTIPROC_DIR:
+                metrics.share_across_processes(config.METRICS_MULTIPROC_DIR, config.METRICS_SNAPSHOT_SECONDS)
+        if config.RESULT_STORE_ENABLED:
+            tracing.add_listener(results)
+        atexit.register(tracing.flush)
@@ -1,20 +1,232 @@
+import asyncio
+import json
 import logging
 from pathlib import Path
-from adapters.external.part1_runner import run_part1
-from adapters.external.part2_runner import run_part2
+
+from adapters.external.part1_runner import (
+    run_part1,
+    run_part1_async,
+    stream_part1,
+    stream_part1_async,
+)
+from adapters.external.part2_runner import (
+    run_part2,
+    run_part2_async,
+    stream_part2,
+    stream_part2_async,
+)
+from core import config
+from core.cache import get_result_cache, make_key
 from core.formatting import format_success
+from core.metrics import CACHE_REQUESTS
+from core.prompts import prompt_signature
+from core.results import capture_grading, note_summary
+from core.tracing import annotate, traced
 
 logger = logging.getLogger(__name__)
 
+PART1_TITLE = "IELTS Writing Task 1 — Feedback"
+PART2_TITLE = "IELTS Writing Task 2 — Feedback"
+# Shown under partial reports while the remaining nodes are still running.
+IN_PROGRESS_NOTE = "\n\n_⏳ Still grading…_"
+
+
+def _part1_key(image_path: str | Path, essay_text: str, mode: str) -> str:
+    from core.criteria import get_rubric
+    from vendors.part1.model import model
+
+    return make_key(
+        "part1", essay_text,
+        image_bytes=Path(image_path).read_bytes(),
+        model_name=model.model, temperature=model.temperature, prompt_version=get_rubric("part1").version,
+        extra=f"{mode}:llm_summary={config.LLM_SUMMARY}:prompts={prompt_signature()}",
+    )
+
+
+def _part2_key(question: str, essay_text: str, mode: str) -> str:
+    from core.criteria import get_rubric
+    from vendors.part2.model import model
+
+    return make_key(
+        "part2", essay_text,
+        question=question,
+        model_name=model.model, temperature=model.temperature, prompt_version=get_rubric("part2").version,
+        extra=f"{mode}:llm_summary={config.LLM_SUMMARY}:prompts={prompt_signature()}",
+    )
+
 
-def analyze_part1(image_path: str | Path, essay_text: str) -> str:
-    logger.info("Pipeline: analyze_part1")
-    result_md = run_part1(image_path, essay_text)
+def _cached(key: str) -> str | None:
+    """
+    The cached report for `key`, or None. A cache entry is one JSON value,
+    {"report": markdown, "grading": bands (see capture_grading)}, so a report
+    never comes back without its bands.
+    """
+    annotate(inputs_hash=key)
+    cache = get_result_cache()
+    if cache is None:
+        return None
+    value = cache.get(key)
+    entry = None
+    if value is not None:
+        try:
+            entry = json.loads(value)
+        except ValueError:  # a bare report from before the bands were cached
+            pass
+    if not isinstance(entry, dict):
+        entry = None
+    annotate(cache_hit=entry is not None)
+    CACHE_REQUESTS.inc(cache="result", result="miss" if entry is None else "hit")
+    if entry is None:
+        return None
+    logger.info("Pipeline: cache hit %s", key[:12])
+    if entry.get("grading"):
+        note_summary(entry["grading"])
+    return entry["report"]
+
+
+def _store(key: str, result: str, grading: dict) -> None:
+    cache = get_result_cache()
+    # Reports with a placeholder for a failed node (the graph's `degraded` channel) are served but not kept.
+    if cache is not None and not grading.get("degraded"):
+        summary = {name: grading[name] for name in ("overall_band", "bands") if name in grading}
+        cache.set(key, json.dumps({"report": result, "grading": summary}, ensure_ascii=False))
+
+
+@traced("pipeline.part1")
+def analyze_part1(image_path: str | Path, essay_text: str, mode: str | None = None) -> str:
+    mode = mode or config.GRADING_MODE
+    annotate(mode=mode)
+    logger.info("Pipeline: analyze_part1 (%s)", mode)
+    key = _part1_key(image_path, essay_text, mode)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+    with capture_grading() as grading:
+        result_md = run_part1(image_path, essay_text, mode)
     # If your runner returns plain text, you can wrap it nicely:
-    return format_success("IELTS Writing Task 1 — Feedback", result_md)
+    result = format_success(PART1_TITLE, result_md)
+    _store(key, result, grading)
+    return result
+
+
+@traced("pipeline.part2")
+def analyze_part2(question: str, essay_text: str, mode: str | None = None) -> str:
+    mode = mode or config.GRADING_MODE
+    annotate(mode=mode)
+    logger.info("Pipeline: analyze_part2 (%s)", mode)
+    key = _part2_key(question, essay_text, mode)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+    with capture_grading() as grading:
+        result_md = run_part2(question, essay_text, mode)
+    result = format_success(PART2_TITLE, result_md)
+    _store(key, result, grading)
+    return result
+
+
+@traced("pipeline.part1")
+async def analyze_part1_async(image_path: str | Path, essay_text: str, mode: str | None = None) -> str:
+    mode = mode or config.GRADING_MODE
+    annotate(mode=mode)
+    logger.info("Pipeline: analyze_part1_async (%s)", mode)
+    key = await asyncio.to_thread(_part1_key, image_path, essay_text, mode)
+    cached = await asyncio.to_thread(_cached, key)
+    if cached is not None:
+        return cached
+    with capture_grading() as grading:
+        result_md = await run_part1_async(image_path, essay_text, mode)
+    result = format_success(PART1_TITLE, result_md)
+    await asyncio.to_thread(_store, key, result, grading)
+    return result
+
+
+@traced("pipeline.part2")
+async def analyze_part2_async(question: str, essay_text: str, mode: str | None = None) -> str:
+    mode = mode or config.GRADING_MODE
+    annotate(mode=mode)
+    logger.info("Pipeline: analyze_part2_async (%s)", mode)
+    key = await asyncio.to_thread(_part2_key, question, essay_text, mode)
+    cached = await asyncio.to_thread(_cached, key)
+    if cached is not None:
+        return cached
+    with capture_grading() as grading:
+        result_md = await run_part2_async(question, essay_text, mode)
+    result = format_success(PART2_TITLE, result_md)
+    await asyncio.to_thread(_store, key, result, grading)
+    return result
+
+
+# --- Streaming: yield the report as it grows, ending with the same markdown as analyze_* ---
+
+def _final(report: str | None) -> str:
+    if report is None:
+        # Nothing is cached for such a run: the next attempt grades again.
+        raise RuntimeError("The grading graph finished without producing a report")
+    return report
+
+
+def _stream(title: str, key: str, reports):
+    with capture_grading() as grading:
+        cached = _cached(key)
+        if cached is not None:
+            yield cached
+            return
+        report = None
+        for report in reports():
+            yield format_success(title, report) + IN_PROGRESS_NOTE
+    result = format_success(title, _final(report))
+    _store(key, result, grading)
+    yield result
+
+
+async def _astream(title: str, key: str, reports):
+    with capture_grading() as grading:
+        cached = await asyncio.to_thread(_cached, key)
+        if cached is not None:
+            yield cached
+            return
+        report = None
+        async for report in reports():
+            yield format_success(title, report) + IN_PROGRESS_NOTE
+    result = format_success(title, _final(report))
+    await asyncio.to_thread(_store, key, result, grading)
+    yield result
+
+
+@traced("pipeline.part1")
+def stream_analyze_part1(image_path: str | Path, essay_text: str, mode: str | None = None):
+    mode = mode or config.GRADING_MODE
+    annotate(mode=mode)
+    logger.info("Pipeline: stream_analyze_part1 (%s)", mode)
+    key = _part1_key(image_path, essay_text, mode)
+    yield from _stream(PART1_TITLE, key, lambda: stream_part1(image_path, essay_text, mode))
+
+
+@traced("pipeline.part2")
+def stream_analyze_part2(question: str, essay_text: str, mode: str | None = None):
+    mode = mode or config.GRADING_MODE
+    annotate(mode=mode)
+    logger.info("Pipeline: stream_analyze_part2 (%s)", mode)
+    key = _part2_key(question, essay_text, mode)
+    yield from _stream(PART2_TITLE, key, lambda: stream_part2(question, essay_text, mode))
+
+
+@traced("pipeline.part1")
+async def stream_analyze_part1_async(image_path: str | Path, essay_text: str, mode: str | None = None):
+    mode = mode or config.GRADING_MODE
+    annotate(mode=mode)
+    logger.info("Pipeline: stream_analyze_part1_async (%s)", mode)
+    key = await asyncio.to_thread(_part1_key, image_path, essay_text, mode)
+    async for markdown in _astream(PART1_TITLE, key, lambda: stream_part1_async(image_path, essay_text, mode)):
+        yield markdown
 
 
-def analyze_part2(question: str, essay_text: str) -> str:
-    logger.info("Pipeline: analyze_part2")
-    result_md = run_part2(question, essay_text)
-    return format_success("IELTS Writing Task 2 — Feedback", result_md)
\ No newline at end of file
+@traced("pipeline.part2")
+async def stream_analyze_part2_async(question: str, essay_text: str, mode: str | None = None):
+    mode = mode or config.GRADING_MODE
+    annotate(mode=mode)
+    logger.info("Pipeline: stream_analyze_part2_async (%s)", mode)
+    key = await asyncio.to_thread(_part2_key, question, essay_text, mode)
+    async for markdown in _astream(PART2_TITLE, key, lambda: stream_part2_async(question, essay_text, mode)):
+        yield markdown
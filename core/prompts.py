@@ -0,0 +1,142 @@
+"""
+Prompt styles and prompt-size accounting for the grading nodes.
+
+PROMPT_STYLE=full (default) sends the original examiner briefs.
+PROMPT_STYLE=compact sends short briefs with the same rubric and headings,
+asks for at most CRITERION_MAX_WORDS words per criterion report, and gives the
+optional LLM summary node each criterion's band and key points instead of the
+four full reports.
+
+How many prompt tokens each node sends in each style:
+
+    python -m core.prompts [--task part1 part2]
+
+(benchmarks/eval_prompts.py checks that compact grading agrees with full.)
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Mapping
+
+from core import config
+
+STYLES = ("full", "compact")
+
+
+def prompt_style() -> str:
+    if config.PROMPT_STYLE not in STYLES:
+        raise ValueError(f"Unknown PROMPT_STYLE: {config.PROMPT_STYLE!r} (expected one of {STYLES})")
+    return config.PROMPT_STYLE
+
+
+def prompt_signature() -> str:
+    """Everything about the prompt style that changes what the model is sent (for cache keys)."""
+    style = prompt_style()
+    signature = f"{style}:{config.CRITERION_MAX_WORDS}" if style == "compact" else style
+    return f"{signature}:json" if config.STRUCTURED_OUTPUT else signature
+
+
+def compact_brief(task: str, criterion: str, focus: str, bands: str) -> str:
+    """A short examiner brief for one criterion, in the headings parse_criterion_report reads."""
+    return (
+        f"You are an IELTS examiner. Assess this IELTS {task} response on **{criterion}** only; "
+        f"ignore the other criteria.\n"
+        f"Focus on: {focus}\n"
+        f"Band guide: {bands}\n\n"
+        f"Reply in at most {config.CRITERION_MAX_WORDS} words, in exactly this format:\n"
+        "**1. What You Did Well:**\n"
+        "* 1-3 short bullets\n"
+        "**2. What You Could Have Done Better:**\n"
+        "* 1-3 short bullets, quoting the response where useful\n"
+        "**3. Recommendations for Improvement:**\n"
+        "* 1-2 short bullets\n"
+        f"**4. Final {criterion} Score:**\n"
+        f"Final {criterion} Score: <band>\n\n"
+        "No greetings or closing remarks; end with the score."
+    )
+
+
+def compact_summary_brief(task: str) -> str:
+    return (
+        f"You are a senior IELTS examiner. Below are the band and key points of each criterion for one "
+        f"IELTS {task} response. Write the examiner's summary: 3-4 sentences on what most limits the "
+        "score and what to practise first. Do not repeat the scores or list the criteria again."
+    )
+
+
+def brief_report(criterion: Mapping | None, full_report: str) -> str:
+    """What the LLM summary node gets per criterion: the full report, or band and key points when compact."""
+    if prompt_style() != "compact" or not criterion:
+        return full_report
+    band = criterion.get("band")
+    lines = [f"Band: {band:g}" if band is not None else "Band: not available"]
+    if criterion.get("strengths"):
+        lines.append("Strengths: " + "; ".join(criterion["strengths"]))
+    if criterion.get("weaknesses"):
+        lines.append("Weaknesses: " + "; ".join(criterion["weaknesses"]))
+    return "\n".join(lines)
+
+
+# --- accounting ---
+
+SAMPLE_QUESTION = "Some people think that university education should be free for everyone. Discuss both views."
+SAMPLE_ESSAY = " ".join(["It is often argued that higher education should be funded by the state."] * 35)
+SAMPLE_IMAGE = "data:image/jpeg;base64,AAAA"
+
+
+def _sample_state(rubric) -> dict:
+    state = {field: SAMPLE_QUESTION for field in rubric.inputs.values()}
+    state["student_essay"] = SAMPLE_ESSAY
+    if rubric.image:
+        state[rubric.inputs[rubric.image]] = SAMPLE_IMAGE
+    # A criterion report as long as the style asks for: what the summary node receives.
+    words = 450 if prompt_style() == "full" else config.CRITERION_MAX_WORDS
+    report = "**1. What You Did Well:**\n* " + " ".join(["detail"] * words) + "\nFinal Score: 6"
+    for key in rubric.criteria:
+        state[key] = report
+    state["criteria"] = {key: {"band": 6.0, "strengths": ["Clear position."] * 3, "weaknesses": ["Thin support."] * 3}
+                         for key in rubric.criteria}
+    return state
+
+
+def node_prompt_tokens(task: str) -> dict[str, int]:
+    """Estimated prompt tokens per LLM node of `task` (a rubric name, e.g. "part2") in the current style."""
+    from core.criteria import get_rubric
+    from core.ratelimit import estimate_tokens
+
+    rubric = get_rubric(task)
+    state = _sample_state(rubric)
+    prompts = rubric.prompts()
+    return {node: estimate_tokens(prompts[prompt].invoke(inputs_fn(state)))
+            for node, (prompt, inputs_fn) in rubric.llm_nodes().items()}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Estimated prompt tokens per node, full vs compact.")
+    parser.add_argument("--task", nargs="+", default=["part1", "part2"], help="rubric names (rubrics/*.toml)")
+    args = parser.parse_args(argv)
+
+    original = config.PROMPT_STYLE
+    try:
+        for task in args.task:
+            sizes = {}
+            for style in STYLES:
+                config.PROMPT_STYLE = style
+                sizes[style] = node_prompt_tokens(task)
+            print(f"{task}: estimated prompt tokens per call (essay of {len(SAMPLE_ESSAY.split())} words)")
+            print(f"  {'node':<15}{'full':>8}{'compact':>9}{'saved':>8}")
+            for node in sizes["full"]:
+                full, compact = sizes["full"][node], sizes["compact"][node]
+                print(f"  {node:<15}{full:>8}{compact:>9}{1 - compact / full:>8.0%}")
+            fanout = [n for n in sizes["full"] if n not in ("Assessment", "Summary")]
+            for label, nodes in (("fanout", fanout), ("fused", ("Assessment",))):
+                full = sum(sizes["full"][n] for n in nodes)
+                compact = sum(sizes["compact"][n] for n in nodes)
+                print(f"  {label + ' grading':<15}{full:>8}{compact:>9}{1 - compact / full:>8.0%}")
+            print()
+    finally:
+        config.PROMPT_STYLE = original
+
+
+if __name__ == "__main__":
+    main()
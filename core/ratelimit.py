@@ -0,0 +1,293 @@
+"""
+Client-side rate limiting for LLM calls.
+
+AdaptiveLimiter combines
+  * two token buckets, one for requests per minute and one for (estimated)
+    tokens per minute, and
+  * an AIMD concurrency limit: +1/limit per successful call, halved on every
+    429, between `min_concurrency` and `max_concurrency`.
+
+RateLimitedModel wraps a chat model so every invoke/ainvoke waits for the
+limiter first and reports 429s back to it. It does not retry: the throttled
+error propagates to ResilientModel (core/resilience.py), which backs off with
+jitter and comes back through the limiter. The vendor model modules wrap
+their model with `rate_limited()`, so every node shares one limiter.
+
+Queue depth, waits and throttles are available from `AdaptiveLimiter.stats()`.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from core.tracing import clear_queue_wait, note_queue_wait
+
+logger = logging.getLogger(__name__)
+
+IMAGE_TOKENS = 258
+# Longest single sleep while waiting, so released slots are picked up quickly.
+_MAX_SLEEP = 0.05
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute` / 60 per second; `per_minute <= 0` means unlimited."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (requests bigger than the bucket only wait for a full one)."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / self.per_minute)
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.level -= amount
+
+    def drain(self) -> None:
+        """Empties the bucket (after a 429 the server clearly thinks we are over)."""
+        if not self.unlimited:
+            self._refill()
+            self.level = min(self.level, 0.0)
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        rpm: float = 0,
+        tpm: float = 0,
+        *,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.requests = TokenBucket(rpm, clock)
+        self.tokens = TokenBucket(tpm, clock)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Takes a slot and returns 0, or returns how long to sleep before trying again."""
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return _MAX_SLEEP
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            self.acquired += 1
+            return 0.0
+
+    def _waited(self, started: float) -> None:
+        waited = time.monotonic() - started
+        with self._lock:
+            self.waiting -= 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def acquire(self, tokens: int = 0) -> None:
+        started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            while (wait := self._try_acquire(tokens)) > 0:
+                time.sleep(min(wait, _MAX_SLEEP))
+        finally:
+            self._waited(started)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            while (wait := self._try_acquire(tokens)) > 0:
+                await asyncio.sleep(min(wait, _MAX_SLEEP))
+        finally:
+            self._waited(started)
+
+    def release(self, *, throttled: bool = False, reserved: int = 0, used: int | None = None) -> None:
+        """
+        Frees a slot. `throttled` marks a 429 (halves the concurrency limit); otherwise the
+        limit grows by 1/limit. `used` corrects the token bucket for the reserved estimate.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if used is not None and used != reserved:
+                self.tokens.take(used - reserved)
+            if throttled:
+                self.throttled += 1
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                self.requests.drain()
+                logger.warning("LLM rate limited (429); concurrency limit now %d", int(self.limit))
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "concurrency_limit": int(self.limit),
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "wait_seconds_total": self.wait_seconds,
+                "wait_seconds_max": self.max_wait_seconds,
+                "wait_seconds_avg": self.wait_seconds / self.acquired if self.acquired else 0.0,
+            }
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """True for 429 / RESOURCE_EXHAUSTED errors, whatever client library raised them."""
+    for attr in ("code", "status_code"):
+        if getattr(exc, attr, None) == 429:
+            return True
+    name = type(exc).__name__
+    if "ResourceExhausted" in name or "RateLimit" in name or "TooManyRequests" in name:
+        return True
+    return "429" in str(exc) or "RESOURCE_EXHAUSTED" in str(exc)
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough prompt size: text chars / 4 plus a flat cost per image."""
+    if hasattr(value, "to_messages"):
+        value = value.to_messages()
+    if isinstance(value, str):
+        return len(value) // 4
+    chars, images = 0, 0
+    for message in value if isinstance(value, list) else [value]:
+        content = getattr(message, "content", message)
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if isinstance(part, str):
+                chars += len(part)
+            elif part.get("type") == "image_url":
+                images += 1
+            else:
+                chars += len(part.get("text", ""))
+    return chars // 4 + images * IMAGE_TOKENS
+
+
+def _used_tokens(result: Any) -> int | None:
+    usage = getattr(result, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class RateLimitedModel(Runnable):
+    """
+    A chat model behind an AdaptiveLimiter. Attribute access (model, temperature, ...)
+    falls through to the wrapped model, so it can be used wherever the model was.
+    """
+
+    def __init__(self, model, limiter: AdaptiveLimiter, *, output_tokens: int = 0):
+        self.bound = model
+        self.limiter = limiter
+        self.output_tokens = output_tokens
+
+    def __getattr__(self, name):
+        if name == "bound":
+            raise AttributeError(name)
+        return getattr(self.bound, name)
+
+    def _reserve(self, input) -> int:
+        return estimate_tokens(input) + self.output_tokens
+
+    def invoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        reserved = self._reserve(input)
+        started = time.monotonic()
+        self.limiter.acquire(reserved)
+        wait = note_queue_wait(time.monotonic() - started)
+        throttled, used = False, reserved
+        try:
+            result = self.bound.invoke(input, config, **kwargs)
+            used = _used_tokens(result)
+            return result
+        except Exception as e:
+            throttled = is_rate_limit_error(e)
+            raise
+        finally:
+            clear_queue_wait(wait)
+            self.limiter.release(throttled=throttled, reserved=reserved, used=used)
+
+    async def ainvoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        reserved = self._reserve(input)
+        started = time.monotonic()
+        await self.limiter.aacquire(reserved)
+        wait = note_queue_wait(time.monotonic() - started)
+        throttled, used = False, reserved
+        try:
+            result = await self.bound.ainvoke(input, config, **kwargs)
+            used = _used_tokens(result)
+            return result
+        except Exception as e:
+            throttled = is_rate_limit_error(e)
+            raise
+        finally:
+            clear_queue_wait(wait)
+            self.limiter.release(throttled=throttled, reserved=reserved, used=used)
+
+
+_limiter: AdaptiveLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveLimiter:
+    """
+    The process-wide limiter shared by every LLM call, configured from core.config
+    with this process's share (1 / LLM_QUOTA_SHARES) of the quota.
+    """
+    global _limiter
+    from core import config
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                shares = max(1, config.LLM_QUOTA_SHARES)
+                _limiter = AdaptiveLimiter(
+                    config.LLM_RPM / shares,
+                    config.LLM_TPM / shares,
+                    max_concurrency=max(1, config.LLM_MAX_CONCURRENCY // shares),
+                    min_concurrency=config.LLM_MIN_CONCURRENCY,
+                )
+    return _limiter
+
+
+def rate_limited(model) -> RateLimitedModel:
+    """Wraps `model` with the shared limiter (see core.config LLM_* settings)."""
+    from core import config
+
+    return RateLimitedModel(model, get_limiter(), output_tokens=config.LLM_EXPECTED_OUTPUT_TOKENS)
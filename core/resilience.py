@@ -0,0 +1,292 @@
+"""
+Deadlines, retries and hedged requests for LLM calls, and graceful degradation
+for graph nodes.
+
+ResilientModel wraps a chat model (normally the rate-limited one, so every
+attempt and every hedge takes its own limiter slot):
+  * each attempt gets `timeout` seconds, and all attempts of one node call
+    together get the node's deadline (`deadline`, or `deadlines[node]`);
+  * transient failures (timeouts, 5xx, dropped connections, 429s) are retried
+    with full-jitter exponential backoff; this is the only retry loop, a
+    throttled attempt waits for the limiter again like any other;
+  * with `hedge=True`, an attempt that is still running after the node's
+    recent p95 latency gets a duplicate request; the first answer wins and the
+    other one is cancelled. Hedges are skipped while the limiter has a queue.
+
+Sync callers go through the same async code on a background event loop, so
+timed-out attempts and losing hedges are cancelled there too, instead of
+being left running on threads.
+
+graceful_criterion / graceful_summary wrap graph nodes so that a criterion
+that still fails produces a placeholder report (no band) instead of failing
+the whole graph; the local aggregator then averages the remaining bands.
+The fused grading node is not wrapped: it grades every criterion in one call,
+so when it fails there are no bands left to average and the grading fails.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from core.metrics import LatencyWindow
+from core.ratelimit import is_rate_limit_error
+from core.schemas import CriterionAssessment
+
+logger = logging.getLogger(__name__)
+
+# Appears in every placeholder report; reports containing it are not cached.
+DEGRADED_NOTE = "could not be completed"
+
+_TRANSIENT_NAMES = ("ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "ServerError",
+                    "APIConnectionError", "GatewayTimeout")
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Failures worth retrying, 429s included (the limiter has already slowed down for those)."""
+    if is_rate_limit_error(exc) or isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    for attr in ("code", "status_code"):
+        if getattr(exc, attr, None) in (500, 502, 503, 504):
+            return True
+    return any(name in type(exc).__name__ for name in _TRANSIENT_NAMES)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random = random) -> float:
+    """Full jitter: uniform between 0 and min(cap, base * 2**attempt)."""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """The event loop, on a daemon thread, that runs the LLM calls of sync callers."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-calls", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def _node_name(config: RunnableConfig | None) -> str:
+    return ((config or {}).get("metadata") or {}).get("langgraph_node", "")
+
+
+class ResilientModel(Runnable):
+    """
+    A chat model with per-attempt timeouts, per-node deadlines, retries and optional
+    hedging. Attribute access falls through to the wrapped model.
+    """
+
+    def __init__(
+        self,
+        model,
+        *,
+        timeout: float = 60,
+        deadline: float = 150,
+        deadlines: dict[str, float] | None = None,
+        retries: int = 2,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 20.0,
+        hedge: bool = False,
+        hedge_nodes: tuple[str, ...] | None = None,
+        hedge_percentile: float = 95,
+        hedge_min_seconds: float = 2.0,
+        hedge_min_samples: int = 20,
+        limiter=None,
+    ):
+        self.bound = model
+        self.timeout = timeout
+        self.deadline = deadline
+        self.deadlines = deadlines or {}
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.hedge_nodes = hedge_nodes
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self.limiter = limiter
+        self.latencies: dict[str, LatencyWindow] = defaultdict(LatencyWindow)
+        self.counts = {"calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name == "bound":
+            raise AttributeError(name)
+        return getattr(self.bound, name)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def _hedge_delay(self, node: str) -> float | None:
+        """Seconds to wait before hedging a call from `node`, or None to not hedge it."""
+        if not self.hedge or (self.hedge_nodes is not None and node not in self.hedge_nodes):
+            return None
+        window = self.latencies[node]
+        if len(window) < self.hedge_min_samples:
+            return None
+        if self.limiter is not None and self.limiter.stats()["queue_depth"] > 0:
+            return None
+        return max(self.hedge_min_seconds, window.percentile(self.hedge_percentile))
+
+    def _budget(self, node: str) -> float:
+        return self.deadlines.get(node, self.deadline)
+
+    def _retry_delay(self, exc: Exception, attempt: int, node: str, remaining: float) -> float | None:
+        """How long to back off before the next attempt, or None to give up and raise."""
+        if isinstance(exc, TimeoutError):
+            self._count("timeouts")
+        if attempt >= self.retries or not is_transient_error(exc):
+            return None
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+        if delay >= remaining:
+            return None
+        self._count("retries")
+        logger.warning("LLM call for %s failed (%s); retry %d in %.1f s", node or "?", type(exc).__name__,
+                       attempt + 1, delay)
+        return delay
+
+    # --- async ---
+
+    async def _acall(self, node: str, input, config, kwargs):
+        started = time.monotonic()
+        result = await self.bound.ainvoke(input, config, **kwargs)
+        self.latencies[node].add(time.monotonic() - started)
+        return result
+
+    async def _arace(self, node: str, input, config, kwargs):
+        delay = self._hedge_delay(node)
+        primary = asyncio.ensure_future(self._acall(node, input, config, kwargs))
+        tasks = [primary]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self._count("hedges")
+                    tasks.append(asyncio.ensure_future(self._acall(node, input, config, kwargs)))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def ainvoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        node = _node_name(config)
+        self._count("calls")
+        end = time.monotonic() + self._budget(node)
+        for attempt in range(self.retries + 1):
+            remaining = end - time.monotonic()
+            timeout = min(self.timeout, remaining)
+            try:
+                if timeout <= 0:
+                    raise TimeoutError(f"deadline for {node or 'LLM call'} exceeded")
+                return await asyncio.wait_for(self._arace(node, input, config, kwargs), timeout)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, node, end - time.monotonic())
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+    # --- sync ---
+
+    def invoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        # The coroutine is scheduled from this thread, so it runs in a copy of this thread's context.
+        future = asyncio.run_coroutine_threadsafe(self.ainvoke(input, config, **kwargs), _background_loop())
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counts)
+        stats["p95_seconds"] = {node: window.percentile(95) for node, window in list(self.latencies.items())}
+        return stats
+
+
+def resilient(model) -> ResilientModel:
+    """Wraps `model` with the retry/deadline/hedging policy from core.config."""
+    from core import config
+    from core.ratelimit import get_limiter
+
+    return ResilientModel(
+        model,
+        timeout=config.LLM_TIMEOUT_SECONDS,
+        deadline=config.NODE_DEADLINE_SECONDS,
+        deadlines=config.NODE_DEADLINES,
+        retries=config.LLM_RETRIES,
+        backoff_base=config.LLM_BACKOFF_BASE_SECONDS,
+        backoff_cap=config.LLM_BACKOFF_MAX_SECONDS,
+        hedge=config.HEDGE_ENABLED,
+        hedge_nodes=config.HEDGE_NODES,
+        hedge_percentile=config.HEDGE_PERCENTILE,
+        hedge_min_seconds=config.HEDGE_MIN_SECONDS,
+        limiter=get_limiter(),
+    )
+
+
+def _wrap_node(node, fallback):
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def wrapper(state):
+            try:
+                return await node(state)
+            except Exception as e:
+                return fallback(state, e)
+    else:
+        @functools.wraps(node)
+        def wrapper(state):
+            try:
+                return node(state)
+            except Exception as e:
+                return fallback(state, e)
+    return wrapper
+
+
+def graceful_criterion(node, key: str):
+    """Turns a failing criterion node into a placeholder report with no band."""
+    def fallback(state, exc: Exception) -> dict:
+        logger.error("Criterion %s failed, grading without it: %s: %s", key, type(exc).__name__, exc)
+        report = (
+            f"⚠️ The assessment of this criterion {DEGRADED_NOTE} ({type(exc).__name__}). "
+            "The overall band is estimated from the other criteria; please try again for a full report."
+        )
+        return {
+            key: report,
+            "criteria": {key: CriterionAssessment(band=None, report=report).model_dump()},
+            "degraded": [key],
+        }
+    return _wrap_node(node, fallback)
+
+
+def graceful_summary(node):
+    """Keeps the local summary when the optional LLM summary node fails."""
+    def fallback(state, exc: Exception) -> dict:
+        logger.error("LLM summary failed, keeping the local one: %s: %s", type(exc).__name__, exc)
+        note = f"⚠️ The examiner's summary {DEGRADED_NOTE} ({type(exc).__name__})."
+        local = state.get("aggregated_result")
+        return {"aggregated_result": f"{local}\n\n{note}" if local else note, "degraded": ["summary"]}
+    return _wrap_node(node, fallback)
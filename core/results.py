@@ -0,0 +1,372 @@
+"""
+Grading history on SQLite: every finished grading with its bands, latency and tokens.
+
+core.tracing feeds this module the same way it feeds core.metrics. When a
+grading's trace ends, one row goes into `gradings`: who graded what (user,
+task, mode, the result-cache key of the inputs), the overall and criterion
+bands, wall time, LLM calls and tokens. The daily rollups are updated in the
+same transaction:
+
+  * band_days:  (user, task, criterion, day) -> gradings, sum of bands
+                ("overall" counts as a criterion);
+  * usage_days: (task, day) -> gradings, cache hits, errors, latency, tokens.
+
+Progress and usage queries read only the rollups, so they scan one index range
+of days, not millions of gradings. History reads `gradings` through its
+(user, task, created) index. Days are UTC. A result-cache hit is recorded too,
+with the bands of the grading it was served from.
+
+Rows are written from a background thread, off the request path.
+
+    python -m core.results history <user> [--task part2] [--limit 20]
+    python -m core.results progress <user> [--task part2] [--bucket week] [--days 90]
+    python -m core.results usage [--task part2] [--bucket day] [--days 30]
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from core.db import connect
+from core.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+OVERALL = "overall"
+# Each bucket as a SQL expression over the rollups' `day` (days since 1970-01-01, a Thursday).
+PERIODS = {
+    "day": "date(day * 86400, 'unixepoch')",
+    "week": "date((day - (day + 3) % 7) * 86400, 'unixepoch')",  # the Monday
+    "month": "strftime('%Y-%m-01', day * 86400, 'unixepoch')",
+}
+
+
+def _row(cursor, row) -> dict:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class ResultStore:
+    def __init__(self, path: str | Path):
+        self.path = str(path)
+        self._db = connect(path)
+        self._db.row_factory = _row
+        self._lock = threading.Lock()
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS gradings ("
+            " id INTEGER PRIMARY KEY,"
+            " created REAL NOT NULL,"
+            " user TEXT NOT NULL DEFAULT '',"
+            " task TEXT NOT NULL,"
+            " mode TEXT,"
+            " inputs_hash TEXT,"
+            " overall_band REAL,"
+            " bands TEXT,"
+            " cache_hit INTEGER NOT NULL DEFAULT 0,"
+            " status TEXT NOT NULL,"
+            " latency_ms REAL,"
+            " llm_calls INTEGER NOT NULL DEFAULT 0,"
+            " input_tokens INTEGER NOT NULL DEFAULT 0,"
+            " output_tokens INTEGER NOT NULL DEFAULT 0,"
+            " cached_tokens INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS gradings_user ON gradings(user, task, created);"
+            "CREATE INDEX IF NOT EXISTS gradings_task ON gradings(task, created);"
+            "CREATE INDEX IF NOT EXISTS gradings_inputs ON gradings(inputs_hash, created);"
+            "CREATE TABLE IF NOT EXISTS band_days ("
+            " user TEXT NOT NULL, task TEXT NOT NULL, criterion TEXT NOT NULL, day INTEGER NOT NULL,"
+            " gradings INTEGER NOT NULL, band_sum REAL NOT NULL,"
+            " PRIMARY KEY (user, task, criterion, day)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS usage_days ("
+            " task TEXT NOT NULL, day INTEGER NOT NULL,"
+            " gradings INTEGER NOT NULL, cache_hits INTEGER NOT NULL, errors INTEGER NOT NULL,"
+            " latency_ms REAL NOT NULL, llm_calls INTEGER NOT NULL, input_tokens INTEGER NOT NULL,"
+            " output_tokens INTEGER NOT NULL, cached_tokens INTEGER NOT NULL,"
+            " PRIMARY KEY (task, day)) WITHOUT ROWID;"
+        )
+
+    def record(self, *, task: str, user: str | None = None, mode: str | None = None,
+               inputs_hash: str | None = None, overall_band: float | None = None,
+               bands: dict[str, float | None] | None = None, cache_hit: bool = False, status: str = "ok",
+               latency_ms: float | None = None, llm_calls: int = 0, input_tokens: int = 0,
+               output_tokens: int = 0, cached_tokens: int = 0, created: float | None = None) -> int:
+        """Adds one grading (and its share of the rollups); returns its row id."""
+        created = time.time() if created is None else created
+        day = int(created // DAY)
+        user = user or ""
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if bands is None and inputs_hash:
+                    # Served from the result cache: the bands are those of the grading that filled it.
+                    source = db.execute(
+                        "SELECT overall_band, bands FROM gradings WHERE inputs_hash = ? AND bands IS NOT NULL"
+                        " ORDER BY created DESC LIMIT 1", (inputs_hash,),
+                    ).fetchone()
+                    if source is not None:
+                        overall_band, bands = source["overall_band"], json.loads(source["bands"])
+                grading_id = db.execute(
+                    "INSERT INTO gradings (created, user, task, mode, inputs_hash, overall_band, bands, cache_hit,"
+                    " status, latency_ms, llm_calls, input_tokens, output_tokens, cached_tokens)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (created, user, task, mode, inputs_hash, overall_band, json.dumps(bands) if bands else None,
+                     int(bool(cache_hit)), status, latency_ms, llm_calls, input_tokens, output_tokens,
+                     cached_tokens),
+                ).lastrowid
+                scores = {**(bands or {}), OVERALL: overall_band} if status == "ok" else {}
+                db.executemany(
+                    "INSERT INTO band_days VALUES (?, ?, ?, ?, 1, ?) ON CONFLICT (user, task, criterion, day)"
+                    " DO UPDATE SET gradings = gradings + 1, band_sum = band_sum + excluded.band_sum",
+                    [(user, task, criterion, day, band) for criterion, band in scores.items() if band is not None],
+                )
+                db.execute(
+                    "INSERT INTO usage_days VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (task, day) DO UPDATE SET"
+                    " gradings = gradings + 1, cache_hits = cache_hits + excluded.cache_hits,"
+                    " errors = errors + excluded.errors, latency_ms = latency_ms + excluded.latency_ms,"
+                    " llm_calls = llm_calls + excluded.llm_calls, input_tokens = input_tokens + excluded.input_tokens,"
+                    " output_tokens = output_tokens + excluded.output_tokens,"
+                    " cached_tokens = cached_tokens + excluded.cached_tokens",
+                    (task, day, int(bool(cache_hit)), int(status != "ok"), latency_ms or 0, llm_calls,
+                     input_tokens, output_tokens, cached_tokens),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return grading_id
+
+    def history(self, user: str, task: str | None = None, *, limit: int = 20,
+                before: float | None = None) -> list[dict]:
+        """A user's latest gradings, newest first; pass the last `created` as `before` for the next page."""
+        where, params = ["user = ?"], [user]
+        if task:
+            where.append("task = ?")
+            params.append(task)
+        if before is not None:
+            where.append("created < ?")
+            params.append(before)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, created, task, mode, overall_band, bands, cache_hit, status, latency_ms FROM gradings"
+                f" WHERE {' AND '.join(where)} ORDER BY created DESC LIMIT ?", (*params, limit),
+            ).fetchall()
+        for row in rows:
+            row["bands"] = json.loads(row["bands"]) if row["bands"] else None
+            row["cache_hit"] = bool(row["cache_hit"])
+        return rows
+
+    def progress(self, user: str, task: str | None = None, *, bucket: str = "week",
+                 since: float | None = None) -> list[dict]:
+        """Average band per criterion (and "overall") per day, week or month, oldest first."""
+        where, params = self._range(since, task)
+        with self._lock:
+            return self._db.execute(
+                f"SELECT {PERIODS[bucket]} AS period, criterion, SUM(gradings) AS gradings,"
+                " ROUND(SUM(band_sum) / SUM(gradings), 2) AS band FROM band_days"
+                f" WHERE user = ?{where} GROUP BY period, criterion ORDER BY period, criterion",
+                (user, *params),
+            ).fetchall()
+
+    def usage(self, task: str | None = None, *, bucket: str = "day", since: float | None = None) -> list[dict]:
+        """Gradings, cache hits, errors, mean latency and tokens per task and day, week or month."""
+        where, params = self._range(since, task)
+        with self._lock:
+            return self._db.execute(
+                f"SELECT {PERIODS[bucket]} AS period, task, SUM(gradings) AS gradings, SUM(cache_hits) AS cache_hits,"
+                " SUM(errors) AS errors, ROUND(SUM(latency_ms) / SUM(gradings), 1) AS mean_latency_ms,"
+                " SUM(llm_calls) AS llm_calls, SUM(input_tokens) AS input_tokens,"
+                " SUM(output_tokens) AS output_tokens, SUM(cached_tokens) AS cached_tokens FROM usage_days"
+                f" WHERE 1{where} GROUP BY period, task ORDER BY period, task",
+                params,
+            ).fetchall()
+
+    @staticmethod
+    def _range(since: float | None, task: str | None) -> tuple[str, list]:
+        where, params = "", []
+        if task:
+            where += " AND task = ?"
+            params.append(task)
+        if since is not None:
+            where += " AND day >= ?"
+            params.append(int(since // DAY))
+        return where, params
+
+
+_store: ResultStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """The process-wide store on RESULT_STORE_PATH."""
+    global _store
+    from core import config
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore(config.RESULT_STORE_PATH)
+    return _store
+
+
+# --- a grading's bands, for its history row and for callers that want them as data ---
+
+_capture: contextvars.ContextVar[dict | None] = contextvars.ContextVar("grading_capture", default=None)
+
+
+@contextmanager
+def capture_grading():
+    """
+    Yields a dict that receives the overall band and criterion bands of the
+    grading run inside the block (see note_grading). Nested blocks share the
+    outer dict, so core.pipeline and its callers (app/api.py) see the same one.
+    """
+    grading = _capture.get()
+    if grading is not None:
+        yield grading
+        return
+    grading = {}
+    token = _capture.set(grading)
+    try:
+        yield grading
+    finally:
+        try:
+            _capture.reset(token)
+        except ValueError:
+            pass  # a generator resumed in another context, as in core.tracing.span
+
+
+def grading_target() -> tuple:
+    """
+    Where note_grading puts the bands: the current span and capture. Streams
+    take this before their first yield, since Gradio may pull later chunks
+    from another context.
+    """
+    return current_span(), _capture.get()
+
+
+def grading_summary(state: dict) -> dict:
+    criteria = state.get("criteria") or {}
+    return {"overall_band": state.get("estimated_band_score"),
+            "bands": {key: value.get("band") for key, value in criteria.items()} or None}
+
+
+def note_grading(state: dict, target: tuple | None = None) -> None:
+    """
+    Records a finished grading's bands on its span (for the history row) and
+    capture. The capture also gets the graph's `degraded` channel: the nodes
+    whose output is a placeholder, so core.pipeline does not cache the report.
+    """
+    note_summary(grading_summary(state), target)
+    _, grading = target or grading_target()
+    if grading is not None:
+        grading["degraded"] = [*grading.get("degraded", ()), *(state.get("degraded") or ())]
+
+
+def note_summary(summary: dict, target: tuple | None = None) -> None:
+    span, grading = target or grading_target()
+    if span is not None:
+        span.set(**summary)
+    if grading is not None:
+        grading.update(summary)
+
+
+# --- tracing listener: one row per trace that ran a pipeline span ---
+
+# Span attributes copied into the row, whichever span of the trace set them.
+_ATTRIBUTES = ("user", "mode", "inputs_hash", "cache_hit", "overall_band", "bands")
+_TOKENS = ("input_tokens", "output_tokens", "cached_tokens")
+
+_traces: dict[str, dict] = {}
+_traces_lock = threading.Lock()
+_rows: queue.Queue = queue.Queue()
+_writer: threading.Thread | None = None
+
+
+def span_started(span) -> None:
+    pass
+
+
+def span_ended(span) -> None:
+    attrs = span.attributes
+    with _traces_lock:
+        trace = _traces.setdefault(span.trace_id, {"llm_calls": 0, **dict.fromkeys(_TOKENS, 0)})
+        if span.name == "llm":
+            trace["llm_calls"] += 1
+            for name in _TOKENS:
+                trace[name] += attrs.get(name) or 0
+        else:
+            trace.update((name, attrs[name]) for name in _ATTRIBUTES if name in attrs)
+        if span.name.startswith("pipeline."):
+            trace.update(task=span.name.split(".", 1)[1], status=span.status, created=span.start_ns / 1e9,
+                         latency_ms=(span.end_ns - span.start_ns) / 1e6)
+        if span.parent_id is not None:
+            return
+        trace = _traces.pop(span.trace_id)
+    if "task" in trace:
+        _write(trace)
+
+
+def _write(row: dict) -> None:
+    global _writer
+    if _writer is None:
+        with _store_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_run, name="result-store", daemon=True)
+                _writer.start()
+                atexit.register(flush)
+    _rows.put(row)
+
+
+def _run() -> None:
+    while True:
+        row = _rows.get()
+        try:
+            get_result_store().record(**row)
+        except Exception as e:
+            logger.warning("Grading not recorded in the result store: %s", e)
+        finally:
+            _rows.task_done()
+
+
+def flush() -> None:
+    """Waits until every finished grading is in the store."""
+    _rows.join()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m core.results", description="Grading history and usage.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    history = commands.add_parser("history", help="a user's latest gradings")
+    history.add_argument("user")
+    history.add_argument("--limit", type=int, default=20)
+    progress = commands.add_parser("progress", help="a user's average bands over time")
+    progress.add_argument("user")
+    usage = commands.add_parser("usage", help="gradings, latency and tokens over time")
+    for command in (history, progress, usage):
+        command.add_argument("--task")
+    for command in (progress, usage):
+        command.add_argument("--bucket", choices=tuple(PERIODS), default="week" if command is progress else "day")
+        command.add_argument("--days", type=float, default=90 if command is progress else 30)
+    args = parser.parse_args(argv)
+
+    store = get_result_store()
+    if args.command == "history":
+        rows = store.history(args.user, args.task, limit=args.limit)
+    elif args.command == "progress":
+        rows = store.progress(args.user, args.task, bucket=args.bucket, since=time.time() - args.days * DAY)
+    else:
+        rows = store.usage(args.task, bucket=args.bucket, since=time.time() - args.days * DAY)
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Pydantic models for structured LLM outputs."""
+from pydantic import BaseModel, Field
+
+
+class Example(BaseModel):
+    """A sentence from the student's response and a better version of it."""
+    original: str
+    improved: str
+
+
+class CriterionReport(BaseModel):
+    """What the model returns for one criterion (the fused model has one per criterion)."""
+    report: str = Field(description="The full Markdown assessment for this criterion")
+    strengths: list[str] = Field(default_factory=list)
+    weaknesses: list[str] = Field(default_factory=list)
+    examples: list[Example] = Field(default_factory=list)
+    band: float = Field(ge=0, le=9, description="Band score for this criterion")
+
+
+class CriterionAssessment(BaseModel):
+    """Structured result of one criterion node."""
+    band: float | None = Field(default=None, ge=0, le=9)
+    strengths: list[str] = Field(default_factory=list)
+    weaknesses: list[str] = Field(default_factory=list)
+    examples: list[Example] = Field(default_factory=list)
+    report: str = ""
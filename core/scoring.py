@@ -0,0 +1,131 @@
+"""
+Band-score arithmetic and report summaries shared by both tasks.
+
+The overall Writing band is the mean of the four criterion bands, rounded to
+the nearest half band with quarter averages rounded up (6.25 -> 6.5,
+6.75 -> 7.0), exactly as the aggregator prompt describes it.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections.abc import Iterable, Mapping
+
+from core.schemas import CriterionAssessment
+
+# "**1. What You Did Well:**", "### 2. What You Could Have Done Better", ...
+_HEADING_RE = re.compile(r"^[ \t]*(?:#+[ \t]*)?\**[ \t]*\d\.[ \t]*(?P<title>[^\n*:]+?)[ \t]*:?[ \t]*\**[ \t]*:?[ \t]*$", re.MULTILINE)
+_FINAL_SCORE_RE = re.compile(r"Final[^\n:]*Score\**[ \t]*:?[ \t]*\**[ \t]*(\d(?:\.\d)?)", re.IGNORECASE)
+_ANY_SCORE_RE = re.compile(r"Score\**[ \t]*:[ \t]*\**[ \t]*(\d(?:\.\d)?)", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^[ \t]*(?:[*\-•]|\d+[.)])[ \t]+")
+
+
+def round_band(average: float) -> float:
+    """Rounds an average to the nearest half band, with .25/.75 going up."""
+    return math.floor(average * 2 + 0.5 + 1e-9) / 2
+
+
+def overall_band(bands: Iterable[float]) -> float:
+    bands = list(bands)
+    if not bands:
+        raise ValueError("No criterion bands to aggregate")
+    return round_band(sum(bands) / len(bands))
+
+
+def extract_band(report: str) -> float | None:
+    """The band a criterion report ends with ("Final ... Score: 6"), if any."""
+    matches = _FINAL_SCORE_RE.findall(report) or _ANY_SCORE_RE.findall(report)
+    if not matches:
+        return None
+    band = float(matches[-1])
+    return band if 0 <= band <= 9 else None
+
+
+def _sections(report: str) -> dict[str, str]:
+    headings = list(_HEADING_RE.finditer(report))
+    sections = {}
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(report)
+        sections[match.group("title").strip().lower()] = report[match.end():end].strip()
+    return sections
+
+
+def _points(section: str, limit: int = 3) -> list[str]:
+    """First few bullet points (or lines) of a section, without Markdown markers."""
+    points = []
+    for line in section.splitlines():
+        line = _BULLET_RE.sub("", line).replace("**", "").strip()
+        if line:
+            points.append(line)
+        if len(points) == limit:
+            break
+    return points
+
+
+def parse_criterion_report(report: str, band: float | None = None) -> CriterionAssessment:
+    """Structured view of a criterion report written in the examiner-brief format."""
+    strengths, weaknesses = [], []
+    for title, body in _sections(report).items():
+        if "did well" in title or "strength" in title:
+            strengths = _points(body)
+        elif "done better" in title or "weakness" in title or ("improvement" in title and not weaknesses):
+            weaknesses = _points(body)
+    return CriterionAssessment(
+        band=band if band is not None else extract_band(report),
+        strengths=strengths,
+        weaknesses=weaknesses,
+        report=report,
+    )
+
+
+def summarize(task_title: str, criteria: Mapping[str, Mapping],
+              titles: Mapping[str, str]) -> tuple[float | None, str]:
+    """
+    Deterministic replacement for the LLM aggregator: returns the overall band and
+    a report in the aggregator's format, built from structured criterion results.
+    `titles` (criterion key -> name, Rubric.titles) sets which criteria are reported, in order.
+    """
+    bands = {key: c["band"] for key, c in criteria.items() if c.get("band") is not None}
+    overall = overall_band(bands.values()) if bands else None
+
+    parts = [
+        f"**Overall IELTS {task_title} Feedback**",
+        "Here is a summary of your performance based on the four official IELTS scoring criteria.",
+    ]
+    for i, (key, title) in enumerate(titles.items(), start=1):
+        c = criteria.get(key) or {}
+        strengths = "; ".join(c.get("strengths") or []) or "See the detailed report above."
+        weaknesses = "; ".join(c.get("weaknesses") or []) or "See the detailed report above."
+        score = f"{c['band']:g}" if c.get("band") is not None else "not available"
+        parts.append(
+            f"**{i}. {title}**\n"
+            f"* **Strengths:** {strengths}\n"
+            f"* **Areas for Improvement:** {weaknesses}\n"
+            f"* **Expert Score:** {score}"
+        )
+
+    parts.append("---")
+    if overall is None:
+        parts.append("**Final Analysis and Overall Score**\n* **Overall Band Score:** not available")
+    else:
+        lowest = min(bands, key=bands.get)
+        missing = [titles[k] for k in titles if k not in bands]
+        comment = (
+            f"Your strongest area is {titles[max(bands, key=bands.get)]} and the one holding your score "
+            f"back most is {titles[lowest]}; focus your practice there first."
+            if len(set(bands.values())) > 1 else
+            "Your performance is even across the criteria; improving any one of them will lift the overall band."
+        )
+        if missing:
+            comment += f" (Overall band computed without: {', '.join(missing)}.)"
+        parts.append(
+            "**Final Analysis and Overall Score**\n"
+            f"* **Summative Comments:** {comment}\n"
+            f"* **Overall Band Score:** {overall:.1f}"
+        )
+    return overall, "\n\n".join(parts)
+
+
+def with_llm_summary(local: str | None, summary: str) -> str:
+    """Appends an LLM examiner summary below the locally computed one (if there is one)."""
+    return f"{local}\n\n**Examiner's Summary**\n\n{summary}" if local else summary
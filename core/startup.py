@@ -0,0 +1,92 @@
+"""
+Cold-start checks for the web UI.
+
+    python -m app.ui --profile-startup      # import-time breakdown of app.ui
+    python -m core.startup [module] [--top 25]
+
+Importing app.ui should only pull in Gradio and the small core modules; the
+grading stack (LangGraph, LangChain, the Gemini client, the vendor graphs) is
+imported by the first grading request. Both helpers run the import in a fresh
+interpreter, so they measure a real cold start.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Must not be imported before the first grading request.
+DEFERRED_MODULES = ("langgraph", "langchain_core", "langchain_google_genai", "vendors", "core.pipeline",
+                    "core.criteria")
+
+_MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+loaded = sorted(m for m in sys.modules if m.split(".")[0] in {roots!r} or m in {deferred!r})
+print(json.dumps({{"seconds": seconds, "loaded": loaded}}))
+"""
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def measure_import(module: str = "app.ui") -> dict:
+    """Seconds to import `module` in a fresh interpreter, and which deferred modules it loaded."""
+    code = _MEASURE.format(
+        module=module,
+        roots=tuple(m for m in DEFERRED_MODULES if "." not in m),
+        deferred=tuple(m for m in DEFERRED_MODULES if "." in m),
+    )
+    return json.loads(_run(code).stdout.strip().splitlines()[-1])
+
+
+def import_profile(module: str = "app.ui") -> list[tuple[str, float, float]]:
+    """(module, self seconds, cumulative seconds) for every import, from `python -X importtime`."""
+    rows = []
+    for line in _run(f"import {module}", "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return rows
+
+
+def print_profile(module: str = "app.ui", top: int = 25) -> None:
+    rows = import_profile(module)
+    # Self times add up without double counting, so they can be summed per package.
+    packages: dict[str, float] = {}
+    for name, self_s, _ in rows:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0.0) + self_s
+    total = sum(packages.values())
+    print(f"import {module}: {total:.2f} s in {len(rows)} modules\n")
+    print("by package (self time):")
+    for root, seconds in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {seconds:7.3f} s  {root}")
+    print("\nslowest modules (cumulative):")
+    for name, _, cumulative in sorted(rows, key=lambda r: -r[2])[:top]:
+        print(f"  {cumulative:7.3f} s  {name}")
+    deferred = measure_import(module)["loaded"]
+    if deferred:
+        print(f"\nwarning: imported at startup but meant to be deferred: {', '.join(deferred)}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Import-time breakdown of a module (default: app.ui).")
+    parser.add_argument("module", nargs="?", default="app.ui")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args(argv)
+    print_profile(args.module, args.top)
+
+
+if __name__ == "__main__":
+    main()
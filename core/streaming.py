@@ -0,0 +1,76 @@
+"""
+Incremental reports from a compiled grading workflow.
+
+`stream_reports` / `astream_reports` run a workflow with LangGraph's
+"updates" and "messages" stream modes and yield the rendered report every
+time it changes: once per finished node (so a criterion shows up as soon as
+its call returns) and once per token chunk of the LLM summary node. The last
+report yielded is the same one `invoke` + `render` would produce, and the
+finished state's bands are noted for core.results.
+"""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Callable, Iterator
+
+from core.results import grading_target, note_grading
+from core.scoring import with_llm_summary
+
+STREAM_MODES = ["updates", "messages"]
+# Graph node whose tokens are streamed as they arrive (see core/criteria.py).
+SUMMARY_NODE = "Summary"
+
+
+class _Report:
+    """Running view of the workflow state, built from streamed updates."""
+
+    def __init__(self, initial_state: dict, render: Callable[[dict], str]):
+        self.state = dict(initial_state)
+        self.render = render
+        self.summary_tokens: list[str] = []
+
+    def feed(self, mode: str, chunk) -> str | None:
+        """Applies one stream chunk; returns the new report, or None if nothing visible changed."""
+        if mode == "updates":
+            changed = False
+            for node, update in chunk.items():
+                if node.startswith("__") or not update:
+                    continue
+                for key, value in update.items():
+                    if key == "criteria":
+                        self.state["criteria"] = {**self.state.get("criteria", {}), **value}
+                    elif key == "degraded":  # appended to by every node that fell back
+                        self.state["degraded"] = [*self.state.get("degraded", ()), *value]
+                    else:
+                        self.state[key] = value
+                if node == SUMMARY_NODE:
+                    self.summary_tokens.clear()
+                changed = True
+            return self.render(self.state) if changed else None
+
+        message, metadata = chunk
+        text = message.content if isinstance(message.content, str) else ""
+        if metadata.get("langgraph_node") != SUMMARY_NODE or not text:
+            return None
+        self.summary_tokens.append(text)
+        partial = with_llm_summary(self.state.get("aggregated_result"), "".join(self.summary_tokens))
+        return self.render({**self.state, "aggregated_result": partial})
+
+
+def stream_reports(workflow, initial_state: dict, render: Callable[[dict], str]) -> Iterator[str]:
+    report = _Report(initial_state, render)
+    target = grading_target()
+    for mode, chunk in workflow.stream(initial_state, stream_mode=STREAM_MODES):
+        text = report.feed(mode, chunk)
+        if text is not None:
+            yield text
+    note_grading(report.state, target)
+
+
+async def astream_reports(workflow, initial_state: dict, render: Callable[[dict], str]) -> AsyncIterator[str]:
+    report = _Report(initial_state, render)
+    target = grading_target()
+    async for mode, chunk in workflow.astream(initial_state, stream_mode=STREAM_MODES):
+        text = report.feed(mode, chunk)
+        if text is not None:
+            yield text
+    note_grading(report.state, target)
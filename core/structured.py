@@ -0,0 +1,134 @@
+"""
+JSON node outputs: parsing, cheap local repair, and the fallback to Markdown.
+
+With STRUCTURED_OUTPUT=1 every criterion node asks the model (in its JSON
+mode) for one object matching core.schemas.CriterionReport. Models still
+return broken JSON now and then: wrapped in a ```json fence, with raw
+newlines inside strings, with a trailing comma, or cut off at the output
+token limit. parse_structured fixes those locally, which is much faster
+than asking again, and only gives up when the text is not JSON at all; the
+criterion node then scrapes the band and key points from the text as before.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from core.schemas import CriterionAssessment, CriterionReport
+from core.scoring import parse_criterion_report
+
+# What the nodes pass to the model call to get JSON back (Gemini's JSON mode).
+JSON_MODE = {"response_mime_type": "application/json"}
+
+CRITERION_OUTPUT = """
+=== OUTPUT FORMAT ===
+Return one JSON object and nothing else:
+{{
+  "report": "<the complete assessment, formatted as the brief above requires>",
+  "strengths": ["<up to 3 short points>"],
+  "weaknesses": ["<up to 3 short points>"],
+  "examples": [{{"original": "<a sentence quoted from the response>", "improved": "<a better version of it>"}}],
+  "band": <the final score the report ends with, a number 0-9>
+}}
+"report" is Markdown inside a JSON string (escape newlines and quotes).
+"""
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+class StructuredOutputError(ValueError):
+    """The text could not be repaired into the expected model."""
+
+
+def _close_truncated(text: str) -> str:
+    """Closes the string, arrays and objects left open when the output was cut off."""
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if not stack and not in_string:
+        return text
+    text = text + '"' if in_string else text
+    # A key without its value ("band": / , "exa) cannot be completed; drop it, and a dangling comma.
+    text = re.sub(r',?\s*"[^"]*"\s*:\s*$|,\s*$', "", text)
+    if stack and stack[-1] == "}":
+        text = re.sub(r'([,{])\s*"[^"]*"$', r"\1", text).rstrip(",")
+    return text + "".join(reversed(stack))
+
+
+def _candidates(text: str):
+    """The text as is, then progressively more aggressive repairs of it."""
+    yield text
+    text = _FENCE_RE.sub("", text).strip()
+    start = text.find("{")
+    if start < 0:
+        return
+    end = text.rfind("}")
+    body = text[start:end + 1] if end > start else text[start:]
+    yield body
+    yield _TRAILING_COMMA_RE.sub(r"\1", body)
+    yield _TRAILING_COMMA_RE.sub(r"\1", _close_truncated(text[start:]))
+
+
+def parse_json(text: str) -> tuple[dict, bool]:
+    """(object, whether it needed repair). Raw control characters inside strings are accepted."""
+    for i, candidate in enumerate(_candidates(text)):
+        try:
+            value = json.loads(candidate, strict=False)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value, i > 0
+    raise StructuredOutputError(f"not a JSON object: {text[:80]!r}")
+
+
+def parse_structured(text: str, schema: type[Model]) -> tuple[Model, bool]:
+    """`text` validated as `schema`, and whether the JSON needed repair."""
+    value, repaired = parse_json(text)
+    try:
+        return schema.model_validate(value), repaired
+    except ValidationError as e:
+        raise StructuredOutputError(str(e)) from e
+
+
+def to_assessment(result: CriterionReport) -> CriterionAssessment:
+    """The state entry for a criterion; points the model left out are taken from its report."""
+    scraped = parse_criterion_report(result.report, band=result.band)
+    return CriterionAssessment(
+        band=result.band,
+        strengths=result.strengths or scraped.strengths,
+        weaknesses=result.weaknesses or scraped.weaknesses,
+        examples=result.examples,
+        report=result.report,
+    )
+
+
+def parse_criterion_output(text: str) -> tuple[CriterionAssessment, str]:
+    """(assessment, how it parsed: "ok", "repaired" or "fallback") for one criterion node's answer."""
+    try:
+        value, repaired = parse_json(text)
+        return to_assessment(CriterionReport.model_validate(value)), "repaired" if repaired else "ok"
+    except StructuredOutputError:
+        # Not JSON after all: read it as the Markdown report the brief describes.
+        report = text
+    except ValidationError:
+        # JSON, but e.g. without a usable band: keep its report and scrape that.
+        report = value["report"] if isinstance(value.get("report"), str) else text
+    return parse_criterion_report(report), "fallback"
@@ -0,0 +1,506 @@
+"""
+Per-request tracing: where every second of a grading goes.
+
+One trace per grading, with nested spans:
+
+    ui.part2 → pipeline.part2 → runner.part2 → graph
+        → node.<name> per graph node → llm per LLM call (every retry and hedge)
+
+Spans record wall time plus what matters for that step: result-cache hits,
+image payload bytes, limiter queue wait, prompt/response token counts, and
+errors. UI, pipeline and runner spans come from the `traced` decorator; graph
+node and LLM spans come from a LangChain callback handler that is attached to
+every graph run started inside a span.
+
+Spans are recorded while a listener (core.metrics, core.results) or an
+exporter is installed; the app, worker and batch entry points install them
+from core.config through core.observability.init_observability():
+  * TRACE_JSONL_PATH: one JSON object per finished span;
+  * TRACE_OTLP_ENDPOINT: OTLP/HTTP JSON, e.g. http://localhost:4318/v1/traces
+    for a local OpenTelemetry collector or Jaeger.
+
+Recorded JSONL can be inspected or forwarded later:
+
+    python -m core.tracing show logs/traces.jsonl [--last 3]
+    python -m core.tracing to-otlp logs/traces.jsonl [-o traces.otlp.json | --endpoint URL]
+"""
+from __future__ import annotations
+
+import argparse
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("attributes", "end_ns", "name", "parent_id", "span_id", "start_ns", "status", "trace_id")
+
+    def __init__(self, name: str, parent: Span | None = None, **attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.status = "ok"
+        for listener in _listeners:
+            listener.span_started(self)
+
+    def set(self, **attributes) -> None:
+        self.attributes.update((k, v) for k, v in attributes.items() if v is not None)
+
+    def end(self, error: BaseException | None = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{type(error).__name__}: {error}"[:500]
+        _export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+# --- exporters ---
+
+class JsonlExporter:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: Iterable[dict], service_name: str = "ielts-assistant") -> dict:
+    """OTLP/HTTP JSON (ExportTraceServiceRequest) for span dicts as written to the JSONL file."""
+    otlp_spans = []
+    for span in spans:
+        otlp = {
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "name": span["name"],
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span["start_ns"]),
+            "endTimeUnixNano": str(span["end_ns"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span["attributes"].items()],
+            "status": {"code": 2, "message": span["attributes"].get("error", "")} if span["status"] == "error"
+            else {"code": 1},
+        }
+        if span["parent_id"]:
+            otlp["parentSpanId"] = span["parent_id"]
+        otlp_spans.append(otlp)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{"scope": {"name": "core.tracing"}, "spans": otlp_spans}],
+    }]}
+
+
+def post_otlp(endpoint: str, payload: dict, timeout: float = 5.0) -> None:
+    request = urllib.request.Request(
+        endpoint, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=timeout):
+        pass
+
+
+class OtlpExporter:
+    """Buffers finished spans and posts them to an OTLP/HTTP collector from a background thread."""
+
+    def __init__(self, endpoint: str, service_name: str, interval: float = 2.0, max_batch: int = 512):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.interval = interval
+        self.max_batch = max_batch
+        self._spans: list[dict] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        threading.Thread(target=self._run, name="otlp-export", daemon=True).start()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span.to_dict())
+            full = len(self._spans) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._spans = self._spans, []
+        if not spans:
+            return
+        try:
+            post_otlp(self.endpoint, to_otlp(spans, self.service_name))
+        except Exception as e:
+            logger.warning("Dropped %d spans: OTLP export to %s failed: %s", len(spans), self.endpoint, e)
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+_exporters: list = []
+
+
+def configure(jsonl_path: str | Path | None = None, otlp_endpoint: str | None = None,
+              service_name: str = "ielts-assistant") -> None:
+    """Replaces the span exporters (none: spans are only seen by in-process listeners)."""
+    for exporter in _exporters:
+        exporter.close()
+    exporters = []
+    if jsonl_path:
+        exporters.append(JsonlExporter(jsonl_path))
+    if otlp_endpoint:
+        exporters.append(OtlpExporter(otlp_endpoint, service_name))
+    _exporters[:] = exporters
+
+
+# In-process observers of every span (e.g. core.metrics): span_started(span) / span_ended(span).
+_listeners: list = []
+
+
+def add_listener(listener) -> None:
+    _listeners.append(listener)
+
+
+def remove_listener(listener) -> None:
+    _listeners.remove(listener)
+
+
+def enabled() -> bool:
+    return bool(_exporters or _listeners)
+
+
+def flush() -> None:
+    for exporter in _exporters:
+        exporter.flush()
+
+
+def _export(span: Span) -> None:
+    for listener in _listeners:
+        listener.span_ended(span)
+    for exporter in _exporters:
+        try:
+            exporter.export(span)
+        except Exception as e:
+            logger.warning("Span export failed: %s", e)
+
+
+# --- spans in application code ---
+
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+
+class span:
+    """
+    Context manager for a child of the current span (or a new trace). A no-op,
+    yielding None, while there is no exporter or listener.
+    """
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span: Span | None = None
+        self._callbacks_token: contextvars.Token | None = None
+
+    def __enter__(self) -> Span | None:
+        if not (_exporters or _listeners):
+            return None
+        if _span_callbacks.get() is None:
+            # The root span attaches the handler to the LangChain runs started inside it (only those).
+            self._callbacks_token = _span_callbacks.set(_callback_handler_instance())
+        self.span = Span(self.name, _current.get(), **self.attributes)
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.span is None:
+            return
+        try:
+            _current.reset(self._token)
+            if self._callbacks_token is not None:
+                _span_callbacks.reset(self._callbacks_token)
+        except ValueError:
+            # A generator resumed in another context (e.g. Gradio pulls each chunk
+            # from a new task); that context never saw this span.
+            pass
+        self.span.end(exc if exc_type is not None and not issubclass(exc_type, GeneratorExit) else None)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def annotate(**attributes) -> None:
+    """Adds attributes to the current span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def traced(name: str) -> Callable:
+    """Runs a function, coroutine, generator or async generator inside a span called `name`."""
+    def decorate(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def agen_wrapper(*args, **kwargs):
+                with span(name):
+                    async for item in fn(*args, **kwargs):
+                        yield item
+            return agen_wrapper
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                with span(name):
+                    yield from fn(*args, **kwargs)
+            return gen_wrapper
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Set by the rate limiter right before a call goes out; picked up by that call's LLM span.
+_queue_wait: contextvars.ContextVar[float | None] = contextvars.ContextVar("llm_queue_wait", default=None)
+
+
+def note_queue_wait(seconds: float) -> contextvars.Token:
+    return _queue_wait.set(seconds)
+
+
+def clear_queue_wait(token: contextvars.Token) -> None:
+    _queue_wait.reset(token)
+
+
+# --- graph nodes and LLM calls, via LangChain callbacks ---
+
+# LangChain adds the handler in this variable to every run configured while it is set.
+_span_callbacks: contextvars.ContextVar[Any] = contextvars.ContextVar("span_callbacks", default=None)
+_handler = None
+_handler_lock = threading.Lock()
+
+
+def _callback_handler_instance():
+    """The span handler, registered with LangChain the first time a span opens."""
+    global _handler
+    if _handler is None:
+        with _handler_lock:
+            if _handler is None:
+                from langchain_core.tracers.context import register_configure_hook
+
+                register_configure_hook(_span_callbacks, True)
+                _handler = _callback_handler()
+    return _handler
+
+
+def _usage(response) -> dict:
+    try:
+        usage = response.generations[0][0].message.usage_metadata or {}
+    except (AttributeError, IndexError):
+        usage = {}
+    if not usage:
+        usage = (response.llm_output or {}).get("usage_metadata") or {}
+    return {
+        "input_tokens": usage.get("input_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        # Part of input_tokens served from a provider context cache (core/context_cache.py).
+        "cached_tokens": (usage.get("input_token_details") or {}).get("cache_read") or None,
+    }
+
+
+def _callback_handler():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class SpanCallbackHandler(BaseCallbackHandler):
+        """Turns LangGraph runs into spans: the graph, each node, each chat model call."""
+
+        run_inline = True
+
+        def __init__(self):
+            self._spans: dict[Any, Span | None] = {}  # run id -> own span, or None for unrecorded runs
+            self._parents: dict[Any, Any] = {}
+            self._lock = threading.Lock()
+
+        def _parent(self, parent_run_id) -> Span | None:
+            while parent_run_id is not None:
+                recorded = self._spans.get(parent_run_id)
+                if recorded is not None:
+                    return recorded
+                parent_run_id = self._parents.get(parent_run_id)
+            return None
+
+        def _start(self, run_id, parent_run_id, name: str | None, **attributes) -> None:
+            with self._lock:
+                parent = self._parent(parent_run_id) if parent_run_id is not None else _current.get()
+                if parent is None:
+                    return
+                self._parents[run_id] = parent_run_id
+                self._spans[run_id] = Span(name, parent, **attributes) if name else None
+
+        def _end(self, run_id, error=None, **attributes) -> None:
+            with self._lock:
+                recorded = self._spans.pop(run_id, None)
+                self._parents.pop(run_id, None)
+            if recorded is not None:
+                recorded.set(**attributes)
+                recorded.end(error)
+
+        def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+            node = (metadata or {}).get("langgraph_node")
+            name = kwargs.get("name")
+            if parent_run_id is None:
+                self._start(run_id, None, "graph")
+            elif node is not None and name == node:
+                self._start(run_id, parent_run_id, f"node.{node}", node=node)
+            else:
+                self._start(run_id, parent_run_id, None)
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            self._end(run_id)
+
+        def on_chain_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, error)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None,
+                                **kwargs):
+            metadata = metadata or {}
+            wait = _queue_wait.get()
+            self._start(
+                run_id, parent_run_id, "llm",
+                node=metadata.get("langgraph_node"),
+                model=metadata.get("ls_model_name"),
+                queue_wait_ms=round(wait * 1000, 3) if wait is not None else None,
+            )
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            self._end(run_id, **_usage(response))
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, error)
+
+    return SpanCallbackHandler()
+
+
+# --- reading recorded traces ---
+
+def load_spans(path: str | Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _trace_tree(spans: list[dict]) -> list[str]:
+    children: dict[str | None, list[dict]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start_ns"]):
+        children.setdefault(s["parent_id"] if s["parent_id"] in ids else None, []).append(s)
+    start = min(s["start_ns"] for s in spans)
+    lines = []
+
+    def walk(parent_id, depth):
+        for s in children.get(parent_id, []):
+            offset = (s["start_ns"] - start) / 1e9
+            attrs = " ".join(f"{k}={v}" for k, v in s["attributes"].items() if k != "error")
+            flag = f"  !! {s['attributes'].get('error')}" if s["status"] == "error" else ""
+            lines.append(f"{'  ' * depth}{s['name']:<{28 - 2 * depth}} +{offset:6.2f} s {s['duration_ms'] / 1000:7.2f} s"
+                         f"  {attrs}{flag}")
+            walk(s["span_id"], depth + 1)
+    walk(None, 0)
+    return lines
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect or forward traces recorded to TRACE_JSONL_PATH.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="print the span tree of recorded traces")
+    show.add_argument("path")
+    show.add_argument("--last", type=int, default=1, help="how many of the most recent traces")
+    export = sub.add_parser("to-otlp", help="convert recorded spans to OTLP/HTTP JSON")
+    export.add_argument("path")
+    export.add_argument("-o", "--output", help="write the OTLP JSON here (default: stdout)")
+    export.add_argument("--endpoint", help="post to this OTLP/HTTP collector instead")
+    args = parser.parse_args(argv)
+
+    spans = load_spans(args.path)
+    if args.command == "show":
+        traces: dict[str, list[dict]] = {}
+        for s in spans:
+            traces.setdefault(s["trace_id"], []).append(s)
+        recent = sorted(traces.values(), key=lambda t: min(s["start_ns"] for s in t))[-args.last:]
+        for trace in recent:
+            print(f"trace {trace[0]['trace_id']}")
+            print("\n".join(_trace_tree(trace)), end="\n\n")
+        return
+
+    payload = to_otlp(spans, config.TRACE_SERVICE_NAME)
+    if args.endpoint:
+        post_otlp(args.endpoint, payload)
+        print(f"posted {len(spans)} spans to {args.endpoint}")
+    elif args.output:
+        Path(args.output).write_text(json.dumps(payload), encoding="utf-8")
+    else:
+        print(json.dumps(payload))
+
+
+if __name__ == "__main__":
+    main()
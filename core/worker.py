@@ -0,0 +1,169 @@
+"""
+Grading worker: takes jobs from the queue in core/jobs.py and runs them through core.pipeline.
+
+    python -m core.worker [--concurrency 4] [--poll 0.5]
+
+Run as many as the LLM quota allows, on any machine that can see
+JOB_QUEUE_PATH; each grades up to --concurrency jobs at a time. The quota in
+core.config (LLM_RPM, LLM_TPM, LLM_MAX_CONCURRENCY) is for all of them
+together: start N workers with `--share N` (or LLM_QUOTA_SHARES=N) so that
+each one's limiter takes 1/N of it. While a job
+runs, its worker writes the growing report back every JOB_PROGRESS_SECONDS,
+which also renews the job's lease and picks up cancellation.
+
+SIGTERM or Ctrl+C stops taking new jobs and lets the running ones finish; a
+second one hands them back to the queue for another worker to restart.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+from core.jobs import JobQueue, get_job_queue
+
+logger = logging.getLogger(__name__)
+
+
+async def grade_job(job: dict, folder: Path):
+    """Yields the growing Markdown report of one claimed job."""
+    from core.pipeline import stream_analyze_part1_async, stream_analyze_part2_async
+
+    if job["task"] == "part1":
+        image = folder / f"{job['id']}{Path(job['image_name'] or '').suffix}"
+        image.write_bytes(job["image"])
+        try:
+            async for markdown in stream_analyze_part1_async(image, job["essay"], job["mode"]):
+                yield markdown
+        finally:
+            image.unlink(missing_ok=True)
+    else:
+        async for markdown in stream_analyze_part2_async(job["question"], job["essay"], job["mode"]):
+            yield markdown
+
+
+class Worker:
+    def __init__(self, queue: JobQueue, *, concurrency: int = 4, poll: float = 0.5, progress: float = 1.0,
+                 name: str | None = None, grade=grade_job):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.poll = poll
+        self.progress = progress
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.grade = grade
+        self.stopping = asyncio.Event()
+        self.running: dict[str, asyncio.Task] = {}
+        self.counts = {"done": 0, "failed": 0, "cancelled": 0, "released": 0}
+
+    async def _consume(self, job: dict, folder: Path, latest: list) -> None:
+        async for markdown in self.grade(job, folder):
+            latest[0] = markdown
+
+    async def process(self, job: dict, folder: Path) -> None:
+        job_id = job["id"]
+        latest = [None]
+        grading = asyncio.create_task(self._consume(job, folder, latest))
+        written = None
+        started = time.perf_counter()
+        try:
+            while not grading.done():
+                await asyncio.wait({grading}, timeout=self.progress)
+                if grading.done():
+                    break
+                report = latest[0] if latest[0] != written else None
+                # Renews the lease even when nothing changed; False means cancelled (or lost to another worker).
+                if not await asyncio.to_thread(self.queue.progress, job_id, self.name, report):
+                    grading.cancel()
+                    await asyncio.gather(grading, return_exceptions=True)
+                    await asyncio.to_thread(self.queue.cancelled, job_id, self.name)
+                    self.counts["cancelled"] += 1
+                    logger.info("Worker: job %s cancelled", job_id)
+                    return
+                written = report or written
+            grading.result()
+        except asyncio.CancelledError:
+            grading.cancel()
+            await asyncio.gather(grading, return_exceptions=True)
+            await asyncio.to_thread(self.queue.release, job_id, self.name)
+            self.counts["released"] += 1
+            logger.info("Worker: job %s handed back to the queue", job_id)
+            raise
+        except Exception as e:
+            logger.exception("Worker: job %s failed", job_id)
+            await asyncio.to_thread(self.queue.fail, job_id, self.name, f"{type(e).__name__}: {e}")
+            self.counts["failed"] += 1
+            return
+        await asyncio.to_thread(self.queue.complete, job_id, self.name, latest[0] or "")
+        self.counts["done"] += 1
+        logger.info("Worker: job %s done in %.2f s", job_id, time.perf_counter() - started)
+
+    async def run(self, max_jobs: int | None = None) -> None:
+        """Claims and grades jobs until stop() (or `max_jobs` claims), then waits for the running ones."""
+        claimed = 0
+        logger.info("Worker %s: up to %d jobs at a time from %s", self.name, self.concurrency, self.queue.path)
+        with tempfile.TemporaryDirectory(prefix="ielts-worker-") as tmp:
+            while not self.stopping.is_set() and (max_jobs is None or claimed < max_jobs):
+                if len(self.running) >= self.concurrency:
+                    await asyncio.wait(set(self.running.values()), return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                job = await asyncio.to_thread(self.queue.claim, self.name)
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self.stopping.wait(), self.poll)
+                    except TimeoutError:
+                        pass
+                    continue
+                claimed += 1
+                logger.info("Worker: job %s (%s, priority %d, attempt %d)",
+                            job["id"], job["task"], job["priority"], job["attempts"])
+                task = asyncio.create_task(self.process(job, Path(tmp)))
+                self.running[job["id"]] = task
+                task.add_done_callback(lambda _, job_id=job["id"]: self.running.pop(job_id, None))
+            if self.running:
+                logger.info("Worker: finishing %d running jobs", len(self.running))
+                await asyncio.gather(*self.running.values(), return_exceptions=True)
+
+    def stop(self) -> None:
+        """First call: take no new jobs. Second call: also hand the running ones back to the queue."""
+        if self.stopping.is_set():
+            for task in list(self.running.values()):
+                task.cancel()
+        self.stopping.set()
+
+
+def main(argv: list[str] | None = None) -> None:
+    from core import config
+    from core.logging_config import configure_logging
+    from core.observability import init_observability
+
+    parser = argparse.ArgumentParser(prog="python -m core.worker", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-c", "--concurrency", type=int, default=config.JOB_WORKER_CONCURRENCY)
+    parser.add_argument("--poll", type=float, default=config.JOB_POLL_SECONDS, help="seconds between claims when idle")
+    parser.add_argument("--share", type=int, default=config.LLM_QUOTA_SHARES,
+                        help="workers sharing the LLM quota; this one takes 1/N of it (default: LLM_QUOTA_SHARES)")
+    args = parser.parse_args(argv)
+    config.LLM_QUOTA_SHARES = args.share  # read when the limiter is built, on the first LLM call
+
+    configure_logging()
+    init_observability()
+    worker = Worker(get_job_queue(), concurrency=args.concurrency, poll=args.poll,
+                    progress=config.JOB_PROGRESS_SECONDS)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+
+    asyncio.run(run())
+    logger.info("Worker %s stopped: %s", worker.name, worker.counts)
+
+
+if __name__ == "__main__":
+    main()
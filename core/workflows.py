@@ -0,0 +1,128 @@
+"""
+Process-wide registry of compiled grading workflows.
+
+Each LangGraph workflow is built and compiled once, the first time it is
+requested, and then shared by every request in the process. There is one
+task per rubric file (rubrics/<task>.toml, see core/criteria.py).
+
+Export the Mermaid diagrams explicitly with:
+
+    python -m core.workflows export-mermaid [part1|part2|part1_fused|...]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from core.criteria import MODES, rubric_names
+
+logger = logging.getLogger(__name__)
+
+
+def _build_args() -> dict:
+    from core import config
+    from core.cache import get_node_cache
+
+    return {
+        "llm_summary": config.LLM_SUMMARY,
+        "cache": get_node_cache(),
+        "cache_ttl": int(config.NODE_CACHE_TTL_SECONDS) or None,
+        "degrade": config.DEGRADE_ON_FAILURE,
+    }
+
+
+def _builder(task: str, mode: str, use_async: bool) -> Callable[[], Any]:
+    def build():
+        from core.criteria import get_rubric
+
+        return get_rubric(task).build(mode, use_async=use_async, **_build_args())
+    return build
+
+
+TASKS = rubric_names()
+
+
+def workflow_name(task: str, mode: str = "fanout", use_async: bool = False) -> str:
+    """Registry name for a task/mode pair, e.g. part1, part2_fused, part1_fused_async."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown grading mode: {mode!r} (expected one of {MODES})")
+    name = task if mode == "fanout" else f"{task}_{mode}"
+    return f"{name}_async" if use_async else name
+
+
+_BUILDERS: dict[str, Callable[[], Any]] = {
+    workflow_name(task, mode, use_async): _builder(task, mode, use_async)
+    for task in TASKS
+    for mode in MODES
+    for use_async in (False, True)
+}
+_COMPILED: dict[str, Any] = {}
+_LOCK = threading.Lock()
+
+
+def get_workflow(name: str):
+    """Returns the compiled workflow `name`, building it on first use."""
+    workflow = _COMPILED.get(name)
+    if workflow is not None:
+        return workflow
+    if name not in _BUILDERS:
+        raise KeyError(f"Unknown workflow: {name!r}")
+    with _LOCK:
+        workflow = _COMPILED.get(name)
+        if workflow is None:
+            logger.info("Compiling workflow %s", name)
+            workflow = _BUILDERS[name]()
+            _COMPILED[name] = workflow
+    return workflow
+
+
+def clear_workflows() -> None:
+    """Drops every compiled workflow so the next request rebuilds it."""
+    with _LOCK:
+        _COMPILED.clear()
+
+
+def write_mermaid(workflow, path: str | Path) -> None:
+    """Writes the Mermaid diagram of a compiled workflow to `path`."""
+    with open(path, "w") as f:
+        f.write(f"```mermaid\n{workflow.get_graph().draw_mermaid()}\n```")
+
+
+def export_mermaid(name: str, path: str | Path | None = None) -> Path:
+    """Writes the Mermaid diagram for workflow `name` and returns the file path."""
+    if not path:
+        task = name.removesuffix("_async")
+        variant = next((mode for mode in MODES if task.endswith(f"_{mode}")), None)
+        task = task.removesuffix(f"_{variant}")
+        path = Path("vendors") / task / (f"Workflow_{variant}.md" if variant else "Workflow.md")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_mermaid(get_workflow(name), path)
+    logger.info("Wrote %s", path)
+    return path
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m core.workflows")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export-mermaid", help="Write Workflow.md for one or all workflows")
+    export.add_argument("names", nargs="*", help="Workflows to export (default: every sync workflow)")
+    export.add_argument("--out", help="Output file (only with a single workflow name)")
+    args = parser.parse_args(argv)
+
+    names = args.names or [n for n in _BUILDERS if not n.endswith("_async")]
+    unknown = [n for n in names if n not in _BUILDERS]
+    if unknown:
+        parser.error(f"unknown workflow(s): {', '.join(unknown)}")
+    if args.out and len(names) != 1:
+        parser.error("--out needs exactly one workflow name")
+    for name in names:
+        print(export_mermaid(name, args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+
+import app.api
+import app.serve
+import core.criteria
+import core.idempotency
+import core.observability
+from benchmarks.fake_llm import FakeChatModel
+from core import config
+from core.idempotency import IdempotencyStore
+
+TASK2 = {"task": "part2", "question": "Some people think that ...", "essay": "I agree with this view. " * 10}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "RESULT_CACHE_ENABLED", False)
+    monkeypatch.setattr(core.idempotency, "_store", IdempotencyStore(tmp_path / "idempotency.sqlite3"))
+    monkeypatch.setattr(app.api, "_limit", app.api.ConcurrencyLimit(2, 0))
+    monkeypatch.setattr(config, "METRICS_ENABLED", False)
+    monkeypatch.setattr(core.observability, "_initialized", True)  # no listeners writing to cache/
+    fake = FakeChatModel()
+    monkeypatch.setattr(core.criteria, "model", fake)
+    with TestClient(app.api.create_api()) as client:
+        client.fake = fake
+        yield client
+
+
+def test_grade_returns_bands_and_replays_idempotent_retries(client):
+    first = client.post("/grade", json=TASK2, headers={"Idempotency-Key": "k1"})
+    assert first.status_code == 200
+    body = first.json()
+    assert body["overall_band"] == 6.0 and body["mode"] == config.GRADING_MODE
+    assert set(body["bands"]) == {"task_response", "coherence_and_cohesion", "lexical_resource",
+                                  "grammatical_range_and_accuracy"}
+    calls = client.fake.calls
+
+    retry = client.post("/grade", json=TASK2, headers={"Idempotency-Key": "k1"})
+    assert retry.json() == body and retry.headers["Idempotent-Replayed"] == "true"
+    assert client.fake.calls == calls
+    assert client.post("/grade", json={**TASK2, "essay": "Another essay. " * 10},
+                       headers={"Idempotency-Key": "k1"}).status_code == 422
+
+
+def test_stream_sends_reports_then_the_result(client):
+    with client.stream("POST", "/grade/stream", json=TASK2) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [block.split("\n", 1) for block in response.read().decode().strip().split("\n\n")]
+    names = [event.removeprefix("event: ") for event, _ in events]
+    assert names[-1] == "result" and set(names[:-1]) == {"report"} and len(names) > 2
+    result = json.loads(events[-1][1].removeprefix("data: "))
+    assert result["overall_band"] == 6.0 and "Final Score" in result["report"]
+
+
+def test_invalid_requests_and_overload_are_refused(client):
+    assert client.post("/grade", json={**TASK2, "question": None}).status_code == 422
+    assert client.post("/grade", json={**TASK2, "essay": "too short"}).status_code == 422
+    assert client.post("/grade", json={"task": "part1", "essay": TASK2["essay"]}).status_code == 422
+
+    app.api._limit.active = 2
+    response = client.post("/grade", json=TASK2)
+    assert response.status_code == 429 and response.headers["Retry-After"]
+
+
+def test_draining_fails_readiness_and_refuses_new_gradings(client, monkeypatch):
+    assert client.get("/readyz").status_code == 200
+    monkeypatch.setattr(app.serve, "_draining", threading.Event())
+    app.serve._draining.set()
+    assert client.get("/readyz").status_code == 503 and client.get("/healthz").status_code == 200
+    response = client.post("/grade", json=TASK2)
+    assert response.status_code == 503 and response.headers["Retry-After"]
+
+
+def test_a_burst_of_streams_cannot_get_past_the_limit(client, monkeypatch):
+    monkeypatch.setattr(app.api, "_limit", app.api.ConcurrencyLimit(2, 1))
+    client.fake.latency = 0.05
+
+    async def burst():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as http:
+            return await asyncio.gather(*(http.post("/grade/stream", json=TASK2) for _ in range(5)))
+
+    statuses = sorted(response.status_code for response in asyncio.run(burst()))
+    assert statuses == [200, 200, 200, 429, 429]
+    assert (app.api._limit.active, app.api._limit.waiting) == (0, 0)
+
+
+def test_a_stream_dropped_before_its_first_event_frees_its_key(client):
+    store = core.idempotency.get_idempotency_store()
+    request = app.api.Submission(**TASK2)
+    reservation = app.api.concurrency_limit().reserve()
+    assert asyncio.run(app.api._claim("k2", request, None)) is None
+    response = app.api._EventStream(app.api._job(request), None, "k2", None, reservation)
+
+    async def gone(message):
+        raise OSError("client went away")
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(response(scope, None, gone))
+    assert app.api._limit.waiting == 0
+    assert store.begin("k2", "other")[0] == core.idempotency.NEW
+
+
+def test_history_is_only_served_to_its_signed_in_user(tmp_path, monkeypatch):
+    import core.results
+    from core.results import ResultStore
+
+    store = ResultStore(tmp_path / "gradings.sqlite3")
+    store.record(task="part2", user="ana", overall_band=6.0, latency_ms=900)
+    monkeypatch.setattr(core.results, "_store", store)
+    monkeypatch.setattr(config, "RESULT_STORE_ENABLED", True)
+    monkeypatch.setattr(core.observability, "_initialized", True)
+
+    with TestClient(app.api.create_api()) as anonymous:
+        assert anonymous.get("/results/ana/history").status_code == 404  # not mounted without an auth proxy
+
+    monkeypatch.setattr(config, "API_USER_HEADER", "X-Forwarded-User")
+    with TestClient(app.api.create_api()) as client:
+        assert client.get("/results/ana/history").status_code == 401
+        assert client.get("/results/ana/history", headers={"X-Forwarded-User": "ben"}).status_code == 403
+        rows = client.get("/results/ana/history", headers={"X-Forwarded-User": "ana"}).json()
+        assert [row["overall_band"] for row in rows] == [6.0]
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+from core.batch import grade_batch, load_records
+from core.metrics import percentile
+from core.results import note_summary
+
+
+def test_load_records_infers_task_and_skips_invalid(tmp_path):
+    (tmp_path / "essays.csv").write_text(
+        "id,question,image,essay\n"
+        "a,Discuss X.,,My essay.\n"
+        "b,,chart.png,The chart shows.\n"
+        "c,,,No question.\n"
+    )
+    records = load_records(tmp_path / "essays.csv")
+    assert [(r["id"], r["task"]) for r in records] == [("a", "part2"), ("b", "part1")]
+    assert records[1]["image"] == str(tmp_path / "chart.png")
+
+
+def test_percentile():
+    assert percentile([3, 1, 2, 4], 50) == 2.5
+    assert percentile([1, 2, 3, 4, 5], 100) == 5
+
+
+def test_grade_batch_resumes_after_failures(tmp_path):
+    out = tmp_path / "results.jsonl"
+    records = [{"id": str(i), "task": "part2", "question": "Q", "essay": f"essay {i}"} for i in range(5)]
+    calls = []
+
+    async def flaky(record, mode):
+        calls.append(record["id"])
+        if record["id"] == "3" and calls.count("3") == 1:
+            raise RuntimeError("rate limited")
+        note_summary({"overall_band": 6.5, "bands": {"task_response": 6.5}})
+        return "report"
+
+    stats = asyncio.run(grade_batch(records, out, concurrency=2, grade=flaky))
+    assert (stats.ok, stats.failed) == (4, 1)
+    # Simulate a crash mid-write, then resume: only the failed essay is graded again.
+    with out.open("a") as f:
+        f.write('{"id": "torn')
+    stats = asyncio.run(grade_batch(records, out, concurrency=2, grade=flaky))
+    assert (stats.skipped, stats.ok) == (4, 1)
+
+    rows = [json.loads(line) for line in out.read_text().splitlines() if line.startswith('{"id": "') and line.endswith("}")]
+    assert {r["id"] for r in rows if r["status"] == "ok"} == {"0", "1", "2", "3", "4"}
+    assert all(r["band"] == 6.5 and r["bands"] == {"task_response": 6.5} for r in rows if r["status"] == "ok")
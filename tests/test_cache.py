@@ -0,0 +1,113 @@
+import json
+
+from core.cache import ResultCache, make_key
+
+
+def test_key_ignores_whitespace_but_not_content():
+    a = make_key("part2", "An  essay.\n", question="Q", model_name="m", temperature=0.1)
+    b = make_key("part2", " An essay. ", question="Q", model_name="m", temperature=0.1)
+    c = make_key("part2", "An essay.", question="Q", model_name="m", temperature=0.2)
+    assert a == b
+    assert a != c
+
+
+def test_disk_tier_survives_restart_and_counts(tmp_path):
+    path = tmp_path / "results.sqlite3"
+    cache = ResultCache(path)
+    assert cache.get("k") is None
+    cache.set("k", "report")
+    assert cache.get("k") == "report"
+
+    fresh = ResultCache(path)
+    assert fresh.get("k") == "report"
+    assert fresh.stats()["disk_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_and_size_eviction(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "r.sqlite3", ttl=10, memory_entries=2, max_entries=3)
+    clock = [1000.0]
+    monkeypatch.setattr("core.cache.time.time", lambda: clock[0])
+    for i in range(5):
+        clock[0] += 1
+        cache.set(f"k{i}", "x")
+    assert cache.get("k0") is None
+    assert cache.get("k4") == "x"
+
+    clock[0] += 60
+    assert cache.get("k4") is None
+
+
+def test_a_cached_report_comes_back_with_its_bands_from_one_entry(monkeypatch):
+    import core.cache
+    import core.criteria
+    from benchmarks.fake_llm import FakeChatModel
+    from core import config
+    from core.pipeline import analyze_part2
+    from core.results import capture_grading
+
+    cache = ResultCache()
+    monkeypatch.setattr(config, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(core.cache, "_cache", cache)
+    monkeypatch.setattr(core.criteria, "model", FakeChatModel())
+    essay = "I agree with this view. " * 10
+    with capture_grading() as first:
+        report = analyze_part2("Some people think ...", essay)
+    with capture_grading() as second:
+        assert analyze_part2("Some people think ...", essay) == report
+    assert first["degraded"] == [] and first["overall_band"] == 6.0
+    assert second == {"overall_band": 6.0, "bands": first["bands"]}
+    assert (cache.stats()["hits"], cache.stats()["misses"], cache.stats()["memory_entries"]) == (1, 1, 1)
+
+
+def test_size_limit_without_rescanning_on_every_set(tmp_path):
+    cache = ResultCache(tmp_path / "r.sqlite3", ttl=None, max_entries=100, max_bytes=10)
+    for i in range(6):
+        cache.set(f"k{i}", "abc")
+    cache.set("k5", "abcd")  # replacing a row moves the running size by the difference
+    assert cache._totals == cache._count() == [3, 10]
+    disk = ResultCache(tmp_path / "r.sqlite3", ttl=None)
+    assert disk.get("k2") is None and disk.get("k5") == "abcd"
+
+
+def test_only_reports_with_degraded_nodes_are_left_out_of_the_cache(monkeypatch):
+    import core.cache
+    import core.pipeline
+    from core import config
+    from core.results import note_grading
+
+    cache = ResultCache()
+    monkeypatch.setattr(config, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(core.cache, "_cache", cache)
+    monkeypatch.setattr(core.pipeline, "_part2_key", lambda question, essay, mode: essay)
+    degraded = []
+
+    def run(question, essay, mode):
+        note_grading({"estimated_band_score": 6.0, "degraded": list(degraded)})
+        return f"My essay says: the task could not be completed. {essay}"
+
+    monkeypatch.setattr(core.pipeline, "run_part2", run)
+    core.pipeline.analyze_part2("Q", "quoted")
+    assert json.loads(cache.get("quoted"))["grading"] == {"overall_band": 6.0, "bands": None}
+    degraded.append("task_response")
+    core.pipeline.analyze_part2("Q", "failed")
+    assert cache.get("failed") is None
+
+
+def test_node_cache_drops_the_oldest_rows_past_its_limit(tmp_path, monkeypatch):
+    from core.cache import SqliteNodeCache
+
+    cache = SqliteNodeCache(tmp_path / "n.sqlite3", max_entries=10)
+    clock = [1000.0]
+    monkeypatch.setattr("core.cache.time.time", lambda: clock[0])
+    for i in range(25):
+        cache.set({(("node",), f"k{i}"): ([("report", i)], None)})
+    cache.set({(("node",), "short"): ([("report", -1)], 5)})
+    assert cache._rows() <= 10 and cache.evictions >= 15
+    found = cache.get([(("node",), f"k{i}") for i in range(25)])
+    assert (("node",), "k24") in found and (("node",), "k0") not in found
+
+    clock[0] += 61  # the next sweep also purges expired rows
+    cache.set({(("node",), "k25"): ([("report", 25)], None)})
+    assert cache.get([(("node",), "short")]) == {}
+    assert cache._count == cache._rows()
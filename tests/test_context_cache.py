@@ -0,0 +1,79 @@
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from benchmarks.fake_llm import FakeCacheService, FakeChatModel
+from core.context_cache import ContextCache, ContextCachedModel
+
+BRIEF = "You are an IELTS examiner. " * 400  # ~2700 tokens, over the minimum
+SHORT = "Be brief."
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _setup(ttl=600, refresh=60):
+    clock = Clock()
+    service = FakeCacheService(clock)
+    cache = ContextCache(service, ttl=ttl, refresh=refresh, min_tokens=1024, retry=30, clock=clock)
+    fake = FakeChatModel(cache_service=service)
+    return clock, service, cache, fake, ContextCachedModel(fake, cache)
+
+
+def test_static_system_prompt_is_uploaded_once_and_sent_by_reference():
+    clock, service, cache, fake, model = _setup()
+    messages = [SystemMessage(BRIEF), HumanMessage("essay")]
+
+    inline = fake.invoke(messages)
+    first = model.invoke(messages)
+    second = model.invoke(messages)
+
+    assert service.counts["created"] == 1
+    assert not inline.usage_metadata.get("input_token_details")
+    assert first.usage_metadata["input_token_details"]["cache_read"] == len(BRIEF) // 4
+    assert second.usage_metadata == first.usage_metadata
+    assert first.usage_metadata["input_tokens"] == inline.usage_metadata["input_tokens"]
+
+    # Short system prompts are not worth a cache.
+    model.invoke([SystemMessage(SHORT), HumanMessage("essay")])
+    assert service.counts["created"] == 1
+
+    # Used close to expiry: the TTL is extended instead of letting it lapse.
+    clock.now += 570
+    model.invoke(messages)
+    assert service.counts["refreshed"] == 1
+    clock.now += 500
+    assert model.invoke(messages).usage_metadata["input_token_details"]["cache_read"]
+
+    cache.close()
+    assert service.caches == {}
+
+
+def test_expired_cache_falls_back_inline_and_is_recreated():
+    _clock, service, cache, _fake, model = _setup()
+    messages = [SystemMessage(BRIEF), HumanMessage("essay")]
+    model.invoke(messages)
+
+    service.expire_all()
+    answer = model.invoke(messages)
+    assert answer.content
+    assert cache.stats()["expired"] == 1
+
+    assert model.invoke(messages).content
+    assert service.counts["created"] == 2
+
+
+def test_failed_create_sends_inline_until_retry():
+    clock, service, cache, _fake, model = _setup()
+    service.create = lambda *args: (_ for _ in ()).throw(RuntimeError("quota"))
+    messages = [SystemMessage(BRIEF), HumanMessage("essay")]
+
+    assert model.invoke(messages).content
+    assert model.invoke(messages).content
+    assert cache.stats()["failed"] == 1
+    clock.now += 31
+    model.invoke(messages)
+    assert cache.stats()["failed"] == 2
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+import core.criteria
+from benchmarks.fake_llm import DEFAULT_RESPONSE, FakeChatModel
+from core import config
+from core.criteria import FUSED, SUMMARY, get_rubric, load_rubric
+
+LETTER = '''
+[task]
+title = "Writing Task 1 (General Training)"
+version = "1"
+
+[task.inputs]
+question = "original_question"
+student_response = "student_essay"
+
+[prompts]
+human = "Question: {question}\\n\\nLetter: {student_response}"
+fused = "You are two IELTS examiners."
+summary_system = "Summarise the two reports."
+summary_human = "{task_achievement_report}\\n\\n{lexical_resource_report}"
+
+[[criteria]]
+key = "task_achievement"
+title = "Task Achievement"
+node = "TA"
+compact_focus = "purpose and tone; every bullet point covered."
+compact_bands = "7 = all bullets covered, clear purpose; 5 = bullets missed."
+system = "Assess Task Achievement only. End with: Final Task Achievement Score: <band>"
+
+[[criteria]]
+key = "lexical_resource"
+title = "Lexical Resource"
+node = "Lexical"
+compact_focus = "range and register of vocabulary."
+compact_bands = "7 = flexible and precise; 5 = limited."
+system = "Assess Lexical Resource only. End with: Final Lexical Resource Score: <band>"
+'''
+
+
+def test_a_new_task_is_only_a_rubric_file(tmp_path, monkeypatch):
+    path = tmp_path / "gt1.toml"
+    path.write_text(LETTER)
+    rubric = load_rubric(path)
+    fused = "{" + ", ".join(f'"{key}": {json.dumps({"report": DEFAULT_RESPONSE, "band": 7})}'
+                            for key in rubric.criteria) + "}"
+    fake = FakeChatModel(rules=[("with exactly these keys", fused)])
+    monkeypatch.setattr(core.criteria, "model", fake)
+    state = {"original_question": "Write to your landlord about a broken heater.", "student_essay": "Dear Sir, ..."}
+
+    fanout = rubric.build(llm_summary=True).invoke(state)
+    assert fake.calls == 3
+    assert set(fanout["criteria"]) == {"task_achievement", "lexical_resource"}
+    assert fanout["estimated_band_score"] == 6.0
+    assert "**1. Task Achievement**" in fanout["aggregated_result"]
+    assert "**Examiner's Summary**" in fanout["aggregated_result"]
+
+    result = rubric.build("fused").invoke(state)
+    assert fake.calls == 4
+    assert result["estimated_band_score"] == 7.0
+    assert '"task_achievement": {{"report"' in rubric.prompts()[FUSED].messages[0].prompt.template
+
+
+def test_prompts_are_compiled_once_per_style(monkeypatch):
+    rubric = get_rubric("part1")
+    monkeypatch.setattr(config, "PROMPT_STYLE", "full")
+    full = rubric.prompts()
+    assert rubric.prompts() is full
+    assert set(full["task_response"].input_variables) == {"image_url", "student_response"}
+    assert set(full[SUMMARY].input_variables) == {f"{key}_report" for key in rubric.criteria}
+
+    monkeypatch.setattr(config, "PROMPT_STYLE", "compact")
+    assert rubric.prompts() is not full
+    monkeypatch.setattr(config, "PROMPT_STYLE", "full")
+    assert rubric.prompts() is full
+
+
+def test_rubric_with_unknown_template_variable_is_rejected(tmp_path):
+    path = tmp_path / "broken.toml"
+    path.write_text(LETTER.replace("Letter: {student_response}", "Letter: {essay}"))
+    with pytest.raises(ValueError, match="essay"):
+        load_rubric(path)
@@ -0,0 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from vendors.part2.display_report import render_report
+
+
+def test_render_report_is_plain_and_isolated(capsys):
+    states = [{"student_essay": f"essay {i}", "aggregated_result": f"**Overall** {i}"} for i in range(20)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        reports = list(pool.map(render_report, states))
+
+    for i, report in enumerate(reports):
+        assert f"essay {i}" in report
+        assert f"**Overall** {i}" in report
+        assert "\033[" not in report
+        assert sum(f"essay {j}\n" in report for j in range(20)) == 1
+    assert capsys.readouterr().out == ""
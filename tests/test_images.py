@@ -0,0 +1,93 @@
+import io
+import random
+
+import pytest
+from PIL import Image
+
+import utils.images
+from utils.images import prepare_image, preprocess_image
+from vendors.part1.main import image_mime_type
+
+
+def _encode(img: Image.Image, fmt: str, **params) -> bytes:
+    out = io.BytesIO()
+    img.save(out, format=fmt, **params)
+    return out.getvalue()
+
+
+def _noise(size: tuple[int, int], seed: int = 0) -> Image.Image:
+    rng = random.Random(seed)
+    return Image.frombytes("RGB", size, bytes(rng.randrange(256) for _ in range(size[0] * size[1] * 3)))
+
+
+def test_large_images_are_downscaled_and_reencoded():
+    raw = _encode(Image.new("RGB", (3000, 1000), (200, 30, 30)), "PNG")
+    prepared = preprocess_image(raw, max_side=1536)
+    assert prepared.size == (1536, 512)
+    assert (prepared.mime, prepared.source_format, prepared.source_bytes) == ("image/webp", "PNG", len(raw))
+    with Image.open(io.BytesIO(prepared.data)) as out:
+        assert (out.format, out.size) == ("WEBP", (1536, 512))
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "P"])
+def test_transparency_is_flattened_onto_white(mode):
+    img = Image.new("RGBA", (40, 40), (0, 0, 0, 0))
+    img.paste((0, 0, 255, 255), (0, 0, 20, 40))
+    if mode == "P":
+        img = img.convert("P")
+        img.info["transparency"] = img.getpixel((39, 39))
+    prepared = preprocess_image(_encode(img, "PNG"), fmt="PNG")
+    with Image.open(io.BytesIO(prepared.data)) as out:
+        assert out.mode == "RGB"
+        assert out.getpixel((39, 39)) == (255, 255, 255)
+        assert out.getpixel((0, 0)) == (0, 0, 255)
+
+
+def test_exif_orientation_is_applied_and_metadata_stripped():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90° clockwise to display
+    exif[0x010F] = "Phone maker"
+    raw = _encode(_noise((60, 30)), "JPEG", exif=exif.tobytes(), quality=95)
+    prepared = preprocess_image(raw, fmt="JPEG")
+    assert prepared.data != raw
+    assert prepared.size == (30, 60)
+    with Image.open(io.BytesIO(prepared.data)) as out:
+        assert out.size == (30, 60)
+        assert "exif" not in out.info and not out.getexif()
+
+
+@pytest.mark.parametrize("fmt, mime", [("PNG", "image/png"), ("JPEG", "image/jpeg")])
+def test_small_clean_uploads_are_kept_as_they_are(fmt, mime):
+    # A 1-bit PNG and a low-quality JPEG are already smaller than their WebP re-encodes.
+    img = _noise((64, 64)).convert("1") if fmt == "PNG" else _noise((64, 64))
+    raw = _encode(img, fmt, **({"quality": 20} if fmt == "JPEG" else {}))
+    prepared = preprocess_image(raw)
+    assert (prepared.data, prepared.mime, prepared.size) == (raw, mime, (64, 64))
+
+
+def test_prepare_image_memoizes_by_content_and_evicts(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.images, "_MEMO", type(utils.images._MEMO)())
+    monkeypatch.setattr(utils.images, "_MEMO_SIZE", 1)
+    first, second = tmp_path / "a.png", tmp_path / "b.png"
+    first.write_bytes(_encode(_noise((32, 32), seed=1), "PNG"))
+    second.write_bytes(_encode(_noise((32, 32), seed=2), "PNG"))
+
+    prepared = prepare_image(first)
+    assert prepare_image(first) is prepared
+    assert prepare_image(first, max_side=16) is not prepared  # settings are part of the key
+    prepare_image(second)
+    assert len(utils.images._MEMO) == 1
+    assert prepare_image(first) is not prepared
+
+
+@pytest.mark.parametrize("head, mime", [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff\xe0", "image/jpeg"),
+    (b"GIF89a", "image/gif"),
+    (b"RIFF\x10\x00\x00\x00WEBPVP8 ", "image/webp"),
+    (b"not an image", "image/jpeg"),
+])
+def test_image_mime_type_reads_the_file_header(tmp_path, head, mime):
+    path = tmp_path / "upload.bin"
+    path.write_bytes(head + b"\x00" * 16)
+    assert image_mime_type(str(path)) == mime
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from core.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobQueue
+from core.worker import Worker
+
+
+def test_claims_by_priority_then_age_and_cancels(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    batch = queue.submit("part2", "essay a", question="Q")
+    later = queue.submit("part2", "essay b", question="Q")
+    urgent = queue.submit("part1", "essay c", image=b"png", image_name="c.png", priority=10)
+    assert queue.get(later)["position"] == 2
+
+    first = queue.claim("w1")
+    assert first["id"] == urgent and first["image"] == b"png" and first["status"] == RUNNING
+    assert queue.claim("w1")["id"] == batch
+
+    assert queue.cancel(later) == CANCELLED
+    assert queue.claim("w1") is None
+    assert queue.cancel(urgent) == "cancelling"
+    assert queue.progress(urgent, "w1", "partial") is False
+    assert queue.progress(batch, "w1", "partial") is True
+    assert queue.progress(batch, "w2") is False  # not its job
+    assert queue.complete(batch, "w1", "report")
+    assert queue.get(batch)["report"] == "report"
+
+
+def test_expired_lease_is_requeued_then_failed(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3", lease=0.05, max_attempts=2)
+    job_id = queue.submit("part2", "essay", question="Q")
+    queue.claim("dead")
+    time.sleep(0.1)
+    job = queue.claim("alive")
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert queue.complete(job_id, "dead", "stale") is False
+
+    time.sleep(0.1)
+    assert queue.claim("third") is None
+    assert queue.get(job_id)["status"] == FAILED
+
+    other = queue.submit("part2", "essay", question="Q")
+    queue.claim("w")
+    assert queue.release(other, "w")
+    assert queue.get(other)["status"] == QUEUED and queue.get(other)["attempts"] == 0
+
+
+def test_worker_streams_progress_and_honours_cancel(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    quick = queue.submit("part2", "quick", question="Q", priority=1)
+    slow = queue.submit("part2", "slow", question="Q")
+    broken = queue.submit("part2", "broken", question="Q")
+
+    async def grade(job, folder):
+        if job["essay"] == "broken":
+            raise RuntimeError("model down")
+        for i in range(3 if job["essay"] == "quick" else 100):
+            yield f"criterion {i}"
+            await asyncio.sleep(0.02)
+
+    async def run():
+        worker = Worker(queue, concurrency=3, poll=0.01, progress=0.01, grade=grade)
+        runner = asyncio.create_task(worker.run(max_jobs=3))
+        while queue.get(slow)["report"] is None:
+            await asyncio.sleep(0.01)
+        queue.cancel(slow)
+        await runner
+        return worker.counts
+
+    counts = asyncio.run(run())
+    assert counts == {"done": 1, "failed": 1, "cancelled": 1, "released": 0}
+    assert queue.get(quick)["status"] == DONE and queue.get(quick)["report"] == "criterion 2"
+    assert queue.get(slow)["status"] == CANCELLED
+    assert "model down" in queue.get(broken)["error"]
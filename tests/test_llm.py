@@ -0,0 +1,52 @@
+from core import config
+from core.llm import _channel_factory, chat_model
+
+
+def test_shared_model_is_lazy():
+    # Reading the settings used in cache keys must not build the Gemini client.
+    assert chat_model.model == config.LLM_MODEL
+    assert chat_model.temperature == config.LLM_TEMPERATURE
+    import vendors.part1.model as part1
+    import vendors.part2.model as part2
+    assert part1.model is part2.model is chat_model
+
+
+def test_channel_factory_adds_keepalive_options():
+    seen = {}
+
+    def create_channel(host, **kwargs):
+        seen.update(kwargs, host=host)
+        return "channel"
+
+    assert _channel_factory(create_channel)("host:443", options=[("grpc.max_send_message_length", -1)]) == "channel"
+    options = dict(seen["options"])
+    assert options["grpc.max_send_message_length"] == -1
+    assert options["grpc.keepalive_time_ms"] == int(config.LLM_KEEPALIVE_SECONDS * 1000)
+
+
+def test_pooled_clients_replace_the_ones_langchain_builds(monkeypatch):
+    # core/llm.py swaps out ChatGoogleGenerativeAI's `client` and `async_client`.
+    # If a langchain-google-genai release renames them, fail here rather than
+    # silently falling back to clients without the keep-alive channels.
+    import asyncio
+
+    from google.ai.generativelanguage_v1beta import GenerativeServiceAsyncClient, GenerativeServiceClient
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    from core.llm import _build_client
+
+    assert "client" in ChatGoogleGenerativeAI.model_fields
+    assert isinstance(ChatGoogleGenerativeAI.__dict__.get("async_client"), property)
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    model = _build_client()
+    assert isinstance(model.client, GenerativeServiceClient)
+    assert type(model.client.transport).__name__ == "GenerativeServiceGrpcTransport"
+    assert model.async_client is None  # no running loop
+
+    async def clients():
+        return model.async_client, model.async_client
+
+    first, again = asyncio.run(clients())
+    assert isinstance(first, GenerativeServiceAsyncClient) and first is again
+    assert asyncio.run(clients())[0] is not first  # one per event loop
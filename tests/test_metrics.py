@@ -0,0 +1,106 @@
+from core import metrics, tracing
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+
+
+def test_text_format_for_counters_gauges_and_histograms():
+    counter = metrics.Counter("t_requests_total", "Requests.", ("task",))
+    gauge = metrics.Gauge("t_depth", "Depth.", callback=lambda: 3)
+    histogram = metrics.Histogram("t_seconds", "Seconds.", ("node",), buckets=(1, 5))
+    try:
+        counter.inc(task='pa"rt1')
+        counter.inc(2, task='pa"rt1')
+        histogram.observe(0.5, node="CC")
+        histogram.observe(3, node="CC")
+        histogram.observe(9, node="CC")
+        text = metrics.render()
+    finally:
+        for metric in (counter, gauge, histogram):
+            metrics.REGISTRY.remove(metric)
+
+    assert "# TYPE t_requests_total counter" in text and "# TYPE t_seconds histogram" in text
+    samples = _samples(text)
+    assert samples['t_requests_total{task="pa\\"rt1"}'] == "3"
+    assert samples["t_depth"] == "3"
+    assert samples['t_seconds_bucket{node="CC",le="1"}'] == "1"
+    assert samples['t_seconds_bucket{node="CC",le="5"}'] == "2"
+    assert samples['t_seconds_bucket{node="CC",le="+Inf"}'] == "3"
+    assert samples['t_seconds_sum{node="CC"}'] == "12.5"
+    assert samples['t_seconds_count{node="CC"}'] == "3"
+
+
+def test_spans_feed_grading_node_and_token_metrics(monkeypatch):
+    monkeypatch.setattr(tracing, "_listeners", [metrics])
+    before = metrics.GRADINGS.value(task="part9", status="error")
+    tokens = metrics.LLM_TOKENS.value(node="CC", model="m", direction="output")
+    try:
+        with tracing.span("pipeline.part9"):
+            assert metrics.GRADINGS_IN_FLIGHT.value(task="part9") == 1
+            llm = tracing.Span("llm", node="CC", model="m")
+            llm.set(input_tokens=100, output_tokens=20)
+            llm.end()
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert metrics.GRADINGS_IN_FLIGHT.value(task="part9") == 0
+    assert metrics.GRADINGS.value(task="part9", status="error") == before + 1
+    assert metrics.LLM_TOKENS.value(node="CC", model="m", direction="output") == tokens + 20
+    assert metrics.LLM_CALLS.value(node="CC", status="ok") >= 1
+
+
+def test_each_metric_is_rendered_once_however_often_the_app_is_built(monkeypatch):
+    import core.observability
+    from app.api import create_api
+
+    monkeypatch.setattr(core.observability, "_initialized", True)
+
+    create_api()
+    create_api()
+    types = [line for line in metrics.render().splitlines() if line.startswith("# TYPE ")]
+    assert len(types) == len(set(types))
+    assert "# TYPE ielts_api_gradings_active gauge" in types
+
+
+_WORKER = """
+import sys
+from core import metrics
+
+metrics.share_across_processes(sys.argv[1], interval=60)
+metrics.GRADINGS.inc(int(sys.argv[2]), task="mp", status="ok")
+metrics.GRADING_SECONDS.observe(float(sys.argv[2]), task="mp")
+metrics.GRADINGS_IN_FLIGHT.inc(task="mp")
+metrics.write_snapshot()
+print("ready", flush=True)
+sys.stdin.read()  # stay alive until the test closes stdin
+"""
+
+
+def test_metrics_are_summed_over_the_workers(tmp_path, monkeypatch):
+    import subprocess
+    import sys
+
+    def worker(n):
+        proc = subprocess.Popen([sys.executable, "-c", _WORKER, str(tmp_path), str(n)],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        assert proc.stdout.readline().strip() == "ready"
+        return proc
+
+    running, exited = worker(2), worker(3)
+    exited.stdin.close()
+    exited.wait(timeout=30)
+    try:
+        monkeypatch.setattr(metrics, "_shared_dir", tmp_path)  # this process takes the scrape
+        metrics.GRADINGS.inc(task="mp", status="ok")
+        samples = _samples(metrics.render())
+    finally:
+        running.stdin.close()
+        running.wait(timeout=30)
+        metrics.GRADINGS._values.pop(("mp", "ok"), None)
+
+    assert samples['ielts_gradings_total{task="mp",status="ok"}'] == "6"
+    assert samples['ielts_grading_duration_seconds_count{task="mp"}'] == "2"
+    assert samples['ielts_grading_duration_seconds_sum{task="mp"}'] == "5"
+    assert samples['ielts_gradings_in_flight{task="mp"}'] == "1"  # the exited worker's gauge is gone
@@ -0,0 +1,43 @@
+from core import config
+from core.criteria import FUSED, get_rubric
+from core.prompts import brief_report, node_prompt_tokens
+from core.scoring import parse_criterion_report
+
+
+def test_compact_prompts_are_smaller_and_keep_the_inputs(monkeypatch):
+    rubric = get_rubric("part2")
+    monkeypatch.setattr(config, "PROMPT_STYLE", "full")
+    full = node_prompt_tokens("part2")
+    full_hash = rubric.prompt_hash("task_response")
+    monkeypatch.setattr(config, "PROMPT_STYLE", "compact")
+    compact = node_prompt_tokens("part2")
+
+    assert all(compact[node] < full[node] for node in full)
+    assert rubric.prompt_hash("task_response") != full_hash
+    assert set(rubric.prompts()["task_response"].input_variables) == {"question", "student_response"}
+    assert "Final Task Response Score:" in rubric.prompts()[FUSED].messages[0].prompt.template
+
+
+def test_compact_report_format_parses(monkeypatch):
+    report = """**1. What You Did Well:**
+* Clear position throughout.
+
+**2. What You Could Have Done Better:**
+* Examples are generic.
+
+**3. Recommendations for Improvement:**
+* Support each idea with a specific example.
+
+**4. Final Task Response Score:**
+Final Task Response Score: 6.5
+"""
+    criterion = parse_criterion_report(report).model_dump()
+    assert criterion["band"] == 6.5
+    assert criterion["strengths"] == ["Clear position throughout."]
+
+    monkeypatch.setattr(config, "PROMPT_STYLE", "compact")
+    assert brief_report(criterion, report) == (
+        "Band: 6.5\nStrengths: Clear position throughout.\nWeaknesses: Examples are generic."
+    )
+    monkeypatch.setattr(config, "PROMPT_STYLE", "full")
+    assert brief_report(criterion, report) == report
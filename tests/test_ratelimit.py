@@ -0,0 +1,87 @@
+import asyncio
+import os
+
+import pytest
+
+from benchmarks.fake_llm import FakeChatModel, FakeRateLimitError
+from core.ratelimit import (
+    AdaptiveLimiter,
+    RateLimitedModel,
+    TokenBucket,
+    is_rate_limit_error,
+)
+from core.resilience import ResilientModel
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_waits_for_refill():
+    clock = _Clock()
+    bucket = TokenBucket(60, clock)  # one per second
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now = 0.5
+    assert bucket.wait_time(1) == pytest.approx(0.5)
+    clock.now = 2.0
+    assert bucket.wait_time(1) == 0
+
+
+def test_aimd_halves_on_429_and_grows_back():
+    limiter = AdaptiveLimiter(max_concurrency=8)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.stats()["concurrency_limit"] == 4
+    for _ in range(40):  # +1/limit per success, capped at max_concurrency
+        limiter.acquire()
+        limiter.release()
+    assert limiter.stats()["concurrency_limit"] == 8
+
+
+def test_429s_back_off_and_are_retried_through_the_limiter():
+    fake = FakeChatModel(response="ok", error_rate=0.5, seed=1)
+    limiter = AdaptiveLimiter(max_concurrency=4)
+    model = ResilientModel(RateLimitedModel(fake, limiter), retries=50, backoff_base=0.001, backoff_cap=0.01)
+
+    async def burst():
+        return await asyncio.gather(*(model.ainvoke("hi") for _ in range(20)))
+
+    assert all(r.content == "ok" for r in asyncio.run(burst()))
+    stats = limiter.stats()
+    assert stats["throttled"] == fake.errors > 0
+    assert stats["throttled"] == model.counts["retries"]
+    assert stats["in_flight"] == stats["queue_depth"] == 0
+
+
+def test_the_limiter_reports_429s_without_retrying_them():
+    assert is_rate_limit_error(FakeRateLimitError("quota"))
+    assert not is_rate_limit_error(ValueError("bad input"))
+    limiter = AdaptiveLimiter()
+    model = RateLimitedModel(FakeChatModel(response="ok", error_rate=1.0), limiter)
+    with pytest.raises(FakeRateLimitError):
+        model.invoke("hi")
+    assert limiter.stats()["throttled"] == 1
+
+
+
+def test_each_process_takes_its_share_of_the_quota(monkeypatch):
+    import core.ratelimit
+    from app.serve import split_quota
+    from core import config
+
+    monkeypatch.setattr(config, "LLM_RPM", 150)
+    monkeypatch.setattr(config, "LLM_TPM", 900_000)
+    monkeypatch.setattr(config, "LLM_MAX_CONCURRENCY", 16)
+    monkeypatch.setattr(config, "LLM_QUOTA_SHARES", 3)  # e.g. `python -m core.worker --share 3`
+    monkeypatch.setattr(core.ratelimit, "_limiter", None)
+    limiter = core.ratelimit.get_limiter()
+    assert (limiter.requests.per_minute, limiter.tokens.per_minute, limiter.max_concurrency) == (50, 300_000, 5)
+
+    monkeypatch.setenv("LLM_QUOTA_SHARES", "3")  # restored after the test
+    split_quota(2)  # app.serve with 2 workers: each gets a sixth
+    assert os.environ["LLM_QUOTA_SHARES"] == "6"
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+
+from core.cache import MemoryNodeCache
+from core.resilience import DEGRADED_NOTE, ResilientModel, graceful_criterion
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class _Stub:
+    """Answers after the next delay in `delays`; raises instead where `errors` says so."""
+
+    def __init__(self, delays, errors=()):
+        self.delays = list(delays)
+        self.errors = list(errors)
+        self.calls = 0
+
+    def _next(self):
+        i = self.calls
+        self.calls += 1
+        return self.delays[min(i, len(self.delays) - 1)], i < len(self.errors) and self.errors[i]
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        delay, error = self._next()
+        await asyncio.sleep(delay)
+        if error:
+            raise ServiceUnavailable("503")
+        return f"answer {self.calls}"
+
+    def invoke(self, input, config=None, **kwargs):
+        delay, error = self._next()
+        time.sleep(delay)
+        if error:
+            raise ServiceUnavailable("503")
+        return f"answer {self.calls}"
+
+
+def test_transient_errors_are_retried():
+    model = ResilientModel(_Stub([0], errors=[True, True]), retries=2, backoff_base=0.01)
+    assert asyncio.run(model.ainvoke("hi")) == "answer 3"
+    assert model.counts["retries"] == 2
+
+
+def test_attempt_timeout_then_retry_sync():
+    model = ResilientModel(_Stub([1.0, 0]), timeout=0.1, retries=1, backoff_base=0.01)
+    assert model.invoke("hi") == "answer 2"
+    assert model.counts["timeouts"] == 1
+
+
+def test_sync_calls_cancel_timed_out_attempts_and_keep_the_context():
+    import contextvars
+
+    request = contextvars.ContextVar("request", default=None)
+    seen, cancelled = [], []
+
+    class Slow:
+        async def ainvoke(self, input, config=None, **kwargs):
+            seen.append(request.get())
+            try:
+                await asyncio.sleep(1.0 if len(seen) == 1 else 0)
+            except asyncio.CancelledError:
+                cancelled.append(len(seen))
+                raise
+            return "done"
+
+    request.set("r1")
+    model = ResilientModel(Slow(), timeout=0.1, retries=1, backoff_base=0.01)
+    assert model.invoke("hi") == "done"
+    assert cancelled == [1] and seen == ["r1", "r1"]
+
+
+def test_node_deadline_bounds_all_attempts():
+    config = {"metadata": {"langgraph_node": "CC"}}
+    model = ResilientModel(_Stub([1.0]), timeout=10, deadlines={"CC": 0.2}, retries=5, backoff_base=0.01)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        asyncio.run(model.ainvoke("hi", config))
+    assert time.monotonic() - start < 0.5
+
+
+def test_hedge_wins_over_slow_primary():
+    config = {"metadata": {"langgraph_node": "CC"}}
+    model = ResilientModel(_Stub([1.0, 0.01]), hedge=True, hedge_min_seconds=0.05, hedge_min_samples=3)
+    for _ in range(3):
+        model.latencies["CC"].add(0.01)
+    start = time.monotonic()
+    assert asyncio.run(model.ainvoke("hi", config)) == "answer 2"
+    assert time.monotonic() - start < 0.5
+    assert model.counts["hedges"] == model.counts["hedge_wins"] == 1
+
+
+def test_failed_criterion_degrades_and_is_not_cached():
+    async def node(state):
+        raise TimeoutError
+
+    update = asyncio.run(graceful_criterion(node, "lexical_resource")({}))
+    assert DEGRADED_NOTE in update["lexical_resource"]
+    assert update["criteria"]["lexical_resource"]["band"] is None
+
+    cache = MemoryNodeCache()
+    cache.set({(("ns",), "bad"): (list(update.items()), None), (("ns",), "good"): ([("lexical_resource", "ok")], None)})
+    assert set(cache.get([(("ns",), "bad"), (("ns",), "good")])) == {(("ns",), "good")}
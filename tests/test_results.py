@@ -0,0 +1,51 @@
+import core.criteria
+import core.results
+from benchmarks.fake_llm import FakeChatModel
+from core import tracing
+from core.results import DAY, ResultStore
+from vendors.part2.main import run_ielts_part2_agent
+
+MONDAY = 19_723 * DAY  # 2024-01-01
+
+
+def test_rollups_answer_progress_and_usage(tmp_path):
+    store = ResultStore(tmp_path / "gradings.sqlite3")
+    store.record(task="part2", user="ana", inputs_hash="a", overall_band=6.0, latency_ms=900, input_tokens=1000,
+                 bands={"task_response": 6.0, "lexical_resource": 5.0}, created=MONDAY + 10)
+    store.record(task="part2", user="ana", inputs_hash="b", overall_band=7.0, latency_ms=1100,
+                 bands={"task_response": 7.0, "lexical_resource": 6.0}, created=MONDAY + 2 * DAY)
+    store.record(task="part2", user="ana", status="error", latency_ms=50, created=MONDAY + 3 * DAY)
+    store.record(task="part2", user="ben", inputs_hash="b", cache_hit=True, latency_ms=2, created=MONDAY + 8 * DAY)
+
+    weeks = store.progress("ana", "part2", bucket="week")
+    assert {(row["period"], row["criterion"]): row["band"] for row in weeks} == {
+        ("2024-01-01", "lexical_resource"): 5.5, ("2024-01-01", "overall"): 6.5,
+        ("2024-01-01", "task_response"): 6.5,
+    }
+    # The cache hit gets the bands of the grading that filled the cache.
+    assert store.history("ben")[0]["bands"] == {"task_response": 7.0, "lexical_resource": 6.0}
+    assert [row["overall_band"] for row in store.history("ana", limit=2)] == [None, 7.0]
+
+    usage = store.usage("part2", bucket="month")
+    assert usage == [{"period": "2024-01-01", "task": "part2", "gradings": 4, "cache_hits": 1, "errors": 1,
+                      "mean_latency_ms": 513.0, "llm_calls": 0, "input_tokens": 1000, "output_tokens": 0,
+                      "cached_tokens": 0}]
+    assert store.progress("ana", since=MONDAY + 7 * DAY) == []
+
+
+def test_finished_trace_becomes_a_row(tmp_path, monkeypatch):
+    store = ResultStore(tmp_path / "gradings.sqlite3")
+    monkeypatch.setattr(core.results, "_store", store)
+    monkeypatch.setattr(core.criteria, "model", FakeChatModel())
+    monkeypatch.setattr(tracing, "_listeners", [core.results])
+
+    with tracing.span("ui.part2", user="ana"):
+        with tracing.span("pipeline.part2", mode="fanout", inputs_hash="k1"):
+            with tracing.span("runner.part2"):
+                run_ielts_part2_agent("Some people think...", "I agree. " * 20)
+    core.results.flush()
+
+    [row] = store.history("ana")
+    assert row["task"] == "part2" and row["mode"] == "fanout" and row["status"] == "ok"
+    assert row["overall_band"] == 6.0 and row["bands"]["grammatical_range_and_accuracy"] == 6
+    assert store.usage()[0]["llm_calls"] == 4
@@ -0,0 +1,45 @@
+import pytest
+
+from core.criteria import get_rubric
+from core.scoring import overall_band, parse_criterion_report, round_band, summarize
+
+
+@pytest.mark.parametrize("average, expected", [
+    (6.0, 6.0), (6.125, 6.0), (6.25, 6.5), (6.5, 6.5), (6.75, 7.0), (6.875, 7.0),
+])
+def test_round_band_follows_official_rule(average, expected):
+    assert round_band(average) == expected
+
+
+def test_overall_band():
+    assert overall_band([6, 6, 7, 6]) == 6.5
+    assert overall_band([7, 7, 7, 6]) == 7.0
+    with pytest.raises(ValueError):
+        overall_band([])
+
+
+def test_parse_criterion_report():
+    report = """**1. What You Did Well:**
+* Clear overview of the main trends.
+* Accurate figures.
+
+**2. What You Could Have Done Better:**
+* The conclusion adds an opinion.
+
+**6. Final Task Response Score:**
+"Final Task Response Score: 6"
+"""
+    result = parse_criterion_report(report)
+    assert result.band == 6
+    assert result.strengths == ["Clear overview of the main trends.", "Accurate figures."]
+    assert result.weaknesses == ["The conclusion adds an opinion."]
+
+
+def test_summarize_skips_missing_bands():
+    overall, text = summarize("Writing Task 2", {
+        "task_response": {"band": 6, "strengths": ["Clear"], "weaknesses": []},
+        "lexical_resource": {"band": 7},
+    }, get_rubric("part2").titles)
+    assert overall == 6.5
+    assert "Overall Band Score:** 6.5" in text
+    assert "computed without: Coherence and Cohesion, Grammatical Range and Accuracy" in text
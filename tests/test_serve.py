@@ -0,0 +1,24 @@
+import signal
+import sys
+import time
+
+from app.serve import GradingWorkers
+
+# Stands in for core.worker: exits on its first SIGTERM.
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+
+def test_grading_workers_are_restarted_and_stopped():
+    workers = GradingWorkers(2, command=SLEEPER, check_every=0.05)
+    workers.start()
+    try:
+        first = workers.procs[0]
+        first.send_signal(signal.SIGKILL)
+        first.wait(timeout=10)
+        deadline = time.monotonic() + 10
+        while workers.procs[0] is first and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert workers.procs[0] is not first and workers.procs[0].poll() is None
+    finally:
+        workers.stop(grace=10)
+    assert all(proc.poll() is not None for proc in workers.procs)
@@ -0,0 +1,20 @@
+import pytest
+
+from core import config
+from core.startup import measure_import
+
+
+@pytest.fixture(scope="module")
+def cold_start():
+    return measure_import("app.ui")
+
+
+def test_ui_import_defers_grading_stack(cold_start):
+    assert cold_start["loaded"] == []
+
+
+def test_ui_cold_start_within_budget(cold_start):
+    assert cold_start["seconds"] <= config.STARTUP_BUDGET_SECONDS, (
+        f"import app.ui took {cold_start['seconds']:.2f} s "
+        f"(budget {config.STARTUP_BUDGET_SECONDS} s); see python -m app.ui --profile-startup"
+    )
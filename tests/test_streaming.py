@@ -0,0 +1,45 @@
+from typing import TypedDict
+
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, StateGraph
+
+from core.streaming import stream_reports
+
+
+class _State(TypedDict, total=False):
+    task_response: str
+    aggregated_result: str
+
+
+def _render(state):
+    return f"{state.get('task_response', '')}|{state.get('aggregated_result', '')}"
+
+
+def test_stream_reports_yields_nodes_and_summary_tokens():
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="Good overall essay")]))
+
+    graph = StateGraph(_State)
+    graph.add_node("Task Response", lambda state: {"task_response": "TR"})
+    graph.add_node("Aggregator", lambda state: {"aggregated_result": "local"})
+    graph.add_node("Summary", lambda state: {"aggregated_result": model.invoke("hi").content})
+    graph.add_edge(START, "Task Response")
+    graph.add_edge("Task Response", "Aggregator")
+    graph.add_edge("Aggregator", "Summary")
+    graph.add_edge("Summary", END)
+
+    reports = list(stream_reports(graph.compile(), {}, _render))
+    assert reports[0] == "TR|"
+    assert reports[1] == "TR|local"
+    # Partial summaries are appended under the local one while tokens arrive.
+    assert any("**Examiner's Summary**\n\nGood" in r and "essay" not in r for r in reports)
+    assert reports[-1] == "TR|Good overall essay"
+
+
+def test_an_empty_stream_is_an_error_not_a_report(monkeypatch):
+    from core import config, pipeline
+
+    monkeypatch.setattr(config, "RESULT_CACHE_ENABLED", False)
+    with pytest.raises(RuntimeError, match="without producing a report"):
+        list(pipeline._stream("T", "key", lambda: iter(())))
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import core.criteria
+from benchmarks.fake_llm import CRITERION_JSON_RESPONSE, DEFAULT_RESPONSE, FakeChatModel
+from core.criteria import get_rubric
+from core.schemas import CriterionReport
+from core.structured import (
+    StructuredOutputError,
+    parse_criterion_output,
+    parse_structured,
+)
+
+GOOD = json.loads(CRITERION_JSON_RESPONSE)
+
+
+@pytest.mark.parametrize("text", [
+    "```json\n" + CRITERION_JSON_RESPONSE + "\n```",
+    "Here is the assessment:\n" + CRITERION_JSON_RESPONSE + "\nHope this helps.",
+    CRITERION_JSON_RESPONSE[:-1] + ",}",
+    CRITERION_JSON_RESPONSE[:-1],  # cut off before the closing brace
+])
+def test_broken_json_is_repaired_locally(text):
+    result, repaired = parse_structured(text, CriterionReport)
+    assert repaired
+    assert result.band == 6
+    assert result.examples[0].improved == "Many people think so."
+    # Raw newlines inside strings are accepted as they are.
+    assert parse_structured(CRITERION_JSON_RESPONSE.replace("\\n", "\n"), CriterionReport)[1] is False
+
+
+def test_truncated_json_keeps_what_arrived():
+    truncated = CRITERION_JSON_RESPONSE.split('"band"')[0] + '"ba'
+    assessment, parsed = parse_criterion_output(truncated)
+    assert parsed == "fallback"  # the band was cut off, so it is scraped from the report
+    assert assessment.band == 6 and assessment.report == DEFAULT_RESPONSE
+    assert assessment.examples == []
+    with pytest.raises(StructuredOutputError):
+        parse_structured("Band 6, well done.", CriterionReport)
+
+
+def test_markdown_answer_falls_back(monkeypatch):
+    assessment, parsed = parse_criterion_output(DEFAULT_RESPONSE)
+    assert parsed == "fallback" and assessment.band == 6
+    assert assessment.strengths == ["Clear position and relevant ideas."]
+
+    fake = FakeChatModel()
+    monkeypatch.setattr(core.criteria, "model", fake)
+    state = {"original_question": "Some people think...", "student_essay": "I agree. " * 20}
+    result = get_rubric("part2").build().invoke(state)
+    assert result["estimated_band_score"] == 6.0
+    assert result["criteria"]["lexical_resource"]["examples"] == GOOD["examples"]
+    assert result["lexical_resource"] == DEFAULT_RESPONSE
@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import json
+from typing import TypedDict
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, StateGraph
+
+from core import config, tracing
+
+
+class _State(TypedDict, total=False):
+    task_response: str
+
+
+def _graph():
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="Band 7")]))
+
+    async def task_response(state):
+        return {"task_response": (await model.ainvoke("grade this")).content}
+
+    graph = StateGraph(_State)
+    graph.add_node("Task Response", task_response)
+    graph.add_edge(START, "Task Response")
+    graph.add_edge("Task Response", END)
+    return graph.compile()
+
+
+def test_spans_nest_from_handler_to_llm_call(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(jsonl_path=path)
+    graph = _graph()
+
+    @tracing.traced("pipeline.part2")
+    async def pipeline():
+        tracing.annotate(cache_hit=False)
+        async for _ in graph.astream({}):
+            yield
+
+    @tracing.traced("ui.part2")
+    async def handler():
+        async for _ in pipeline():
+            pass
+
+    try:
+        asyncio.run(handler())
+    finally:
+        tracing.configure()
+
+    spans = {s["name"]: s for s in map(json.loads, path.read_text().splitlines())}
+    assert set(spans) == {"ui.part2", "pipeline.part2", "graph", "node.Task Response", "llm"}
+    assert len({s["trace_id"] for s in spans.values()}) == 1
+    chain = ["ui.part2", "pipeline.part2", "graph", "node.Task Response", "llm"]
+    for parent, child in itertools.pairwise(chain):
+        assert spans[child]["parent_id"] == spans[parent]["span_id"]
+    assert spans["pipeline.part2"]["attributes"] == {"cache_hit": False}
+    assert spans["llm"]["attributes"]["node"] == "Task Response"
+
+
+def test_errors_are_recorded_and_spans_are_off_without_exporters_or_listeners(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(jsonl_path=path)
+
+    @tracing.traced("runner.part1")
+    def failing():
+        raise ValueError("no image")
+
+    try:
+        failing()
+    except ValueError:
+        pass
+    finally:
+        tracing.configure()
+    monkeypatch.setattr(tracing, "_listeners", [])
+    with tracing.span("ignored") as span:
+        assert span is None
+
+    (record,) = map(json.loads, path.read_text().splitlines())
+    assert record["status"] == "error"
+    assert record["attributes"]["error"] == "ValueError: no image"
+
+
+def test_to_otlp_keeps_ids_times_and_typed_attributes():
+    span = {"trace_id": "a" * 32, "span_id": "b" * 16, "parent_id": "c" * 16, "name": "llm",
+            "start_ns": 1, "end_ns": 2, "status": "ok",
+            "attributes": {"node": "CC", "input_tokens": 10, "queue_wait_ms": 0.5, "cache_hit": True}}
+    (otlp,) = tracing.to_otlp([span])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlp["traceId"] == "a" * 32 and otlp["parentSpanId"] == "c" * 16
+    assert otlp["startTimeUnixNano"] == "1" and otlp["status"] == {"code": 1}
+    values = {a["key"]: a["value"] for a in otlp["attributes"]}
+    assert values == {"node": {"stringValue": "CC"}, "input_tokens": {"intValue": "10"},
+                      "queue_wait_ms": {"doubleValue": 0.5}, "cache_hit": {"boolValue": True}}
+
+
+def test_listeners_are_installed_by_init_observability_not_by_import(monkeypatch):
+    import core.metrics
+    import core.observability
+    import core.results
+
+    monkeypatch.setattr(tracing, "_listeners", [])
+    monkeypatch.setattr(tracing, "_exporters", [])
+    monkeypatch.setattr(core.observability, "_initialized", False)
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    monkeypatch.setattr(config, "RESULT_STORE_ENABLED", True)
+    core.observability.init_observability()
+    core.observability.init_observability()
+    assert tracing._listeners == [core.metrics, core.results]
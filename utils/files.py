@@ -1,6 +1,7 @@
-from pathlib import Path
 import tempfile
 from contextlib import contextmanager
+from pathlib import Path
+
 
 @contextmanager
 def temp_copy(path: str | Path):
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+_MIME = {"WEBP": "image/webp", "PNG": "image/png", "JPEG": "image/jpeg"}
+# Info keys that carry no private or bulky metadata.
+_HARMLESS_INFO = {"dpi", "gamma", "jfif", "jfif_version", "jfif_unit", "jfif_density", "progressive", "progression"}
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    data: bytes
+    mime: str
+    source_format: str | None
+    source_bytes: int
+    size: tuple[int, int]
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """Drops alpha onto a white background (charts are drawn on white anyway)."""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB") if img.mode != "RGB" else img
+
+
+def preprocess_image(raw: bytes, max_side: int = 1536, fmt: str = "WEBP", quality: int = 80) -> PreparedImage:
+    """
+    Downscales, strips metadata and re-encodes an uploaded Task 1 image.
+
+    Whatever the upload format, the result is at most `max_side` pixels on its
+    longest edge and encoded as `fmt`. If the re-encode is not smaller than the
+    original (already compact, supported and small enough), the original wins.
+    """
+    with Image.open(io.BytesIO(raw)) as src:
+        source_format = src.format
+        img = ImageOps.exif_transpose(src)
+        img = _flatten(img)
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+        out = io.BytesIO()
+        if fmt == "PNG":
+            img.save(out, format="PNG", optimize=True)
+        else:
+            img.save(out, format=fmt, quality=quality, optimize=True)
+        data = out.getvalue()
+
+        keep_original = (
+            source_format in _MIME
+            and max(src.size) <= max_side
+            and len(raw) <= len(data)
+            and not set(src.info) - _HARMLESS_INFO
+        )
+    if keep_original:
+        return PreparedImage(raw, _MIME[source_format], source_format, len(raw), src.size)
+    return PreparedImage(data, _MIME[fmt], source_format, len(raw), img.size)
+
+
+_MEMO: OrderedDict[str, PreparedImage] = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+_MEMO_SIZE = 64
+
+
+def prepare_image(path: str | Path, max_side: int = 1536, fmt: str = "WEBP", quality: int = 80) -> PreparedImage:
+    """`preprocess_image` for a file on disk, memoized by content hash and settings."""
+    raw = Path(path).read_bytes()
+    key = f"{hashlib.sha256(raw).hexdigest()}:{max_side}:{fmt}:{quality}"
+    with _MEMO_LOCK:
+        hit = _MEMO.get(key)
+        if hit is not None:
+            _MEMO.move_to_end(key)
+            return hit
+
+    prepared = preprocess_image(raw, max_side=max_side, fmt=fmt, quality=quality)
+    with _MEMO_LOCK:
+        _MEMO[key] = prepared
+        while len(_MEMO) > _MEMO_SIZE:
+            _MEMO.popitem(last=False)
+    return prepared
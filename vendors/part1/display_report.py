@@ -1,5 +1,6 @@
-import json
+import io
 import re
+import sys
 import textwrap
 
 
@@ -12,34 +13,59 @@ class styles:
     ENDC = '\033[0m'
 
 
-def print_md(text):
+class plain_styles:
+    """Same names as `styles`, but with no escape codes (for Markdown/UI output)."""
+    HEADER = GREEN = WARNING = BOLD = UNDERLINE = ENDC = ''
+
+
+def format_md(text, ansi=True):
     """
     Translates simple markdown and wraps text for better terminal display.
+    With `ansi=False` the markdown is kept as-is and only wrapped.
     """
-    text = re.sub(r'\*\*(.*?)\*\*', f'{styles.BOLD}\\1{styles.ENDC}', text)
+    if ansi:
+        text = re.sub(r'\*\*(.*?)\*\*', f'{styles.BOLD}\\1{styles.ENDC}', text)
     paragraphs = text.split('\n')
     wrapped_paragraphs = [textwrap.fill(p, width=90) for p in paragraphs]
-    final_text = '\n'.join(wrapped_paragraphs)
-    print(final_text)
+    return '\n'.join(wrapped_paragraphs)
+
+
+def print_md(text, file=None, ansi=True):
+    """
+    Translates simple markdown and wraps text for better terminal display.
+    Writes to `file` (defaults to sys.stdout).
+    """
+    print(format_md(text, ansi=ansi), file=file)
 
 
-def display_report_fn(data):
+def render_report(data, file=None, ansi=False):
     """
-    Loads, parses, and prints the formatted IELTS report from a JSON file.
+    Renders the formatted IELTS report for a final workflow state and returns it.
+
+    When `file` is given the report is also written into it. Nothing global is
+    touched, so it is safe to call from concurrent requests.
     """
+    out = io.StringIO()
+    s = styles if ansi else plain_styles
+
+    def emit(text=""):
+        print(text, file=out)
 
-    print("\n" + "=" * 80)
-    print(f"{styles.HEADER}{styles.BOLD}📝 IELTS WRITING EVALUATION REPORT{styles.ENDC}")
-    print("=" * 80)
+    def emit_md(text):
+        print_md(text, file=out, ansi=ansi)
+
+    emit("\n" + "=" * 80)
+    emit(f"{s.HEADER}{s.BOLD}📝 IELTS WRITING EVALUATION REPORT{s.ENDC}")
+    emit("=" * 80)
 
     if "original_question" in data:
-        print(f"\n{styles.HEADER}{styles.UNDERLINE}Original Question:{styles.ENDC}")
-        print_md(data["original_question"])
+        emit(f"\n{s.HEADER}{s.UNDERLINE}Original Question:{s.ENDC}")
+        emit_md(data["original_question"])
 
     if "student_essay" in data:
-        print(f"\n{styles.HEADER}{styles.UNDERLINE}Student's Essay:{styles.ENDC}")
-        print_md(data["student_essay"])
-        print("-" * 80)
+        emit(f"\n{s.HEADER}{s.UNDERLINE}Student's Essay:{s.ENDC}")
+        emit_md(data["student_essay"])
+        emit("-" * 80)
 
     sections = {
         "task_response": "✅ Task Response",
@@ -50,14 +76,26 @@ def display_report_fn(data):
 
     for key, title in sections.items():
         if key in data:
-            print(f"\n\n{styles.GREEN}{styles.BOLD}{styles.UNDERLINE}--- {title} ---{styles.ENDC}\n")
-            print_md(data[key])
+            emit(f"\n\n{s.GREEN}{s.BOLD}{s.UNDERLINE}--- {title} ---{s.ENDC}\n")
+            emit_md(data[key])
 
     if "aggregated_result" in data:
-        print(
-            f"\n\n{styles.WARNING}{styles.BOLD}{styles.UNDERLINE}--- 📊 Overall Summary & Final Score ---{styles.ENDC}\n")
-        print_md(data["aggregated_result"])
+        emit(
+            f"\n\n{s.WARNING}{s.BOLD}{s.UNDERLINE}--- 📊 Overall Summary & Final Score ---{s.ENDC}\n")
+        emit_md(data["aggregated_result"])
+
+    emit("\n" + "=" * 80 + "\n")
 
-    print("\n" + "=" * 80 + "\n")
+    report = out.getvalue()
+    if file is not None:
+        file.write(report)
+    return report
 
 
+def display_report_fn(data, file=None):
+    """
+    Prints the formatted IELTS report (with terminal colours) to `file`,
+    defaulting to sys.stdout.
+    """
+    render_report(data, file=file if file is not None else sys.stdout, ansi=True)
+
@@ -1,14 +1,22 @@
 # part1/main.py
+import asyncio
 import base64
-import io
-import sys
 import os
+import sys
+
+from core.criteria import get_rubric
+from core.results import note_grading
+from core.streaming import astream_reports, stream_reports
 
 # --- Assuming these are your existing, correct imports from your project ---
-from .nodes import task_response, coherence_and_cohesion, lexical_resource, grammatical_range_and_accuracy, aggregator
-from .state import State
-from .workflow import workflow_fn
-from .display_report import display_report_fn
+from .display_report import render_report
+
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
 
 
 def encode_image(image_path: str) -> str:
@@ -17,13 +25,47 @@ def encode_image(image_path: str) -> str:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
 
-def run_ielts_part1_agent(image_path: str, student_essay: str) -> str:
+def image_mime_type(image_path: str) -> str:
+    """Guesses the real image type from the file header (falls back to jpeg)."""
+    with open(image_path, "rb") as image_file:
+        head = image_file.read(12)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, mime in _MAGIC:
+        if head.startswith(magic):
+            return mime
+    return "image/jpeg"
+
+
+def image_data_url(image_path: str) -> str:
+    return f"data:{image_mime_type(image_path)};base64,{encode_image(image_path)}"
+
+
+def build_workflow(mode="fanout", llm_summary=False, cache=None, cache_ttl=None, degrade=False):
+    """
+    Builds and compiles the Part 1 LangGraph workflow from rubrics/part1.toml
+    (see core.criteria.Rubric.build for the options).
+    """
+    return get_rubric("part1").build(mode, llm_summary=llm_summary, cache=cache, cache_ttl=cache_ttl,
+                                     degrade=degrade)
+
+
+def build_async_workflow(mode="fanout", llm_summary=False, cache=None, cache_ttl=None, degrade=False):
+    """Same graphs as `build_workflow`, wired with the async (ainvoke) nodes."""
+    return get_rubric("part1").build(mode, use_async=True, llm_summary=llm_summary, cache=cache,
+                                     cache_ttl=cache_ttl, degrade=degrade)
+
+
+def run_ielts_part1_agent(image_path: str, student_essay: str, workflow=None, image_url=None) -> str:
     """
     Runs the IELTS Part 1 agent with an image and text, returning the report as a string.
+
+    Pass an already compiled `workflow` to skip building the graph on every call, and an
+    already prepared `image_url` (data URL) to skip encoding the raw file.
     """
     # 1. Encode the image provided by the user
-    base64_image = encode_image(image_path)
-    image_url = f"data:image/jpeg;base64,{base64_image}"  # Use jpeg as a common format
+    if image_url is None:
+        image_url = image_data_url(image_path)
 
     # 2. Set up the initial state for the agentic workflow
     initial_state = {
@@ -31,27 +73,66 @@ def run_ielts_part1_agent(image_path: str, student_essay: str) -> str:
         "student_essay": student_essay
     }
 
-    # 3. Initialize the LangGraph workflow
-    final_workflow = workflow_fn(State, task_response, lexical_resource, grammatical_range_and_accuracy,
-                                 coherence_and_cohesion, aggregator)
+    # 3. Initialize the LangGraph workflow (only when the caller didn't give us one)
+    final_workflow = workflow if workflow is not None else build_workflow()
 
     # 4. Invoke the agent
-    print("Invoking Part 1 agent workflow...")
     final_state = final_workflow.invoke(initial_state)
-    print("Workflow complete.")
+    note_grading(final_state)
 
-    # 5. Capture the printed output of your display_report_fn
-    # This redirects the console output to a string variable
-    old_stdout = sys.stdout
-    sys.stdout = captured_output = io.StringIO()
+    # 5. Render the report straight into a string (no stdout redirection,
+    # so concurrent requests can't bleed into each other)
+    report_string = render_report(final_state)
 
-    display_report_fn(final_state)
+    # 6. Return the report as a string
+    return report_string
 
-    sys.stdout = old_stdout  # Restore the standard output
-    report_string = captured_output.getvalue()  # Get the report from the string buffer
 
-    # 6. Return the captured report as a string
-    return report_string
+async def run_ielts_part1_agent_async(image_path: str, student_essay: str, workflow=None, image_url=None) -> str:
+    """
+    Async version of `run_ielts_part1_agent`; `workflow` must be built with `build_async_workflow`.
+    """
+    if image_url is None:
+        image_url = await asyncio.to_thread(image_data_url, image_path)
+
+    initial_state = {
+        "image_url": image_url,
+        "student_essay": student_essay
+    }
+
+    final_workflow = workflow if workflow is not None else build_async_workflow()
+    final_state = await final_workflow.ainvoke(initial_state)
+    note_grading(final_state)
+
+    return render_report(final_state)
+
+
+def stream_ielts_part1_agent(image_path: str, student_essay: str, workflow=None, image_url=None):
+    """
+    Like `run_ielts_part1_agent`, but yields the report as it grows: after every finished
+    node, and token by token while the optional LLM summary is written.
+    """
+    if image_url is None:
+        image_url = image_data_url(image_path)
+    initial_state = {
+        "image_url": image_url,
+        "student_essay": student_essay
+    }
+    final_workflow = workflow if workflow is not None else build_workflow()
+    yield from stream_reports(final_workflow, initial_state, render_report)
+
+
+async def stream_ielts_part1_agent_async(image_path: str, student_essay: str, workflow=None, image_url=None):
+    """Async version of `stream_ielts_part1_agent`; `workflow` must be built with `build_async_workflow`."""
+    if image_url is None:
+        image_url = await asyncio.to_thread(image_data_url, image_path)
+    initial_state = {
+        "image_url": image_url,
+        "student_essay": student_essay
+    }
+    final_workflow = workflow if workflow is not None else build_async_workflow()
+    async for report in astream_reports(final_workflow, initial_state, render_report):
+        yield report
 
 
 # This part is for your own direct testing of this script
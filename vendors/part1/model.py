@@ -1,5 +1,5 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from dotenv import load_dotenv
+# The Gemini model is shared by both tasks and built on first use (see core/llm.py);
+# model name, temperature and top_p come from core.config.
+from core.llm import chat_model as model
 
-load_dotenv()
-model = ChatGoogleGenerativeAI(model='gemini-2.5-flash-preview-05-20', temperature=0.1, top_p=0.95)
+__all__ = ["model"]
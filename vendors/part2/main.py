@@ -1,41 +1,88 @@
-from langgraph.graph import StateGraph, START, END
-from typing_extensions import Literal
-from langchain_core.messages import HumanMessage, SystemMessage
-import io
-import sys
+from core.criteria import get_rubric
+from core.results import note_grading
+from core.streaming import astream_reports, stream_reports
 
-from .nodes import task_response, coherence_and_cohesion, lexical_resource, grammatical_range_and_accuracy, aggregator
-from .state import State
-from .workflow import workflow_fn
-from .display_report import display_report_fn
+from .display_report import render_report
 
 
-def run_ielts_part2_agent(original_question: str, student_essay: str) -> str:
+def build_workflow(mode="fanout", llm_summary=False, cache=None, cache_ttl=None, degrade=False):
+    """
+    Builds and compiles the Part 2 LangGraph workflow from rubrics/part2.toml
+    (see core.criteria.Rubric.build for the options).
+    """
+    return get_rubric("part2").build(mode, llm_summary=llm_summary, cache=cache, cache_ttl=cache_ttl,
+                                     degrade=degrade)
+
+
+def build_async_workflow(mode="fanout", llm_summary=False, cache=None, cache_ttl=None, degrade=False):
+    """Same graphs as `build_workflow`, wired with the async (ainvoke) nodes."""
+    return get_rubric("part2").build(mode, use_async=True, llm_summary=llm_summary, cache=cache,
+                                     cache_ttl=cache_ttl, degrade=degrade)
+
+
+def run_ielts_part2_agent(original_question: str, student_essay: str, workflow=None) -> str:
     """
     Runs the IELTS Part 2 agent and captures the output report as a string.
+
+    Pass an already compiled `workflow` to skip building the graph on every call.
     """
     initial_state = {
         "original_question": original_question,
         "student_essay": student_essay
     }
 
-    # Initialize the LangGraph workflow
-    final_workflow = workflow_fn(State, task_response, lexical_resource, grammatical_range_and_accuracy,
-                                 coherence_and_cohesion, aggregator)
+    # Initialize the LangGraph workflow (only when the caller didn't give us one)
+    final_workflow = workflow if workflow is not None else build_workflow()
 
     # Invoke the agent with the initial state
     final_state = final_workflow.invoke(initial_state)
+    note_grading(final_state)
+
+    # Render the report straight into a string (no stdout redirection,
+    # so concurrent requests can't bleed into each other)
+    report_string = render_report(final_state)
 
-    # --- Capture the printed output of display_report_fn ---
-    old_stdout = sys.stdout
-    sys.stdout = captured_output = io.StringIO()
+    return report_string
 
-    display_report_fn(final_state)  # This function now prints into our captured_output
 
-    sys.stdout = old_stdout  # Restore standard output
-    report_string = captured_output.getvalue()  # Get the string from the buffer
+async def run_ielts_part2_agent_async(original_question: str, student_essay: str, workflow=None) -> str:
+    """
+    Async version of `run_ielts_part2_agent`; `workflow` must be built with `build_async_workflow`.
+    """
+    initial_state = {
+        "original_question": original_question,
+        "student_essay": student_essay
+    }
 
-    return report_string
+    final_workflow = workflow if workflow is not None else build_async_workflow()
+    final_state = await final_workflow.ainvoke(initial_state)
+    note_grading(final_state)
+
+    return render_report(final_state)
+
+
+def stream_ielts_part2_agent(original_question: str, student_essay: str, workflow=None):
+    """
+    Like `run_ielts_part2_agent`, but yields the report as it grows: after every finished
+    node, and token by token while the optional LLM summary is written.
+    """
+    initial_state = {
+        "original_question": original_question,
+        "student_essay": student_essay
+    }
+    final_workflow = workflow if workflow is not None else build_workflow()
+    yield from stream_reports(final_workflow, initial_state, render_report)
+
+
+async def stream_ielts_part2_agent_async(original_question: str, student_essay: str, workflow=None):
+    """Async version of `stream_ielts_part2_agent`; `workflow` must be built with `build_async_workflow`."""
+    initial_state = {
+        "original_question": original_question,
+        "student_essay": student_essay
+    }
+    final_workflow = workflow if workflow is not None else build_async_workflow()
+    async for report in astream_reports(final_workflow, initial_state, render_report):
+        yield report
 
 
 # This part is for your own direct testing of the script